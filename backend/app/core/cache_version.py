@@ -0,0 +1,30 @@
+# backend/app/core/cache_version.py
+"""
+Cross-worker version stamps for in-process caches.
+
+Writers bump a named counter in the ``cache_versions`` table in the same
+transaction as the change they make; each worker compares the stamp with
+the one its cache was built from and reloads when it moved.
+"""
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.models import CacheVersion
+
+
+def get_version(db: Session, name: str) -> int:
+    """Current version of ``name`` (0 if it was never bumped)."""
+    version = db.query(CacheVersion.version).filter(CacheVersion.name == name).scalar()
+    return version or 0
+
+
+def bump_version(db: Session, name: str) -> None:
+    """Increment ``name`` atomically; the caller commits."""
+    result = db.execute(
+        update(CacheVersion)
+        .where(CacheVersion.name == name)
+        .values(version=CacheVersion.version + 1)
+    )
+    if result.rowcount == 0:
+        db.add(CacheVersion(name=name, version=1))
+        db.flush()
@@ -0,0 +1,124 @@
+# backend/app/core/circuit_breaker.py
+import random
+import time
+from typing import Optional
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por proveedor externo.
+
+    Estados:
+    - closed: las peticiones pasan normalmente
+    - open: las peticiones se rechazan sin llamar al proveedor
+    - half_open: se permite una única petición de prueba
+
+    Cada vez que una prueba falla, el tiempo en estado abierto se duplica
+    (hasta `max_recovery_timeout`) con jitter aleatorio, para no golpear
+    al proveedor a intervalos fijos.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        recovery_timeout: float = 30.0,
+        max_recovery_timeout: float = 600.0,
+        jitter: float = 0.2,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.max_recovery_timeout = max_recovery_timeout
+        self.jitter = jitter
+
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.consecutive_opens = 0
+        self.opened_at: Optional[float] = None
+        self.retry_at: Optional[float] = None
+        self._probe_in_flight = False
+
+        # Métricas
+        self.total_successes = 0
+        self.total_failures = 0
+        self.total_rejected = 0
+        self.times_opened = 0
+
+    def _backoff(self) -> float:
+        """Tiempo en estado abierto con backoff exponencial y jitter"""
+        timeout = min(
+            self.recovery_timeout * (2 ** max(self.consecutive_opens - 1, 0)),
+            self.max_recovery_timeout,
+        )
+        return timeout * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _open(self) -> None:
+        now = time.monotonic()
+        self.state = self.OPEN
+        self.consecutive_opens += 1
+        self.times_opened += 1
+        self.opened_at = now
+        self.retry_at = now + self._backoff()
+        self._probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        """Indica si se puede llamar al proveedor ahora"""
+        if self.state == self.CLOSED:
+            return True
+
+        if self.state == self.OPEN and time.monotonic() >= self.retry_at:
+            self.state = self.HALF_OPEN
+
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+
+        self.total_rejected += 1
+        return False
+
+    def release_probe(self) -> None:
+        """
+        Libera la petición de prueba sin registrar resultado (cancelada o
+        respuesta que no dice nada del estado del proveedor); la próxima
+        petición vuelve a probar. Llamar en un ``finally`` tras cada intento.
+        """
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        self.total_successes += 1
+        self.consecutive_failures = 0
+        self.consecutive_opens = 0
+        self.state = self.CLOSED
+        self.opened_at = None
+        self.retry_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.total_failures += 1
+        self.consecutive_failures += 1
+        if (
+            self.state == self.HALF_OPEN
+            or self.consecutive_failures >= self.failure_threshold
+        ):
+            self._open()
+
+    def metrics(self) -> dict:
+        """Estado y contadores para monitoreo"""
+        retry_in = None
+        if self.state == self.OPEN and self.retry_at is not None:
+            retry_in = max(0.0, round(self.retry_at - time.monotonic(), 1))
+        return {
+            "provider": self.name,
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in_seconds": retry_in,
+            "times_opened": self.times_opened,
+            "total_successes": self.total_successes,
+            "total_failures": self.total_failures,
+            "total_rejected": self.total_rejected,
+        }
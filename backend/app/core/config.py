@@ -1,6 +1,7 @@
 # backend/app/core/config.py
 from pydantic_settings import BaseSettings, SettingsConfigDict
 import os
+from typing import Optional
 
 class Settings(BaseSettings):
     DATABASE_URL: str
@@ -9,6 +10,29 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30 # Valor por defecto
     FRONTEND_URL: str
 
+    # Proveedores meteorológicos (sobrescribibles para apuntar a un stub local)
+    PVGIS_URL: str = "https://re.jrc.ec.europa.eu/api/v5_2/tmy"
+    OPENMETEO_URL: str = "https://archive-api.open-meteo.com/v1/archive"
+    WEATHER_CONNECT_TIMEOUT: float = 5.0
+    WEATHER_READ_TIMEOUT: float = 30.0
+
+    # Archivo local de datos meteorológicos (mmap) para workers de simulación.
+    # Deshabilitado si no se define.
+    WEATHER_ARCHIVE_DIR: Optional[str] = None
+
+    # Caché de escenarios: cada cuánto se consulta el sello de versión
+    # compartido y antigüedad máxima antes de recargar igualmente (segundos)
+    SCENARIO_CACHE_CHECK_SECONDS: float = 5.0
+    SCENARIO_CACHE_MAX_AGE_SECONDS: float = 300.0
+
+    # Índice de compatibilidad panel x inversor: mismo esquema de sello de versión
+    COMPATIBILITY_CHECK_SECONDS: float = 5.0
+    COMPATIBILITY_MAX_AGE_SECONDS: float = 900.0
+
+    # Monte Carlo: procesos del pool compartido por todas las peticiones
+    # (None = núcleos disponibles)
+    MONTE_CARLO_MAX_WORKERS: Optional[int] = None
+
     # Le dice a Pydantic dónde encontrar el archivo .env
     # La ruta es relativa al directorio desde donde se ejecuta uvicorn (backend/)
     model_config = SettingsConfigDict(env_file=".env", extra='ignore')
@@ -3,10 +3,11 @@ from .user import user
 from .project import project
 from .solar import (
     panel_type, inverter_type, solar_design,
-    simulation_scenario, financial_analysis
+    simulation_scenario, financial_analysis, price_curve
 )
 
 __all__ = [
     "user", "project", "panel_type", "inverter_type",
-    "solar_design", "simulation_scenario", "financial_analysis"
+    "solar_design", "simulation_scenario", "financial_analysis",
+    "price_curve"
 ]
\ No newline at end of file
@@ -12,6 +12,9 @@ class CRUDProject:
     def get_multi(self, db: Session, *, skip: int = 0, limit: int = 100) -> List[Project]:
         return db.query(Project).offset(skip).limit(limit).all()
     
+    def get_multi_by_ids(self, db: Session, *, ids: List[int]) -> List[Project]:
+        return db.query(Project).filter(Project.id.in_(ids)).all()
+    
     def get_multi_by_owner(
         self, db: Session, *, owner_id: int, skip: int = 0, limit: int = 100
     ) -> List[Project]:
@@ -1,25 +1,37 @@
 # backend/app/crud/solar.py
-from typing import List, Optional
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from sqlalchemy.sql import func
+from app.core.cache_version import bump_version, get_version
+from app.core.config import settings
 from app.models import (
-    PanelType, InverterType, SolarDesign, 
-    SimulationScenario, FinancialAnalysis
+    Project, PanelType, InverterType, SolarDesign, 
+    SimulationScenario, FinancialAnalysis, PriceCurve
 )
 from app.schemas import (
     PanelTypeCreate, PanelTypeUpdate,
     InverterTypeCreate,
     SolarDesignCreate, SolarDesignUpdate,
-    SimulationScenarioCreate,
-    FinancialAnalysisCreate
+    SimulationScenarioCreate, SimulationScenarioUpdate,
+    FinancialAnalysisCreate,
+    PriceCurveCreate
 )
 
+# Sello de versión del catálogo de paneles e inversores (índice de compatibilidad)
+CATALOG_VERSION_NAME = "catalog"
+
 
 class CRUDPanelType:
     def get(self, db: Session, id: int) -> Optional[PanelType]:
         return db.query(PanelType).filter(PanelType.id == id).first()
     
+    def get_multi_by_ids(self, db: Session, *, ids: List[int]) -> List[PanelType]:
+        return db.query(PanelType).filter(PanelType.id.in_(ids)).all()
+    
     def get_by_model(self, db: Session, *, model: str) -> Optional[PanelType]:
         return db.query(PanelType).filter(PanelType.model == model).first()
     
@@ -31,6 +43,7 @@ class CRUDPanelType:
     def create(self, db: Session, *, obj_in: PanelTypeCreate) -> PanelType:
         db_obj = PanelType(**obj_in.model_dump())
         db.add(db_obj)
+        bump_version(db, CATALOG_VERSION_NAME)
         db.commit()
         db.refresh(db_obj)
         return db_obj
@@ -42,6 +55,7 @@ class CRUDPanelType:
         for field, value in update_data.items():
             setattr(db_obj, field, value)
         db.add(db_obj)
+        bump_version(db, CATALOG_VERSION_NAME)
         db.commit()
         db.refresh(db_obj)
         return db_obj
@@ -51,6 +65,9 @@ class CRUDInverterType:
     def get(self, db: Session, id: int) -> Optional[InverterType]:
         return db.query(InverterType).filter(InverterType.id == id).first()
     
+    def get_multi_by_ids(self, db: Session, *, ids: List[int]) -> List[InverterType]:
+        return db.query(InverterType).filter(InverterType.id.in_(ids)).all()
+    
     def get_multi(
         self, db: Session, *, skip: int = 0, limit: int = 100
     ) -> List[InverterType]:
@@ -59,6 +76,7 @@ class CRUDInverterType:
     def create(self, db: Session, *, obj_in: InverterTypeCreate) -> InverterType:
         db_obj = InverterType(**obj_in.model_dump())
         db.add(db_obj)
+        bump_version(db, CATALOG_VERSION_NAME)
         db.commit()
         db.refresh(db_obj)
         return db_obj
@@ -68,6 +86,9 @@ class CRUDSolarDesign:
     def get(self, db: Session, id: int) -> Optional[SolarDesign]:
         return db.query(SolarDesign).filter(SolarDesign.id == id).first()
     
+    def get_multi_by_ids(self, db: Session, *, ids: List[int]) -> List[SolarDesign]:
+        return db.query(SolarDesign).filter(SolarDesign.id.in_(ids)).all()
+    
     def get_multi_by_project(
         self, db: Session, *, project_id: int, skip: int = 0, limit: int = 100
     ) -> List[SolarDesign]:
@@ -137,27 +158,65 @@ class CRUDSolarDesign:
 
 
 class CRUDSimulationScenario:
+    """
+    Scenario reads are served from an in-process cache of all scenarios.
+    
+    Writes through this class bump the shared ``scenarios`` version stamp;
+    every worker checks the stamp at most every SCENARIO_CACHE_CHECK_SECONDS
+    and reloads when it moved (or after SCENARIO_CACHE_MAX_AGE_SECONDS, to
+    pick up rows written outside this class). Cached objects are detached
+    copies: read-only snapshots, not bound to any session.
+    """
+    VERSION_NAME = "scenarios"
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_id: Dict[str, SimulationScenario] = {}
+        self._version: Optional[int] = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+    
+    def _snapshot(self, obj: SimulationScenario) -> SimulationScenario:
+        columns = SimulationScenario.__table__.columns.keys()
+        return SimulationScenario(**{name: getattr(obj, name) for name in columns})
+    
+    def _scenarios(self, db: Session) -> Dict[str, SimulationScenario]:
+        now = time.monotonic()
+        if (
+            self._version is not None
+            and now - self._checked_at < settings.SCENARIO_CACHE_CHECK_SECONDS
+        ):
+            return self._by_id
+        
+        with self._lock:
+            version = get_version(db, self.VERSION_NAME)
+            self._checked_at = now
+            if version != self._version or now - self._loaded_at >= settings.SCENARIO_CACHE_MAX_AGE_SECONDS:
+                rows = db.query(SimulationScenario).order_by(SimulationScenario.id).all()
+                self._by_id = {row.id: self._snapshot(row) for row in rows}
+                self._version = version
+                self._loaded_at = now
+        return self._by_id
+    
+    def invalidate(self) -> None:
+        """Drop this worker's cache; the next read reloads."""
+        with self._lock:
+            self._version = None
+    
     def get(self, db: Session, id: str) -> Optional[SimulationScenario]:
-        return db.query(SimulationScenario).filter(SimulationScenario.id == id).first()
+        return self._scenarios(db).get(id)
     
     def get_default(self, db: Session) -> Optional[SimulationScenario]:
-        return db.query(SimulationScenario).filter(
-            and_(
-                SimulationScenario.is_default == True,
-                SimulationScenario.is_active == True
-            )
-        ).first()
+        return next(
+            (s for s in self._scenarios(db).values() if s.is_default and s.is_active),
+            None
+        )
     
     def get_multi_active(
         self, db: Session, *, skip: int = 0, limit: int = 100
     ) -> List[SimulationScenario]:
-        return (
-            db.query(SimulationScenario)
-            .filter(SimulationScenario.is_active == True)
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+        active = [s for s in self._scenarios(db).values() if s.is_active]
+        return active[skip:skip + limit]
     
     def create(
         self, db: Session, *, obj_in: SimulationScenarioCreate
@@ -168,8 +227,31 @@ class CRUDSimulationScenario:
         
         db_obj = SimulationScenario(**obj_in.model_dump())
         db.add(db_obj)
+        bump_version(db, self.VERSION_NAME)
         db.commit()
         db.refresh(db_obj)
+        self.invalidate()
+        return db_obj
+    
+    def update(
+        self, db: Session, *, id: str, obj_in: SimulationScenarioUpdate
+    ) -> Optional[SimulationScenario]:
+        db_obj = db.query(SimulationScenario).filter(SimulationScenario.id == id).first()
+        if not db_obj:
+            return None
+        
+        update_data = obj_in.model_dump(exclude_unset=True)
+        if update_data.get("is_default"):
+            db.query(SimulationScenario).filter(SimulationScenario.id != id).update(
+                {SimulationScenario.is_default: False}
+            )
+        for field, value in update_data.items():
+            setattr(db_obj, field, value)
+        db.add(db_obj)
+        bump_version(db, self.VERSION_NAME)
+        db.commit()
+        db.refresh(db_obj)
+        self.invalidate()
         return db_obj
 
 
@@ -184,6 +266,96 @@ class CRUDFinancialAnalysis:
             .first()
         )
     
+    def get_latest_by_owner(self, db: Session, *, owner_id: int) -> List:
+        """
+        Latest analysis of every design in the owner's projects, in one query
+        (ROW_NUMBER window per design). Returns light rows, without cash flows.
+        """
+        ranked = (
+            db.query(
+                FinancialAnalysis.id.label("id"),
+                func.row_number().over(
+                    partition_by=FinancialAnalysis.design_id,
+                    order_by=(FinancialAnalysis.created_at.desc(), FinancialAnalysis.id.desc())
+                ).label("rank")
+            )
+            .join(SolarDesign, SolarDesign.id == FinancialAnalysis.design_id)
+            .join(Project, Project.id == SolarDesign.project_id)
+            .filter(Project.owner_id == owner_id)
+            .subquery()
+        )
+        return (
+            db.query(
+                Project.id.label("project_id"),
+                Project.name.label("project_name"),
+                SolarDesign.id.label("design_id"),
+                SolarDesign.capacity_mw,
+                SolarDesign.annual_production_mwh,
+                FinancialAnalysis.id.label("analysis_id"),
+                FinancialAnalysis.scenario_id,
+                FinancialAnalysis.total_investment,
+                FinancialAnalysis.lcoe,
+                FinancialAnalysis.npv,
+                FinancialAnalysis.created_at,
+            )
+            .join(ranked, and_(ranked.c.id == FinancialAnalysis.id, ranked.c.rank == 1))
+            .join(SolarDesign, SolarDesign.id == FinancialAnalysis.design_id)
+            .join(Project, Project.id == SolarDesign.project_id)
+            .order_by(Project.id, SolarDesign.id)
+            .all()
+        )
+    
+    def get_by_fingerprint(
+        self, db: Session, *, design_id: int, fingerprint: str
+    ) -> Optional[FinancialAnalysis]:
+        return (
+            db.query(FinancialAnalysis)
+            .filter(
+                FinancialAnalysis.design_id == design_id,
+                FinancialAnalysis.input_fingerprint == fingerprint
+            )
+            .order_by(FinancialAnalysis.created_at.desc(), FinancialAnalysis.id.desc())
+            .first()
+        )
+    
+    def touch(self, db: Session, *, db_obj: FinancialAnalysis) -> FinancialAnalysis:
+        """
+        Move a reused analysis to the front of the "latest" ordering, so the
+        latest-analysis queries return the one last requested.
+        """
+        # Con microsegundos, para no empatar con análisis del mismo segundo
+        db_obj.created_at = datetime.now(timezone.utc)
+        db.add(db_obj)
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
+    
+    def prune_duplicates(self, db: Session) -> int:
+        """
+        Delete analyses superseded by a newer one of the same design with the
+        same input fingerprint (e.g. recomputed with ``force``). Analyses
+        without a fingerprint are kept. Returns the number of rows deleted.
+        """
+        ranked = (
+            db.query(
+                FinancialAnalysis.id.label("id"),
+                func.row_number().over(
+                    partition_by=(FinancialAnalysis.design_id, FinancialAnalysis.input_fingerprint),
+                    order_by=(FinancialAnalysis.created_at.desc(), FinancialAnalysis.id.desc())
+                ).label("rank")
+            )
+            .filter(FinancialAnalysis.input_fingerprint.isnot(None))
+            .subquery()
+        )
+        superseded = db.query(ranked.c.id).filter(ranked.c.rank > 1)
+        deleted = (
+            db.query(FinancialAnalysis)
+            .filter(FinancialAnalysis.id.in_(superseded))
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        return deleted
+    
     def create(
         self, db: Session, *, obj_in: FinancialAnalysisCreate, results: dict
     ) -> FinancialAnalysis:
@@ -197,9 +369,39 @@ class CRUDFinancialAnalysis:
         return db_obj
 
 
+class CRUDPriceCurve:
+    def get(self, db: Session, id: int) -> Optional[PriceCurve]:
+        return db.query(PriceCurve).filter(PriceCurve.id == id).first()
+    
+    def get_multi_by_owner(
+        self, db: Session, *, owner_id: int, skip: int = 0, limit: int = 100
+    ) -> List[PriceCurve]:
+        return (
+            db.query(PriceCurve)
+            .filter(PriceCurve.owner_id == owner_id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+    
+    def create(
+        self, db: Session, *, obj_in: PriceCurveCreate, owner_id: int, encoded: dict
+    ) -> PriceCurve:
+        db_obj = PriceCurve(
+            **obj_in.model_dump(exclude={"kind", "values", "tou_weekday", "tou_weekend"}),
+            **encoded,
+            owner_id=owner_id
+        )
+        db.add(db_obj)
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
+
+
 # Instancias de CRUD
 panel_type = CRUDPanelType()
 inverter_type = CRUDInverterType()
 solar_design = CRUDSolarDesign()
 simulation_scenario = CRUDSimulationScenario()
-financial_analysis = CRUDFinancialAnalysis()
\ No newline at end of file
+financial_analysis = CRUDFinancialAnalysis()
+price_curve = CRUDPriceCurve()
\ No newline at end of file
@@ -1,21 +1,26 @@
 # backend/app/models/__init__.py
-from .models import User, Project
+from .models import User, Project, CacheVersion
 from .solar_models import (
     PanelType, 
     InverterType, 
     SolarDesign, 
     WeatherData, 
     SimulationScenario,
-    FinancialAnalysis
+    FinancialAnalysis,
+    PriceCurve,
+    PortfolioSummary
 )
 
 __all__ = [
     "User", 
     "Project",
+    "CacheVersion",
     "PanelType",
     "InverterType", 
     "SolarDesign",
     "WeatherData",
     "SimulationScenario",
-    "FinancialAnalysis"
+    "FinancialAnalysis",
+    "PriceCurve",
+    "PortfolioSummary"
 ]
\ No newline at end of file
@@ -34,4 +34,12 @@ class Project(Base):
     
     # Foreign key y relación con User
     owner_id = Column(Integer, ForeignKey("users.id"))
-    owner = relationship("User", back_populates="projects")
\ No newline at end of file
+    owner = relationship("User", back_populates="projects")
+
+
+class CacheVersion(Base):
+    """Sello de versión compartido entre workers para invalidar cachés en memoria"""
+    __tablename__ = "cache_versions"
+    
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
\ No newline at end of file
@@ -1,5 +1,5 @@
 # backend/app/models/solar_models.py
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, JSON, Text, Boolean, Index
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, JSON, Text, Boolean, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -66,6 +66,7 @@ class InverterType(Base):
     
     # Otros parámetros
     mppt_channels = Column(Integer, default=1)
+    max_current_per_mppt = Column(Float)  # Corriente de cortocircuito máxima por MPPT (A)
     phases = Column(Integer, default=3)  # 1 o 3 fases
     
     # Metadata
@@ -135,7 +136,10 @@ class WeatherData(Base):
     longitude = Column(Float, nullable=False)
     
     # Datos meteorológicos (formato JSON con arrays de 8760 valores)
+    # En registros codificados solo guarda {metadata}; los arrays van en weather_arrays
     weather_data = Column(JSON, nullable=False)  # {ghi, dni, dhi, temp_air, wind_speed}
+    weather_arrays = Column(LargeBinary)  # Arrays cuantizados y comprimidos (ver services/weather_encoding)
+    arrays_digest = Column(String(64))  # sha256 de weather_arrays: cambia con cada reescritura
     
     # Metadata
     source = Column(String)  # 'jrc', 'pvgis', 'nrel', etc.
@@ -177,6 +181,18 @@ class SimulationScenario(Base):
     # O&M
     om_cost_per_mw_year = Column(Float)  # USD/MW/año
     
+    # Economías de escala opcionales:
+    # {"reference_capacity_mw": 10, "exponents": {"bos_cost": 0.1, ...}}
+    cost_scaling = Column(JSON)
+
+    # Impuestos e incentivos
+    tax_rate = Column(Float)  # Impuesto a las ganancias (0.35 = 35%)
+    depreciation_method = Column(String, default="straight_line")  # straight_line, macrs_5, macrs_7, ...
+    depreciation_years = Column(Integer, default=20)  # Años de amortización lineal
+    itc_rate = Column(Float)  # Crédito fiscal a la inversión (fracción del CAPEX)
+    ptc_rate = Column(Float)  # Crédito fiscal a la producción (USD/kWh)
+    ptc_years = Column(Integer, default=10)
+
     # Estado
     is_active = Column(Boolean, default=True)
     is_default = Column(Boolean, default=False)
@@ -204,6 +220,10 @@ class FinancialAnalysis(Base):
     debt_percentage = Column(Float, default=0.7)  # 70% deuda
     interest_rate = Column(Float)
     loan_term_years = Column(Integer)
+    target_dscr = Column(Float)  # DSCR mínimo objetivo para dimensionar la deuda
+    
+    # Precio de venta de energía (USD/kWh, año 1; escala según el escenario)
+    electricity_price = Column(Float)
     
     # Resultados financieros
     lcoe = Column(Float)  # USD/kWh
@@ -211,9 +231,15 @@ class FinancialAnalysis(Base):
     irr = Column(Float)  # Tasa Interna de Retorno
     payback_period = Column(Float)  # Años
     roi = Column(Float)  # Return on Investment %
+    debt_amount = Column(Float)  # Deuda efectiva (USD)
+    min_dscr = Column(Float)  # DSCR mínimo durante el préstamo
+    equity_irr = Column(Float)  # TIR del capital propio
     
     # Flujos de caja anuales (JSON)
-    cash_flows = Column(JSON)  # Array con flujos año por año
+    cash_flows = Column(JSON)  # Columnar: {campo: [año 0, año 1, ...]}
+    
+    # Huella de las entradas (diseño, escenario, parámetros) para reutilizar análisis
+    input_fingerprint = Column(String(64))
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -221,6 +247,43 @@ class FinancialAnalysis(Base):
     # Relaciones
     design = relationship("SolarDesign", back_populates="financial_analyses")
     scenario = relationship("SimulationScenario")
+    
+    # Último análisis por diseño (consultas de cartera)
+    __table_args__ = (
+        Index('idx_financial_analyses_design_created', 'design_id', 'created_at'),
+        Index('idx_financial_analyses_design_fingerprint', 'design_id', 'input_fingerprint'),
+    )
+
+
+class PriceCurve(Base):
+    """Curva de precios de energía horaria o por bandas horarias (TOU)"""
+    __tablename__ = "price_curves"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)
+    description = Column(Text)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    
+    # 'hourly' (8760 precios) o 'tou' (matriz laborable/fin de semana x mes x hora)
+    kind = Column(String, nullable=False)
+    prices = Column(LargeBinary, nullable=False)  # float32 comprimido, USD/kWh, hora local
+    utc_offset_hours = Column(Float)  # Huso horario de la curva (None = según longitud)
+    
+    # Resumen
+    average_price = Column(Float)
+    min_price = Column(Float)
+    max_price = Column(Float)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class PortfolioSummary(Base):
+    """Resumen financiero materializado de la cartera de un usuario"""
+    __tablename__ = "portfolio_summaries"
+    
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    summary = Column(JSON, nullable=False)
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 
 # Actualizar el modelo Project para incluir la relación
@@ -1,8 +1,13 @@
 # backend/app/routers/financial.py
-from typing import Any, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Any, List, Optional
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from app import crud, models, schemas, deps
+from app.services import (
+    financial_engine, financial_risk, financial_sensitivity,
+    goal_seek, portfolio, price_curves, production_profile
+)
 
 router = APIRouter()
 
@@ -13,16 +18,24 @@ def create_financial_analysis(
     db: Session = Depends(deps.get_db),
     design_id: int,
     analysis_in: schemas.FinancialAnalysisCreate,
+    force: bool = Query(False, description="Recompute even if an identical analysis exists"),
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Create a basic financial analysis for a design.
     
+    If the design, scenario and inputs are unchanged since a previous
+    analysis (same input fingerprint), that analysis is returned instead of
+    recomputing and becomes the design's latest; ``force=true`` always
+    recomputes.
+    
     This calculates:
     - Total investment (CAPEX)
     - LCOE (Levelized Cost of Energy)
-    - Simple payback period
-    - NPV and IRR (if electricity price provided)
+    - NPV, IRR, payback period and ROI (if electricity price provided;
+      the price escalates with the scenario's electricity_price_escalation)
+    - Debt amount, DSCR and equity IRR (if interest rate and loan term are
+      also provided; with target_dscr the debt is sized to meet it)
     """
     # Obtener el diseño
     design = crud.solar_design.get(db=db, id=design_id)
@@ -57,85 +70,47 @@ def create_financial_analysis(
     if not scenario:
         raise HTTPException(status_code=404, detail="Simulation scenario not found")
     
-    # Calcular CAPEX
-    capacity_mw = design.capacity_mw
-    
-    module_cost = capacity_mw * 1_000_000 * (scenario.module_cost or 0.25)
-    inverter_cost = capacity_mw * 1_000_000 * (scenario.inverter_cost or 0.05)
-    bos_cost = capacity_mw * 1_000_000 * (scenario.bos_cost or 0.15)
-    installation_cost = capacity_mw * 1_000_000 * (scenario.installation_cost or 0.10)
-    
-    total_investment = module_cost + inverter_cost + bos_cost + installation_cost
-    
-    # Calcular costos O&M anuales
-    annual_om_cost = capacity_mw * (scenario.om_cost_per_mw_year or 15000)
-    
-    # Calcular LCOE simplificado
-    # LCOE = (CAPEX + NPV(OPEX)) / NPV(Energía)
-    project_lifetime = 25
-    discount_rate = scenario.discount_rate or 0.08
-    degradation_rate = scenario.annual_degradation or 0.005
-    
-    # NPV de la energía producida
-    total_energy_npv = 0
-    for year in range(1, project_lifetime + 1):
-        annual_energy = design.annual_production_mwh * ((1 - degradation_rate) ** (year - 1))
-        discount_factor = 1 / ((1 + discount_rate) ** year)
-        total_energy_npv += annual_energy * discount_factor
-    
-    # NPV de los costos O&M
-    total_om_npv = 0
-    for year in range(1, project_lifetime + 1):
-        om_cost_year = annual_om_cost * ((1 + (scenario.inflation_rate or 0.03)) ** (year - 1))
-        discount_factor = 1 / ((1 + discount_rate) ** year)
-        total_om_npv += om_cost_year * discount_factor
-    
-    # LCOE en USD/MWh
-    lcoe = (total_investment + total_om_npv) / (total_energy_npv * 1000)  # Convertir a MWh
-    
-    # Flujos de caja simplificados (sin precio de electricidad definido)
-    cash_flows = []
-    cash_flows.append({
-        "year": 0,
-        "investment": -total_investment,
-        "revenue": 0,
-        "opex": 0,
-        "net_cash_flow": -total_investment,
-        "cumulative_cash_flow": -total_investment
-    })
-    
-    cumulative = -total_investment
-    for year in range(1, project_lifetime + 1):
-        annual_energy = design.annual_production_mwh * ((1 - degradation_rate) ** (year - 1))
-        om_cost_year = annual_om_cost * ((1 + (scenario.inflation_rate or 0.03)) ** (year - 1))
-        
-        # Por ahora, no calculamos revenue sin precio de electricidad
-        net_cash_flow = -om_cost_year
-        cumulative += net_cash_flow
-        
-        cash_flows.append({
-            "year": year,
-            "investment": 0,
-            "revenue": 0,
-            "opex": -om_cost_year,
-            "energy_mwh": annual_energy,
-            "net_cash_flow": net_cash_flow,
-            "cumulative_cash_flow": cumulative
-        })
+    # Reutilizar el análisis si nada cambió
+    fingerprint = financial_engine.analysis_fingerprint(
+        design, scenario, analysis_in.model_dump(exclude={"design_id", "scenario_id"})
+    )
+    if not force:
+        existing = crud.financial_analysis.get_by_fingerprint(
+            db=db, design_id=design.id, fingerprint=fingerprint
+        )
+        if existing:
+            # El análisis reutilizado pasa a ser el más reciente del diseño
+            existing = crud.financial_analysis.touch(db=db, db_obj=existing)
+            portfolio.refresh_portfolio(db, project.owner_id)
+            return existing
+    
+    # Evaluar con el motor financiero vectorizado
+    params = financial_engine.scenario_parameters(scenario, design.capacity_mw)
+    params["electricity_price"] = analysis_in.electricity_price
+    params.update(financial_engine.financing_parameters(analysis_in))
+    result = financial_engine.evaluate(
+        design.capacity_mw, design.annual_production_mwh, params
+    )
     
     # Crear análisis financiero
     results = {
-        "total_investment": total_investment,
-        "module_cost": module_cost,
-        "inverter_cost": inverter_cost,
-        "bos_cost": bos_cost,
-        "installation_cost": installation_cost,
-        "lcoe": lcoe,
-        "npv": None,  # Requiere precio de electricidad
-        "irr": None,  # Requiere precio de electricidad
-        "payback_period": None,  # Requiere precio de electricidad
-        "roi": None,  # Requiere precio de electricidad
-        "cash_flows": cash_flows
+        "total_investment": float(result["total_investment"]),
+        "module_cost": float(result["module_cost"]),
+        "inverter_cost": float(result["inverter_cost"]),
+        "bos_cost": float(result["bos_cost"]),
+        "installation_cost": float(result["installation_cost"]),
+        "lcoe": float(result["lcoe"]),
+        # Requieren precio de electricidad (None si no se indicó)
+        "npv": financial_engine.metric(result, "npv"),
+        "irr": financial_engine.metric(result, "irr"),
+        "payback_period": financial_engine.metric(result, "payback_period"),
+        "roi": financial_engine.metric(result, "roi"),
+        # Requieren además tasa y plazo del préstamo
+        "debt_amount": financial_engine.metric(result, "debt_amount"),
+        "min_dscr": financial_engine.metric(result, "min_dscr"),
+        "equity_irr": financial_engine.metric(result, "equity_irr"),
+        "cash_flows": financial_engine.cash_flow_columns(result),
+        "input_fingerprint": fingerprint
     }
     
     financial_analysis = crud.financial_analysis.create(
@@ -144,18 +119,488 @@ def create_financial_analysis(
         results=results
     )
     
+    # Mantener al día el resumen materializado de la cartera
+    portfolio.refresh_portfolio(db, project.owner_id)
+    
     return financial_analysis
 
 
+@router.post("/designs/{design_id}/monte-carlo", response_model=dict)
+def run_monte_carlo_analysis(
+    *,
+    db: Session = Depends(deps.get_db),
+    design_id: int,
+    request_in: schemas.MonteCarloRequest,
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Monte Carlo risk analysis for a design (nothing is stored).
+    
+    Samples CAPEX components, O&M, degradation, discount rate and yield
+    (long-term level and interannual variability) and returns mean, P50,
+    P90, percentiles and histograms for LCOE, CAPEX and, if an electricity
+    price is given, NPV, IRR and payback (plus minimum DSCR, debt and
+    equity IRR when the loan is specified).
+    
+    P90 is the conservative value: exceeded with 90% probability for NPV
+    and IRR, not exceeded with 90% probability for LCOE, CAPEX and payback.
+    """
+    design = crud.solar_design.get(db=db, id=design_id)
+    if not design:
+        raise HTTPException(status_code=404, detail="Design not found")
+    
+    project = crud.project.get(db=db, id=design.project_id)
+    if project.owner_id != current_user.id and not crud.user.is_superuser(current_user):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    if not design.annual_production_mwh:
+        raise HTTPException(
+            status_code=400,
+            detail="Design must be simulated before financial analysis"
+        )
+    
+    if request_in.scenario_id:
+        scenario = crud.simulation_scenario.get(db=db, id=request_in.scenario_id)
+    else:
+        scenario = crud.simulation_scenario.get_default(db)
+    
+    if not scenario:
+        raise HTTPException(status_code=404, detail="Simulation scenario not found")
+    
+    params = financial_engine.scenario_parameters(scenario, design.capacity_mw)
+    params["electricity_price"] = request_in.electricity_price
+    params.update(financial_engine.financing_parameters(request_in))
+    
+    distributions = None
+    if request_in.distributions is not None:
+        distributions = {
+            name: spec.model_dump(exclude_none=True)
+            for name, spec in request_in.distributions.items()
+        }
+    
+    try:
+        result = financial_risk.run_monte_carlo(
+            design.capacity_mw,
+            design.annual_production_mwh,
+            params,
+            draws=request_in.draws,
+            distributions=distributions,
+            yield_uncertainty=request_in.yield_uncertainty,
+            yield_variability=request_in.yield_variability,
+            seed=request_in.seed,
+            workers=request_in.workers,
+            bins=request_in.histogram_bins,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid distribution: {e}")
+    
+    return {
+        "design_id": design.id,
+        "scenario_id": scenario.id,
+        "electricity_price": request_in.electricity_price,
+        **result
+    }
+
+
+@router.get("/designs/{design_id}/financial-sensitivity", response_model=dict)
+def get_financial_sensitivity(
+    *,
+    db: Session = Depends(deps.get_db),
+    design_id: int,
+    scenario_id: Optional[str] = None,
+    electricity_price: Optional[float] = Query(None, gt=0, description="USD/kWh (año 1)"),
+    parameters: Optional[List[str]] = Query(
+        None, description="Parameters to perturb (default: module_cost, bos_cost, "
+        "discount_rate, annual_degradation, annual_production)"
+    ),
+    variation: float = Query(0.2, gt=0, le=0.9, description="Relative range (±)"),
+    steps: int = Query(5, ge=2, le=41, description="Points per parameter"),
+    debt_percentage: float = Query(0.7, ge=0, le=1),
+    interest_rate: Optional[float] = Query(None, ge=0),
+    loan_term_years: Optional[int] = Query(None, gt=0),
+    target_dscr: Optional[float] = Query(None, gt=0),
+    use_cache: bool = True,
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Sensitivity analysis of LCOE (and NPV/IRR if a price is given, plus
+    equity IRR and minimum DSCR if the loan is specified) to the scenario
+    and financing parameters.
+    
+    All perturbations are evaluated in one vectorized batch and nothing is
+    stored; returns tornado data (extremes sorted by swing) and spider-plot
+    curves.
+    """
+    design = crud.solar_design.get(db=db, id=design_id)
+    if not design:
+        raise HTTPException(status_code=404, detail="Design not found")
+    
+    project = crud.project.get(db=db, id=design.project_id)
+    if project.owner_id != current_user.id and not crud.user.is_superuser(current_user):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    if not design.annual_production_mwh:
+        raise HTTPException(
+            status_code=400,
+            detail="Design must be simulated before financial analysis"
+        )
+    
+    if scenario_id:
+        scenario = crud.simulation_scenario.get(db=db, id=scenario_id)
+    else:
+        scenario = crud.simulation_scenario.get_default(db)
+    
+    if not scenario:
+        raise HTTPException(status_code=404, detail="Simulation scenario not found")
+    
+    params = financial_engine.scenario_parameters(scenario, design.capacity_mw)
+    params["electricity_price"] = electricity_price
+    params.update(
+        debt_percentage=debt_percentage,
+        interest_rate=interest_rate,
+        loan_term_years=loan_term_years,
+        target_dscr=target_dscr,
+    )
+    
+    run = (
+        financial_sensitivity.cached_sensitivity if use_cache
+        else financial_sensitivity.run_sensitivity
+    )
+    try:
+        result = run(
+            design.capacity_mw,
+            design.annual_production_mwh,
+            params,
+            parameters or financial_sensitivity.DEFAULT_PARAMETERS,
+            variation,
+            steps,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "design_id": design.id,
+        "scenario_id": scenario.id,
+        "electricity_price": electricity_price,
+        **result
+    }
+
+
+@router.get("/projects/{project_id}/comparison", response_model=dict)
+def compare_project_designs(
+    *,
+    db: Session = Depends(deps.get_db),
+    project_id: int,
+    electricity_price: Optional[float] = Query(None, gt=0, description="USD/kWh (año 1)"),
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Compare every simulated design of a project against every active scenario.
+    
+    Designs and scenarios are loaded once and the whole design x scenario
+    matrix is evaluated as one broadcasted computation; nothing is stored.
+    Each metric is returned as a matrix indexed [design][scenario].
+    """
+    project = crud.project.get(db=db, id=project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if project.owner_id != current_user.id and not crud.user.is_superuser(current_user):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    designs = crud.solar_design.get_multi_by_project(db=db, project_id=project_id, limit=1000)
+    simulated = [d for d in designs if d.annual_production_mwh]
+    scenarios = crud.simulation_scenario.get_multi_active(db=db, limit=1000)
+    
+    if not simulated:
+        raise HTTPException(status_code=400, detail="Project has no simulated designs")
+    if not scenarios:
+        raise HTTPException(status_code=404, detail="No active simulation scenarios")
+    
+    # Diseños en el eje 0, escenarios en el eje 1
+    capacity = np.array([d.capacity_mw for d in simulated], dtype=float)
+    production = np.array([d.annual_production_mwh for d in simulated], dtype=float)[:, None]
+    params = financial_engine.stack_parameters(
+        [financial_engine.scenario_parameters(s, capacity) for s in scenarios]
+    )
+    params = {
+        # Costos escalados: (diseños, escenarios); el resto: (1, escenarios)
+        name: value if value.ndim > 1 else value[None, :]
+        for name, value in params.items() if value is not None
+    }
+    params["electricity_price"] = electricity_price
+    capacity = capacity[:, None]
+    
+    result = financial_engine.evaluate(capacity, production, params)
+    
+    names = ["total_investment", "lcoe"]
+    if electricity_price is not None:
+        names += ["npv", "irr", "payback_period"]
+    shape = (len(simulated), len(scenarios))
+    metrics = {
+        name: [
+            [financial_engine.metric(result, name, (i, j)) for j in range(shape[1])]
+            for i in range(shape[0])
+        ]
+        for name in names
+    }
+    
+    def best(name, maximize=False):
+        values = np.broadcast_to(result[name], shape)
+        if np.isnan(values).all():
+            return None
+        i, j = np.unravel_index(
+            np.nanargmax(values) if maximize else np.nanargmin(values), shape
+        )
+        return {"design_id": simulated[i].id, "scenario_id": scenarios[j].id}
+    
+    ranking = {"lcoe": best("lcoe")}
+    if electricity_price is not None:
+        ranking["npv"] = best("npv", maximize=True)
+        ranking["irr"] = best("irr", maximize=True)
+    
+    return {
+        "project_id": project_id,
+        "electricity_price": electricity_price,
+        "designs": [
+            {"id": d.id, "name": d.name, "capacity_mw": d.capacity_mw}
+            for d in simulated
+        ],
+        "scenarios": [{"id": s.id, "name": s.name} for s in scenarios],
+        "skipped_designs": [d.id for d in designs if not d.annual_production_mwh],
+        "metrics": metrics,
+        "best": ranking,
+    }
+
+
+@router.post("/goal-seek", response_model=dict)
+def run_goal_seek(
+    *,
+    db: Session = Depends(deps.get_db),
+    request_in: schemas.GoalSeekRequest,
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Solve for electricity price, CAPEX/W or capacity so that IRR, equity
+    IRR, NPV, LCOE or minimum DSCR hits a target, for many designs at once.
+    
+    Uses bracketed root-finding where each iteration is one vectorized
+    evaluation of all designs. Nothing is stored.
+    """
+    designs = crud.solar_design.get_multi_by_ids(db=db, ids=request_in.design_ids)
+    missing = set(request_in.design_ids) - {d.id for d in designs}
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Designs not found: {sorted(missing)}")
+    
+    if not crud.user.is_superuser(current_user):
+        projects = crud.project.get_multi_by_ids(db=db, ids=list({d.project_id for d in designs}))
+        if any(p.owner_id != current_user.id for p in projects):
+            raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    unsimulated = [d.id for d in designs if not d.annual_production_mwh]
+    if unsimulated:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Designs must be simulated before financial analysis: {unsimulated}"
+        )
+    
+    if request_in.scenario_id:
+        scenario = crud.simulation_scenario.get(db=db, id=request_in.scenario_id)
+    else:
+        scenario = crud.simulation_scenario.get_default(db)
+    
+    if not scenario:
+        raise HTTPException(status_code=404, detail="Simulation scenario not found")
+    
+    params = financial_engine.scenario_parameters(scenario)
+    params["electricity_price"] = request_in.electricity_price
+    params.update(financial_engine.financing_parameters(request_in))
+    
+    bracket = None
+    if request_in.bracket_low is not None or request_in.bracket_high is not None:
+        default_low, default_high = goal_seek.VARIABLES[request_in.variable]
+        bracket = (
+            default_low if request_in.bracket_low is None else request_in.bracket_low,
+            default_high if request_in.bracket_high is None else request_in.bracket_high,
+        )
+    
+    try:
+        result = goal_seek.goal_seek(
+            np.array([d.capacity_mw for d in designs], dtype=float),
+            np.array([d.annual_production_mwh for d in designs], dtype=float),
+            params,
+            request_in.variable,
+            request_in.target,
+            request_in.target_value,
+            bracket=bracket,
+            scaling=scenario.cost_scaling,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "scenario_id": scenario.id,
+        "variable": request_in.variable,
+        "target": request_in.target,
+        "target_value": request_in.target_value,
+        "iterations": result["iterations"],
+        "results": [
+            {
+                "design_id": d.id,
+                "solution": financial_engine.metric(result, "solution", i),
+                "achieved": financial_engine.metric(result, "achieved", i),
+                "converged": bool(result["converged"][i]),
+            }
+            for i, d in enumerate(designs)
+        ],
+    }
+
+
+@router.post("/price-curves", response_model=schemas.PriceCurve)
+def create_price_curve(
+    *,
+    db: Session = Depends(deps.get_db),
+    curve_in: schemas.PriceCurveCreate,
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Upload an hourly (8760 values) or time-of-use (12x24 weekday/weekend
+    matrices) electricity price curve, in USD/kWh and local time.
+    """
+    try:
+        encoded = price_curves.build_price_curve(
+            curve_in.kind, curve_in.values, curve_in.tou_weekday, curve_in.tou_weekend
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return crud.price_curve.create(
+        db=db, obj_in=curve_in, owner_id=current_user.id, encoded=encoded
+    )
+
+
+@router.get("/price-curves", response_model=List[schemas.PriceCurve])
+def read_price_curves(
+    db: Session = Depends(deps.get_db),
+    skip: int = 0,
+    limit: int = 100,
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Retrieve the current user's price curves.
+    """
+    return crud.price_curve.get_multi_by_owner(
+        db=db, owner_id=current_user.id, skip=skip, limit=limit
+    )
+
+
+@router.get("/projects/{project_id}/price-curve-revenue", response_model=dict)
+def rank_designs_by_price_curve(
+    *,
+    db: Session = Depends(deps.get_db),
+    project_id: int,
+    price_curve_id: int,
+    scenario_id: Optional[str] = None,
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Value every simulated design of a project against an hourly/TOU price curve.
+    
+    Year-1 revenue is the dot product of each design's hourly production
+    with the hourly prices (all designs in one matrix product); the
+    resulting capture price drives the 25-year cash flows (degradation and
+    price escalation) in one batched engine call. Designs are ranked by NPV.
+    Nothing is stored.
+    """
+    project = crud.project.get(db=db, id=project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if project.owner_id != current_user.id and not crud.user.is_superuser(current_user):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    if project.latitude is None or project.longitude is None:
+        raise HTTPException(status_code=400, detail="Project location is required")
+    
+    curve = crud.price_curve.get(db=db, id=price_curve_id)
+    if not curve:
+        raise HTTPException(status_code=404, detail="Price curve not found")
+    if curve.owner_id != current_user.id and not crud.user.is_superuser(current_user):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    if scenario_id:
+        scenario = crud.simulation_scenario.get(db=db, id=scenario_id)
+    else:
+        scenario = crud.simulation_scenario.get_default(db)
+    if not scenario:
+        raise HTTPException(status_code=404, detail="Simulation scenario not found")
+    
+    designs = [
+        d for d in crud.solar_design.get_multi_by_project(db=db, project_id=project_id, limit=1000)
+        if d.annual_production_mwh
+    ]
+    if not designs:
+        raise HTTPException(status_code=400, detail="Project has no simulated designs")
+    
+    try:
+        production, sources = production_profile.hourly_production(
+            db, designs, project.latitude, project.longitude
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    prices = price_curves.hourly_prices(curve, project.longitude)
+    value = price_curves.revenue(production, prices)
+    
+    capacity = np.array([d.capacity_mw for d in designs], dtype=float)
+    params = financial_engine.scenario_parameters(scenario, capacity)
+    params["electricity_price"] = value["capture_price"]
+    result = financial_engine.evaluate(capacity, production.sum(axis=-1), params)
+    
+    rows = [
+        {
+            "design_id": d.id,
+            "name": d.name,
+            "capacity_mw": d.capacity_mw,
+            "profile_source": sources[i],
+            "annual_revenue": financial_engine.metric(value, "annual_revenue", i),
+            "capture_price": financial_engine.metric(value, "capture_price", i),
+            "value_factor": financial_engine.metric(value, "value_factor", i),
+            "lcoe": financial_engine.metric(result, "lcoe", i),
+            "npv": financial_engine.metric(result, "npv", i),
+            "irr": financial_engine.metric(result, "irr", i),
+        }
+        for i, d in enumerate(designs)
+    ]
+    rows.sort(key=lambda r: -np.inf if r["npv"] is None else r["npv"], reverse=True)
+    
+    return {
+        "project_id": project_id,
+        "scenario_id": scenario.id,
+        "price_curve": {
+            "id": curve.id,
+            "name": curve.name,
+            "kind": curve.kind,
+            "average_price": curve.average_price,
+        },
+        "designs": rows,
+    }
+
+
 @router.get("/designs/{design_id}/financial-analysis", response_model=schemas.FinancialAnalysis)
 def get_latest_financial_analysis(
     *,
     db: Session = Depends(deps.get_db),
     design_id: int,
+    fields: Optional[List[str]] = Query(None, description="Cash flow fields to return (default: all)"),
+    year_from: Optional[int] = Query(None, ge=0),
+    year_to: Optional[int] = Query(None, ge=0),
+    include_cash_flows: bool = True,
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Get the latest financial analysis for a design.
+    
+    Cash flows are columnar (one list per field, years 0..N); ``fields``,
+    ``year_from`` and ``year_to`` select a subset, and
+    ``include_cash_flows=false`` leaves them out.
     """
     # Verificar permisos a través del diseño
     design = crud.solar_design.get(db=db, id=design_id)
@@ -171,7 +616,38 @@ def get_latest_financial_analysis(
     if not analysis:
         raise HTTPException(status_code=404, detail="No financial analysis found for this design")
     
-    return analysis
+    try:
+        cash_flows = financial_engine.select_cash_flows(
+            analysis.cash_flows, fields, year_from, year_to
+        ) if include_cash_flows else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        **{column.name: getattr(analysis, column.name) for column in analysis.__table__.columns},
+        "cash_flows": cash_flows,
+    }
+
+
+@router.get("/portfolio", response_model=dict)
+def get_portfolio_rollup(
+    *,
+    db: Session = Depends(deps.get_db),
+    use_cache: bool = True,
+    refresh: bool = False,
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Financial rollup of all the current user's projects.
+    
+    Aggregates the latest analysis of every design: CAPEX, MW, MWh,
+    production-weighted (blended) LCOE and NPV, in total and per project.
+    The materialized summary is refreshed when analyses are created; use
+    refresh=true after other changes (e.g. edited designs).
+    """
+    if refresh:
+        portfolio.refresh_portfolio(db, current_user.id)
+    return portfolio.get_portfolio(db, current_user.id, use_cache=use_cache)
 
 
 @router.get("/capex-estimate", response_model=dict)
@@ -195,21 +671,83 @@ def estimate_capex(
         raise HTTPException(status_code=404, detail="Simulation scenario not found")
     
     # Calcular costos
-    module_cost = capacity_mw * 1_000_000 * (scenario.module_cost or 0.25)
-    inverter_cost = capacity_mw * 1_000_000 * (scenario.inverter_cost or 0.05)
-    bos_cost = capacity_mw * 1_000_000 * (scenario.bos_cost or 0.15)
-    installation_cost = capacity_mw * 1_000_000 * (scenario.installation_cost or 0.10)
-    total = module_cost + inverter_cost + bos_cost + installation_cost
+    capex = financial_engine.capex_breakdown(
+        capacity_mw, financial_engine.scenario_parameters(scenario, capacity_mw)
+    )
+    total = float(capex["total_investment"])
     
     return {
         "capacity_mw": capacity_mw,
         "scenario": scenario.name,
         "breakdown": {
-            "modules": module_cost,
-            "inverters": inverter_cost,
-            "bos": bos_cost,
-            "installation": installation_cost
+            "modules": float(capex["module_cost"]),
+            "inverters": float(capex["inverter_cost"]),
+            "bos": float(capex["bos_cost"]),
+            "installation": float(capex["installation_cost"])
         },
         "total_capex": total,
         "capex_per_watt": total / (capacity_mw * 1_000_000)
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/capex-curve", response_model=dict)
+def get_capex_curve(
+    *,
+    min_capacity_mw: float = Query(..., gt=0),
+    max_capacity_mw: float = Query(..., gt=0),
+    points: int = Query(100, ge=2, le=2000),
+    spacing: str = Query("linear", pattern="^(linear|log)$"),
+    specific_yield: float = Query(
+        1500, gt=0, description="Producción específica año 1 (kWh/kWp) para el LCOE indicativo"
+    ),
+    scale_costs: bool = Query(True, description="Aplicar las curvas de escala del escenario"),
+    scenario_id: Optional[str] = None,
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    CAPEX, CAPEX/W and indicative LCOE over a range of capacities.
+    
+    All points are evaluated in one vectorized call. If the scenario
+    defines cost_scaling (and scale_costs is true), component costs follow
+    its economies-of-scale curves. Series are returned column-wise.
+    """
+    if max_capacity_mw < min_capacity_mw:
+        raise HTTPException(status_code=400, detail="max_capacity_mw must be >= min_capacity_mw")
+    
+    if scenario_id:
+        scenario = crud.simulation_scenario.get(db=db, id=scenario_id)
+    else:
+        scenario = crud.simulation_scenario.get_default(db)
+    
+    if not scenario:
+        raise HTTPException(status_code=404, detail="Simulation scenario not found")
+    
+    space = np.geomspace if spacing == "log" else np.linspace
+    capacity = space(min_capacity_mw, max_capacity_mw, points)
+    
+    scaling = scenario.cost_scaling if scale_costs else None
+    try:
+        params = financial_engine.scenario_parameters(scenario, capacity if scale_costs else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Producción indicativa: MW x kWh/kWp = MWh
+    result = financial_engine.evaluate(capacity, capacity * specific_yield, params)
+    total = result["total_investment"]
+    
+    return {
+        "scenario": scenario.name,
+        "specific_yield": specific_yield,
+        "cost_scaling": scaling,
+        "capacity_mw": capacity.tolist(),
+        "breakdown": {
+            "modules": result["module_cost"].tolist(),
+            "inverters": result["inverter_cost"].tolist(),
+            "bos": result["bos_cost"].tolist(),
+            "installation": result["installation_cost"].tolist(),
+        },
+        "total_capex": total.tolist(),
+        "capex_per_watt": (total / (capacity * 1_000_000)).tolist(),
+        "lcoe": result["lcoe"].tolist(),
+    }
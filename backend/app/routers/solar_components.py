@@ -1,9 +1,10 @@
 # backend/app/routers/solar_components.py
-from typing import Any, List
+from typing import Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app import crud, models, schemas
 from app import deps
+from app.services import compatibility
 
 router = APIRouter()
 
@@ -57,6 +58,7 @@ def create_panel_type(
             detail="Panel model already exists"
         )
     panel = crud.panel_type.create(db=db, obj_in=panel_in)
+    compatibility.index.mark_stale()
     return panel
 
 
@@ -102,6 +104,7 @@ def create_inverter_type(
     Create new inverter type (admin only).
     """
     inverter = crud.inverter_type.create(db=db, obj_in=inverter_in)
+    compatibility.index.mark_stale()
     return inverter
 
 
@@ -145,4 +148,47 @@ def create_scenario(
     Create new simulation scenario (admin only).
     """
     scenario = crud.simulation_scenario.create(db=db, obj_in=scenario_in)
-    return scenario
\ No newline at end of file
+    return scenario
+
+
+@router.put("/scenarios/{scenario_id}", response_model=schemas.SimulationScenario)
+def update_scenario(
+    *,
+    db: Session = Depends(deps.get_db),
+    scenario_id: str,
+    scenario_in: schemas.SimulationScenarioUpdate,
+    current_user: models.User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Update a simulation scenario (admin only).
+    """
+    scenario = crud.simulation_scenario.update(db=db, id=scenario_id, obj_in=scenario_in)
+    if not scenario:
+        raise HTTPException(status_code=404, detail="Simulation scenario not found")
+    return scenario
+
+
+# ========== Compatibilidad panel x inversor ==========
+@router.get("/compatibility", response_model=List[dict])
+def read_compatibility(
+    *,
+    db: Session = Depends(deps.get_db),
+    panel_id: Optional[int] = None,
+    inverter_id: Optional[int] = None,
+    include_incompatible: bool = False,
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Compatible panel/inverter pairs from the precomputed catalog index.
+    
+    Filter by ``panel_id`` and/or ``inverter_id``. Each pair gives the valid
+    modules-per-string range, strings per MPPT and per inverter and the
+    reachable DC/AC ratio range (default design temperatures).
+    """
+    pairs = compatibility.index.query(
+        db, panel_id=panel_id, inverter_id=inverter_id,
+        include_incompatible=include_incompatible
+    )
+    if pairs is None:
+        raise HTTPException(status_code=404, detail="Panel or inverter type not found")
+    return pairs
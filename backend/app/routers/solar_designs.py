@@ -4,6 +4,10 @@ from fastapi import APIRouter, Depends, HTTPException, Query, Body
 from sqlalchemy.orm import Session
 from app import crud, models, schemas
 from app import deps
+from app.services import (
+    compatibility, component_selection, design_validation, financial_engine, production_profile,
+    string_allocation,
+)
 
 router = APIRouter()
 
@@ -227,6 +231,7 @@ def calculate_electrical_configuration(
     This endpoint calculates:
     - Optimal number of modules per string based on voltage constraints
     - Number of strings and inverters needed
+    - Allocation of strings to inverters and MPPT inputs (current and DC limits)
     - Actual DC/AC ratio achieved
     """
     design = crud.solar_design.get(db=db, id=design_id)
@@ -252,64 +257,49 @@ def calculate_electrical_configuration(
     total_panels = int(design.capacity_mw * 1_000_000 / panel.power_watts)
     
     # Calcular módulos por string basado en voltajes
-    # Considerar temperatura mínima (-10°C) para Voc máximo
-    temp_min = -10
-    temp_coeff_voc = panel.temp_coeff_voc or -0.0029  # Valor típico si no está definido
-    voc_at_min_temp = panel.voc * (1 + temp_coeff_voc * (temp_min - 25))
-    
-    # Considerar temperatura máxima (70°C célula) para Vmp mínimo
-    temp_max = 70
-    temp_coeff_vmp = panel.temp_coeff_pmax or -0.0034  # Valor típico
-    vmp_at_max_temp = panel.vmp * (1 + temp_coeff_vmp * (temp_max - 25))
-    
-    # Calcular límites de módulos por string
-    max_modules_per_string = int(inverter.vdc_max / voc_at_min_temp * 0.98)  # 2% margen
-    min_modules_per_string = int(inverter.vdc_min / vmp_at_max_temp * 1.02) + 1  # 2% margen
-    
-    # Usar el valor especificado o calcular el óptimo
+    # (Voc a la mínima ambiente y Vmp a la máxima de célula del sitio)
+    temp_min, temp_max = compatibility.site_temperatures(db, project.latitude, project.longitude)
+    limits = compatibility.design_limits(panel, inverter, temp_min, temp_max)
+    voc_at_min_temp = limits["voc_at_min_temp"]
+    vmp_at_max_temp = limits["vmp_at_max_temp"]
+    max_modules_per_string = limits["max_modules_per_string"]
+    min_modules_per_string = limits["min_modules_per_string"]
+    
+    # Usar el valor especificado (dentro del rango) o elegir el óptimo
+    modules_per_string = None
     if design.modules_per_string:
-        modules_per_string = design.modules_per_string
-        # Validar que esté en rango
-        if modules_per_string > max_modules_per_string:
-            modules_per_string = max_modules_per_string
-        elif modules_per_string < min_modules_per_string:
-            modules_per_string = min_modules_per_string
-    else:
-        # Buscar el valor óptimo cercano a 20-24 módulos
-        target_modules = 22
-        modules_per_string = max(min_modules_per_string, 
-                                min(max_modules_per_string, target_modules))
-    
-    # Calcular strings totales
-    total_strings = total_panels // modules_per_string
-    panels_used = total_strings * modules_per_string
-    
-    # Calcular inversores necesarios basado en el ratio DC/AC objetivo
-    ac_capacity_needed = (panels_used * panel.power_watts) / target_dc_ac_ratio
-    total_inverters = max(1, int(ac_capacity_needed / inverter.power_ac_w + 0.5))
-    
-    # Calcular strings por inversor
-    strings_per_inverter = total_strings // total_inverters
-    if strings_per_inverter == 0:
-        strings_per_inverter = 1
-        total_inverters = total_strings
-    
-    # Verificar límites de MPPT
-    if inverter.mppt_channels and strings_per_inverter > inverter.mppt_channels * 4:
-        # Asumiendo máximo 4 strings por MPPT
-        strings_per_inverter = inverter.mppt_channels * 4
-        total_inverters = max(1, total_strings // strings_per_inverter)
+        modules_per_string = min(max(design.modules_per_string, min_modules_per_string), max_modules_per_string)
+    
+    # Strings por inversor y por MPPT (corriente por entrada, DC máxima, ratio objetivo)
+    try:
+        if not limits["compatible"]:
+            raise ValueError("Panel and inverter are not compatible (no valid string length)")
+        allocation = string_allocation.allocate_strings(
+            total_panels,
+            panel.power_watts,
+            panel.isc,
+            inverter.power_ac_w,
+            inverter.power_dc_max_w,
+            inverter.mppt_channels,
+            limits["max_strings_per_mppt"],
+            min_modules_per_string,
+            max_modules_per_string,
+            target_dc_ac_ratio=target_dc_ac_ratio,
+            modules_per_string=modules_per_string,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    modules_per_string = allocation["modules_per_string"]
+    total_strings = allocation["total_strings"]
+    total_inverters = allocation["total_inverters"]
+    strings_per_inverter = max(g["strings_per_inverter"] for g in allocation["groups"])
     
     # Calcular capacidades finales
-    actual_dc_capacity = panels_used * panel.power_watts / 1_000_000
-    actual_ac_capacity = total_inverters * inverter.power_ac_w / 1_000_000
+    actual_dc_capacity = allocation["dc_w"] / 1_000_000
+    actual_ac_capacity = allocation["ac_w"] / 1_000_000
     actual_dc_ac_ratio = actual_dc_capacity / actual_ac_capacity if actual_ac_capacity > 0 else 0
     
-    # Calcular pérdidas por clipping estimadas
-    clipping_losses = 0
-    if actual_dc_ac_ratio > 1.5:
-        clipping_losses = (actual_dc_ac_ratio - 1.5) * 2  # Aproximación simple
-    
     # Actualizar el diseño con los cálculos
     update_data = schemas.SolarDesignUpdate(
         modules_per_string=modules_per_string,
@@ -322,21 +312,26 @@ def calculate_electrical_configuration(
     return {
         "configuration": {
             "total_panels": total_panels,
-            "panels_used": panels_used,
-            "panels_unused": total_panels - panels_used,
+            "panels_used": allocation["panels_used"],
+            "panels_unused": allocation["panels_unused"],
             "modules_per_string": modules_per_string,
             "total_strings": total_strings,
             "strings_per_inverter": strings_per_inverter,
             "total_inverters": total_inverters,
-            "strings_per_mppt": strings_per_inverter / inverter.mppt_channels if inverter.mppt_channels else None
+            "strings_per_mppt": max(max(g["strings_per_mppt"]) for g in allocation["groups"]),
+            "max_strings_per_mppt": limits["max_strings_per_mppt"]
         },
+        "allocation": allocation["groups"],
         "capacity": {
             "dc_capacity_mw": actual_dc_capacity,
             "ac_capacity_mw": actual_ac_capacity,
             "dc_ac_ratio": round(actual_dc_ac_ratio, 2),
-            "target_dc_ac_ratio": target_dc_ac_ratio
+            "target_dc_ac_ratio": target_dc_ac_ratio,
+            "estimated_clipping_loss": round(allocation["clipping_loss"], 4)
         },
         "voltage_limits": {
+            "design_temp_min": temp_min,
+            "design_temp_max": temp_max,
             "min_modules_per_string": min_modules_per_string,
             "max_modules_per_string": max_modules_per_string,
             "string_voc_min_temp": round(modules_per_string * voc_at_min_temp, 1),
@@ -347,6 +342,87 @@ def calculate_electrical_configuration(
     }
 
 
+@router.get("/designs/{design_id}/component-selection", response_model=dict)
+def select_design_components(
+    *,
+    db: Session = Depends(deps.get_db),
+    design_id: int,
+    rank_by: str = Query("lcoe", pattern="^(lcoe|yield)$"),
+    target_dc_ac_ratio: float = Query(1.25, ge=1.0, le=2.0, description="Target DC/AC ratio"),
+    scenario_id: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Rank the catalog's panel/inverter/string configurations for a design.
+    
+    Every compatible panel/inverter pair is evaluated at every feasible
+    string length for the design's capacity, orientation and site (cached
+    weather), with a fast yield proxy and the scenario's costs. Returns the
+    best configuration of the top pairs by LCOE or annual production.
+    Nothing is changed on the design.
+    """
+    design = crud.solar_design.get(db=db, id=design_id)
+    if not design:
+        raise HTTPException(status_code=404, detail="Design not found")
+    
+    project = crud.project.get(db=db, id=design.project_id)
+    if project.owner_id != current_user.id and not crud.user.is_superuser(current_user):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    if project.latitude is None or project.longitude is None:
+        raise HTTPException(status_code=400, detail="Project location is required")
+    
+    if scenario_id:
+        scenario = crud.simulation_scenario.get(db=db, id=scenario_id)
+    else:
+        scenario = crud.simulation_scenario.get_default(db)
+    if not scenario:
+        raise HTTPException(status_code=404, detail="Simulation scenario not found")
+    
+    # Irradiación en el plano del diseño (misma orientación por defecto que los perfiles)
+    weather = production_profile.site_weather(db, project.latitude, project.longitude)
+    if weather is None:
+        raise HTTPException(status_code=400, detail="No weather data cached for the project location")
+    tilt = design.tilt_angle if design.tilt_angle is not None else abs(project.latitude)
+    azimuth = design.azimuth_angle if design.azimuth_angle is not None else (0 if project.latitude < 0 else 180)
+    site = component_selection.site_factors(
+        weather, project.latitude, project.longitude, tilt, azimuth
+    )
+    
+    performance = (1 - (scenario.system_losses or 0)) * (1 - (scenario.soiling_losses or 0))
+    shortlist = component_selection.select_components(
+        compatibility.index.snapshot(
+            db, *compatibility.site_temperatures(db, project.latitude, project.longitude)
+        ),
+        design.capacity_mw,
+        site,
+        financial_engine.scenario_parameters(scenario, design.capacity_mw),
+        performance,
+        target_dc_ac_ratio=target_dc_ac_ratio,
+        rank_by=rank_by,
+        limit=limit,
+    )
+    
+    panels = {p.id: p for p in crud.panel_type.get_multi_by_ids(
+        db=db, ids=list({c["panel_id"] for c in shortlist}))}
+    inverters = {i.id: i for i in crud.inverter_type.get_multi_by_ids(
+        db=db, ids=list({c["inverter_id"] for c in shortlist}))}
+    for candidate in shortlist:
+        panel = panels[candidate["panel_id"]]
+        inverter = inverters[candidate["inverter_id"]]
+        candidate["panel"] = f"{panel.manufacturer} {panel.model}"
+        candidate["inverter"] = f"{inverter.manufacturer} {inverter.model}"
+    
+    return {
+        "design_id": design.id,
+        "capacity_mw": design.capacity_mw,
+        "scenario": scenario.name,
+        "rank_by": rank_by,
+        "site": site,
+        "candidates": shortlist,
+    }
+
+
 @router.post("/designs/{design_id}/update-area", response_model=schemas.SolarDesign)
 def update_installation_area(
     *,
@@ -412,121 +488,66 @@ def validate_design(
     if project.owner_id != current_user.id and not crud.user.is_superuser(current_user):
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    errors = []
-    warnings = []
-    info = []
-    
-    # Validar componentes
-    if not design.panel_type_id:
-        errors.append("No panel type selected")
-    if not design.inverter_type_id:
-        errors.append("No inverter type selected")
-    
-    # Validar área de instalación
-    if not design.installation_area:
-        warnings.append("No installation area defined - required for shading analysis")
-    
-    # Validar configuración eléctrica si hay componentes
-    if design.panel_type_id and design.inverter_type_id:
+    panels = {}
+    inverters = {}
+    if design.panel_type_id:
         panel = crud.panel_type.get(db=db, id=design.panel_type_id)
+        panels = {panel.id: panel} if panel else {}
+    if design.inverter_type_id:
         inverter = crud.inverter_type.get(db=db, id=design.inverter_type_id)
-        
-        if design.modules_per_string:
-            # Verificar voltajes con temperaturas extremas
-            temp_min = -10
-            temp_max = 70
-            
-            # Voltage checks
-            temp_coeff_voc = panel.temp_coeff_voc or -0.0029
-            voc_at_min_temp = panel.voc * (1 + temp_coeff_voc * (temp_min - 25))
-            string_voc = design.modules_per_string * voc_at_min_temp
-            
-            temp_coeff_vmp = panel.temp_coeff_pmax or -0.0034
-            vmp_at_max_temp = panel.vmp * (1 + temp_coeff_vmp * (temp_max - 25))
-            string_vmp = design.modules_per_string * vmp_at_max_temp
-            
-            if string_voc > inverter.vdc_max:
-                errors.append(
-                    f"String voltage at minimum temperature ({string_voc:.1f}V) "
-                    f"exceeds inverter maximum ({inverter.vdc_max}V)"
-                )
-            if string_vmp < inverter.vdc_min:
-                errors.append(
-                    f"String voltage at maximum temperature ({string_vmp:.1f}V) "
-                    f"is below inverter minimum ({inverter.vdc_min}V)"
-                )
-            
-            # Power checks
-            if design.total_inverters:
-                total_dc_power = design.capacity_mw * 1_000_000
-                total_ac_power = design.total_inverters * inverter.power_ac_w
-                dc_ac_ratio = total_dc_power / total_ac_power if total_ac_power > 0 else 0
-                
-                if dc_ac_ratio > 1.6:
-                    warnings.append(
-                        f"High DC/AC ratio ({dc_ac_ratio:.2f}) may result in "
-                        "significant clipping losses"
-                    )
-                elif dc_ac_ratio < 1.1:
-                    warnings.append(
-                        f"Low DC/AC ratio ({dc_ac_ratio:.2f}) may result in "
-                        "underutilized inverter capacity"
-                    )
-        else:
-            warnings.append("Electrical configuration not calculated")
-    
-    # Validar ángulos
-    if design.tilt_angle is not None:
-        if design.tilt_angle < 0 or design.tilt_angle > 90:
-            errors.append("Tilt angle must be between 0 and 90 degrees")
-        elif abs(project.latitude or 0) > 23.5 and design.tilt_angle == 0:
-            warnings.append(
-                "Zero tilt angle may not be optimal for this latitude"
-            )
-    else:
-        warnings.append("No tilt angle specified")
-    
-    if design.azimuth_angle is not None:
-        if design.azimuth_angle < 0 or design.azimuth_angle >= 360:
-            errors.append("Azimuth angle must be between 0 and 359 degrees")
-        # Hemisferio sur: óptimo es norte (0°)
-        # Hemisferio norte: óptimo es sur (180°)
-        if project.latitude:
-            optimal_azimuth = 0 if project.latitude < 0 else 180
-            azimuth_deviation = abs(design.azimuth_angle - optimal_azimuth)
-            if azimuth_deviation > 45 and azimuth_deviation < 315:
-                info.append(
-                    f"Azimuth angle deviates significantly from optimal "
-                    f"({optimal_azimuth}° for this hemisphere)"
-                )
-    else:
-        warnings.append("No azimuth angle specified")
+        inverters = {inverter.id: inverter} if inverter else {}
     
-    # Información adicional
-    if design.panel_type_id and design.capacity_mw:
-        panel = crud.panel_type.get(db=db, id=design.panel_type_id)
-        total_panels = int(design.capacity_mw * 1_000_000 / panel.power_watts)
-        area_needed = total_panels * panel.area_m2
-        info.append(f"Estimated area needed: {area_needed:,.0f} m² ({area_needed/10000:.2f} hectares)")
+    # Voltajes con las temperaturas extremas del sitio
+    temp_min, temp_max = compatibility.site_temperatures(db, project.latitude, project.longitude)
+    return design_validation.validate_designs(
+        [design], project.latitude, panels, inverters, temp_min, temp_max
+    )[0]
+
+
+@router.post("/projects/{project_id}/designs/validate", response_model=dict)
+def validate_project_designs(
+    *,
+    db: Session = Depends(deps.get_db),
+    project_id: int,
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Validate every design of a project in one pass.
     
-    # Estado de simulación
-    ready_to_simulate = len(errors) == 0 and design.panel_type_id and design.inverter_type_id
+    Designs and their distinct panels and inverters are loaded with one
+    query each and the checks of ``/designs/{id}/validate`` run for all
+    designs at once.
+    """
+    project = crud.project.get(db=db, id=project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if project.owner_id != current_user.id and not crud.user.is_superuser(current_user):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    designs = (
+        db.query(models.SolarDesign)
+        .filter(models.SolarDesign.project_id == project_id)
+        .order_by(models.SolarDesign.id)
+        .all()
+    )
+    panel_ids = list({d.panel_type_id for d in designs if d.panel_type_id})
+    inverter_ids = list({d.inverter_type_id for d in designs if d.inverter_type_id})
+    panels = {p.id: p for p in crud.panel_type.get_multi_by_ids(db=db, ids=panel_ids)} if panel_ids else {}
+    inverters = {
+        i.id: i for i in crud.inverter_type.get_multi_by_ids(db=db, ids=inverter_ids)
+    } if inverter_ids else {}
+    
+    temp_min, temp_max = compatibility.site_temperatures(db, project.latitude, project.longitude)
+    results = design_validation.validate_designs(
+        designs, project.latitude, panels, inverters, temp_min, temp_max
+    )
     
     return {
-        "valid": len(errors) == 0,
-        "ready_to_simulate": ready_to_simulate,
-        "errors": errors,
-        "warnings": warnings,
-        "info": info,
-        "status": design.status,
-        "design_summary": {
-            "name": design.name,
-            "capacity_mw": design.capacity_mw,
-            "panel_selected": bool(design.panel_type_id),
-            "inverter_selected": bool(design.inverter_type_id),
-            "area_defined": bool(design.installation_area),
-            "electrical_configured": bool(design.modules_per_string)
-        }
+        "project_id": project_id,
+        "valid": all(r["valid"] for r in results),
+        "designs": [
+            {"design_id": design.id, **result} for design, result in zip(designs, results)
+        ],
     }
 
 
@@ -1,14 +1,78 @@
 # backend/app/routers/weather.py
 from typing import Any, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 import httpx
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from app import deps, models, schemas
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.config import settings
 from app.database import SessionLocal
+from app.services.weather_encoding import pack_weather_record, unpack_weather_record
+from app.services.weather_quality import QC_VERSION, apply_quality_control
 
 router = APIRouter()
 
+# Tiempo de vida de un registro antes de considerarse obsoleto
+WEATHER_CACHE_TTL = timedelta(days=30)
+
+# Datos servidos por un proveedor de respaldo vencen antes, para volver
+# a intentar con el proveedor solicitado
+WEATHER_FALLBACK_TTL = timedelta(days=1)
+
+# Ubicaciones con un refresco en curso (evita descargas duplicadas)
+_refreshing: set = set()
+
+
+def _is_expired(record: models.WeatherData) -> bool:
+    """Check whether a cached weather record is past its expiry date."""
+    if record.expires_at is None:
+        return True
+    if record.expires_at.tzinfo is not None:
+        return record.expires_at <= datetime.now(timezone.utc)
+    return record.expires_at <= datetime.utcnow()
+
+
+def _cache_ttl(weather_data: dict) -> timedelta:
+    """Cache lifetime for freshly downloaded data."""
+    if weather_data.get("metadata", {}).get("fallback_from"):
+        return WEATHER_FALLBACK_TTL
+    return WEATHER_CACHE_TTL
+
+
+async def refresh_weather_record(
+    record_id: int, latitude: float, longitude: float, source: str
+) -> None:
+    """
+    Download fresh data for an expired record and update the row in place.
+    
+    Runs as a background task; on upstream failure the stale row is kept
+    and the next request schedules another attempt.
+    """
+    key = (latitude, longitude, source)
+    try:
+        try:
+            weather_data = await fetch_weather_data(latitude, longitude, source)
+        except httpx.HTTPStatusError:
+            return
+        if not weather_data:
+            return
+        
+        db = SessionLocal()
+        try:
+            record = db.query(models.WeatherData).filter(
+                models.WeatherData.id == record_id
+            ).first()
+            if record:
+                pack_weather_record(record, weather_data)
+                record.year = datetime.now().year
+                record.expires_at = datetime.utcnow() + _cache_ttl(weather_data)
+                db.commit()
+        finally:
+            db.close()
+    finally:
+        _refreshing.discard(key)
+
 
 @router.get("/location", response_model=dict)
 async def get_weather_data(
@@ -16,6 +80,7 @@ async def get_weather_data(
     latitude: float = Query(..., ge=-90, le=90, description="Latitude"),
     longitude: float = Query(..., ge=-180, le=180, description="Longitude"),
     source: str = Query("pvgis", regex="^(pvgis|openmeteo)$", description="Weather data source"),
+    background_tasks: BackgroundTasks,
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
@@ -24,42 +89,79 @@ async def get_weather_data(
     Sources:
     - pvgis: JRC PVGIS service (European Commission)
     - openmeteo: Open-Meteo API (alternative)
+    
+    Expired records are served immediately (stale-while-revalidate) while
+    a background task refreshes them in place.
     """
     db = SessionLocal()
     
-    # Verificar si tenemos datos en caché
+    # Verificar si tenemos datos en caché (vigentes o vencidos)
     existing = db.query(models.WeatherData).filter(
         models.WeatherData.latitude == round(latitude, 3),
         models.WeatherData.longitude == round(longitude, 3),
-        models.WeatherData.source == source,
-        models.WeatherData.expires_at > datetime.utcnow()
+        models.WeatherData.source == source
     ).first()
     
     if existing:
-        db.close()
-        return {
+        weather_data = unpack_weather_record(existing)
+        
+        # Registros anteriores al control de calidad o a la codificación
+        # binaria se corrigen y recodifican una sola vez
+        metadata = weather_data.get("metadata") or {}
+        if (
+            existing.weather_arrays is None
+            or metadata.get("quality", {}).get("version") != QC_VERSION
+        ):
+            weather_data = apply_quality_control(
+                {**weather_data, "metadata": dict(metadata)},
+                existing.latitude, existing.longitude
+            )
+            pack_weather_record(existing, weather_data)
+            db.commit()
+        
+        stale = _is_expired(existing)
+        if stale:
+            # Servir el registro vencido y refrescarlo en segundo plano
+            key = (existing.latitude, existing.longitude, existing.source)
+            if key not in _refreshing:
+                _refreshing.add(key)
+                background_tasks.add_task(
+                    refresh_weather_record, existing.id, *key
+                )
+        
+        result = {
             "source": existing.source,
             "location": {
                 "latitude": existing.latitude,
                 "longitude": existing.longitude
             },
             "cached": True,
-            "data": existing.weather_data
+            "stale": stale,
+            "data": weather_data
         }
+        db.close()
+        return result
     
     # Obtener nuevos datos
-    weather_data = await fetch_weather_data(latitude, longitude, source)
+    try:
+        weather_data = await fetch_weather_data(latitude, longitude, source)
+    except httpx.HTTPStatusError as e:
+        db.close()
+        raise HTTPException(
+            status_code=400,
+            detail=f"Weather provider rejected the request ({e.response.status_code})"
+        )
     
     if weather_data:
         # Guardar en caché
         new_weather = models.WeatherData(
             latitude=round(latitude, 3),
             longitude=round(longitude, 3),
-            weather_data=weather_data,
             source=source,
             year=datetime.now().year,
-            expires_at=datetime.utcnow() + timedelta(days=30)
+            expires_at=datetime.utcnow() + _cache_ttl(weather_data)
         )
+        pack_weather_record(new_weather, weather_data)
         db.add(new_weather)
         db.commit()
         
@@ -70,6 +172,7 @@ async def get_weather_data(
                 "longitude": longitude
             },
             "cached": False,
+            "stale": False,
             "data": weather_data
         }
         db.close()
@@ -82,113 +185,181 @@ async def get_weather_data(
 async def fetch_weather_data(lat: float, lon: float, source: str) -> Optional[dict]:
     """
     Fetch weather data from external sources.
+    
+    Providers are tried in order (requested source first, then its
+    fallbacks); providers whose circuit breaker is open are skipped
+    without waiting on the network. Only timeouts, connection errors and
+    5xx responses count as provider failures; a 4xx response (e.g. a
+    location the provider does not cover) is re-raised as
+    ``httpx.HTTPStatusError`` without touching the breaker.
     """
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        if source == "pvgis":
-            # PVGIS API v5.2
-            url = "https://re.jrc.ec.europa.eu/api/v5_2/tmy"
-            params = {
-                "lat": lat,
-                "lon": lon,
-                "outputformat": "json",
-                "browser": 0
-            }
+    timeout = httpx.Timeout(
+        settings.WEATHER_READ_TIMEOUT, connect=settings.WEATHER_CONNECT_TIMEOUT
+    )
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        for provider in [source] + PROVIDER_FALLBACKS.get(source, []):
+            breaker = provider_breakers[provider]
+            if not breaker.allow_request():
+                continue
             
             try:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                
-                data = response.json()
-                
-                # Procesar datos de PVGIS
-                hourly_data = data.get("outputs", {}).get("tmy_hourly", [])
-                
-                # Extraer arrays de 8760 valores
-                ghi = []
-                dni = []
-                dhi = []
-                temp_air = []
-                wind_speed = []
-                
-                for hour in hourly_data:
-                    ghi.append(hour.get("G(h)", 0))  # Global horizontal
-                    dni.append(hour.get("Gb(n)", 0))  # Direct normal
-                    dhi.append(hour.get("Gd(h)", 0))  # Diffuse horizontal
-                    temp_air.append(hour.get("T2m", 20))  # Temperature 2m
-                    wind_speed.append(hour.get("WS10m", 2))  # Wind speed 10m
-                
-                return {
-                    "ghi": ghi,
-                    "dni": dni,
-                    "dhi": dhi,
-                    "temp_air": temp_air,
-                    "wind_speed": wind_speed,
-                    "metadata": {
-                        "source": "PVGIS-SARAH2",
-                        "resolution": "hourly",
-                        "years": data.get("inputs", {}).get("meteo_data", {}).get("year_min", "2005-2020")
-                    }
-                }
-                
+                weather_data = await WEATHER_PROVIDERS[provider](client, lat, lon)
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code < 500:
+                    # Petición inválida: el proveedor responde, no es una caída
+                    raise
+                breaker.record_failure()
+                print(f"Error fetching {provider} data: {e}")
+                continue
+            except httpx.TransportError as e:
+                # Timeouts y errores de conexión
+                breaker.record_failure()
+                print(f"Error fetching {provider} data: {e}")
+                continue
             except Exception as e:
-                print(f"Error fetching PVGIS data: {e}")
-                return None
-                
-        elif source == "openmeteo":
-            # Open-Meteo API (alternativa gratuita)
-            url = "https://archive-api.open-meteo.com/v1/archive"
+                # Respuesta inesperada (p. ej. sin datos horarios): probar el siguiente
+                print(f"Invalid {provider} response: {e}")
+                continue
+            finally:
+                # Libera la prueba half-open también si la petición se cancela
+                breaker.release_probe()
             
-            # Obtener datos del año anterior completo
-            last_year = datetime.now().year - 1
-            params = {
-                "latitude": lat,
-                "longitude": lon,
-                "start_date": f"{last_year}-01-01",
-                "end_date": f"{last_year}-12-31",
-                "hourly": "temperature_2m,windspeed_10m,direct_radiation,diffuse_radiation,direct_normal_irradiance",
-                "timezone": "GMT"
-            }
+            breaker.record_success()
+            if provider != source:
+                weather_data["metadata"]["fallback_from"] = source
             
-            try:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                
-                data = response.json()
-                hourly = data.get("hourly", {})
-                
-                # Calcular GHI = DNI * cos(zenith) + DHI
-                # Simplificación: GHI ≈ direct_radiation + diffuse_radiation
-                ghi = []
-                for i in range(len(hourly.get("time", []))):
-                    direct = hourly["direct_radiation"][i] or 0
-                    diffuse = hourly["diffuse_radiation"][i] or 0
-                    ghi.append(direct + diffuse)
-                
-                return {
-                    "ghi": ghi,
-                    "dni": hourly.get("direct_normal_irradiance", []),
-                    "dhi": hourly.get("diffuse_radiation", []),
-                    "temp_air": hourly.get("temperature_2m", []),
-                    "wind_speed": hourly.get("windspeed_10m", []),
-                    "metadata": {
-                        "source": "Open-Meteo",
-                        "resolution": "hourly",
-                        "year": last_year
-                    }
-                }
-                
-            except Exception as e:
-                print(f"Error fetching Open-Meteo data: {e}")
-                return None
+            # Control de calidad y relleno de huecos una sola vez, al ingerir
+            return apply_quality_control(weather_data, lat, lon)
     
     return None
 
 
+async def _fetch_pvgis(client: httpx.AsyncClient, lat: float, lon: float) -> dict:
+    """Download a TMY from PVGIS API v5.2."""
+    params = {
+        "lat": lat,
+        "lon": lon,
+        "outputformat": "json",
+        "browser": 0
+    }
+    
+    response = await client.get(settings.PVGIS_URL, params=params)
+    response.raise_for_status()
+    
+    data = response.json()
+    
+    # Procesar datos de PVGIS
+    hourly_data = data.get("outputs", {}).get("tmy_hourly", [])
+    if not hourly_data:
+        raise ValueError("PVGIS response has no hourly data")
+    
+    # Extraer arrays de 8760 valores
+    ghi = []
+    dni = []
+    dhi = []
+    temp_air = []
+    wind_speed = []
+    
+    # Los valores ausentes quedan como None y se rellenan en el control de calidad
+    for hour in hourly_data:
+        ghi.append(hour.get("G(h)"))  # Global horizontal
+        dni.append(hour.get("Gb(n)"))  # Direct normal
+        dhi.append(hour.get("Gd(h)"))  # Diffuse horizontal
+        temp_air.append(hour.get("T2m"))  # Temperature 2m
+        wind_speed.append(hour.get("WS10m"))  # Wind speed 10m
+    
+    return {
+        "ghi": ghi,
+        "dni": dni,
+        "dhi": dhi,
+        "temp_air": temp_air,
+        "wind_speed": wind_speed,
+        "metadata": {
+            "source": "PVGIS-SARAH2",
+            "resolution": "hourly",
+            "years": data.get("inputs", {}).get("meteo_data", {}).get("year_min", "2005-2020")
+        }
+    }
+
+
+async def _fetch_openmeteo(client: httpx.AsyncClient, lat: float, lon: float) -> dict:
+    """Download last year's hourly archive from Open-Meteo."""
+    # Obtener datos del año anterior completo
+    last_year = datetime.now().year - 1
+    params = {
+        "latitude": lat,
+        "longitude": lon,
+        "start_date": f"{last_year}-01-01",
+        "end_date": f"{last_year}-12-31",
+        "hourly": "temperature_2m,windspeed_10m,direct_radiation,diffuse_radiation,direct_normal_irradiance",
+        "timezone": "GMT"
+    }
+    
+    response = await client.get(settings.OPENMETEO_URL, params=params)
+    response.raise_for_status()
+    
+    data = response.json()
+    hourly = data.get("hourly", {})
+    if not hourly.get("time"):
+        raise ValueError("Open-Meteo response has no hourly data")
+    
+    # Calcular GHI = DNI * cos(zenith) + DHI
+    # Simplificación: GHI ≈ direct_radiation + diffuse_radiation
+    # (None si falta alguna componente; se rellena en el control de calidad)
+    ghi = []
+    for i in range(len(hourly.get("time", []))):
+        direct = hourly["direct_radiation"][i]
+        diffuse = hourly["diffuse_radiation"][i]
+        ghi.append(None if direct is None or diffuse is None else direct + diffuse)
+    
+    return {
+        "ghi": ghi,
+        "dni": hourly.get("direct_normal_irradiance", []),
+        "dhi": hourly.get("diffuse_radiation", []),
+        "temp_air": hourly.get("temperature_2m", []),
+        "wind_speed": hourly.get("windspeed_10m", []),
+        "metadata": {
+            "source": "Open-Meteo",
+            "resolution": "hourly",
+            "year": last_year
+        }
+    }
+
+
+# Proveedores disponibles y orden de respaldo
+WEATHER_PROVIDERS = {
+    "pvgis": _fetch_pvgis,
+    "openmeteo": _fetch_openmeteo,
+}
+
+PROVIDER_FALLBACKS = {
+    "pvgis": ["openmeteo"],
+    "openmeteo": ["pvgis"],
+}
+
+provider_breakers = {
+    name: CircuitBreaker(name) for name in WEATHER_PROVIDERS
+}
+
+
+@router.get("/providers/status", response_model=dict)
+def get_providers_status(
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Circuit breaker state and counters for each upstream weather provider.
+    """
+    return {
+        "providers": [breaker.metrics() for breaker in provider_breakers.values()]
+    }
+
+
 @router.get("/test/{project_id}", response_model=dict)
 async def test_weather_for_project(
     *,
     db: Session = Depends(deps.get_db),
     project_id: int,
+    background_tasks: BackgroundTasks,
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
@@ -211,6 +382,7 @@ async def test_weather_for_project(
         latitude=project.latitude,
         longitude=project.longitude,
         source="pvgis",
+        background_tasks=background_tasks,
         current_user=current_user
     )
     
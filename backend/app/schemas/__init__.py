@@ -8,8 +8,10 @@ from .solar_schemas import (
     PanelType, PanelTypeCreate, PanelTypeUpdate,
     InverterType, InverterTypeCreate,
     SolarDesign, SolarDesignCreate, SolarDesignUpdate,
-    SimulationScenario, SimulationScenarioCreate,
+    CostScaling, SimulationScenario, SimulationScenarioCreate, SimulationScenarioUpdate,
     FinancialAnalysis, FinancialAnalysisCreate,
+    DistributionSpec, MonteCarloRequest, GoalSeekRequest,
+    PriceCurve, PriceCurveCreate,
     SimulationRequest, SimulationResponse, DesignWithSimulation
 )
 
@@ -24,7 +26,9 @@ __all__ = [
     "PanelType", "PanelTypeCreate", "PanelTypeUpdate",
     "InverterType", "InverterTypeCreate",
     "SolarDesign", "SolarDesignCreate", "SolarDesignUpdate",
-    "SimulationScenario", "SimulationScenarioCreate",
+    "CostScaling", "SimulationScenario", "SimulationScenarioCreate", "SimulationScenarioUpdate",
     "FinancialAnalysis", "FinancialAnalysisCreate",
+    "DistributionSpec", "MonteCarloRequest", "GoalSeekRequest",
+    "PriceCurve", "PriceCurveCreate",
     "SimulationRequest", "SimulationResponse", "DesignWithSimulation"
 ]
\ No newline at end of file
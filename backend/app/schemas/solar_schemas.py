@@ -1,6 +1,6 @@
 # backend/app/schemas/solar_schemas.py
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 from pydantic import BaseModel, Field, ConfigDict
 
 
@@ -56,6 +56,7 @@ class InverterTypeBase(BaseModel):
     efficiency_euro: Optional[float] = Field(None, gt=0, le=1)
     efficiency_cec: Optional[float] = Field(None, gt=0, le=1)
     mppt_channels: int = 1
+    max_current_per_mppt: Optional[float] = Field(None, gt=0)
     phases: int = Field(3, ge=1, le=3)
     datasheet_url: Optional[str] = None
 
@@ -123,6 +124,18 @@ class SolarDesign(SolarDesignBase):
 
 
 # ========== Simulation Scenario Schemas ==========
+class CostScaling(BaseModel):
+    """Costo(C) = costo del escenario x (C / capacidad de referencia) ^ -exponente"""
+    reference_capacity_mw: float = Field(..., gt=0)
+    exponents: Dict[
+        Literal["module_cost", "inverter_cost", "bos_cost", "installation_cost", "om_cost_per_mw_year"],
+        float
+    ] = Field(
+        default_factory=dict,
+        description="Por componente: module_cost, inverter_cost, bos_cost, installation_cost, om_cost_per_mw_year"
+    )
+
+
 class SimulationScenarioBase(BaseModel):
     id: str
     name: str
@@ -138,6 +151,13 @@ class SimulationScenarioBase(BaseModel):
     bos_cost: Optional[float] = None
     installation_cost: Optional[float] = None
     om_cost_per_mw_year: Optional[float] = None
+    cost_scaling: Optional[CostScaling] = None
+    tax_rate: Optional[float] = Field(None, ge=0, le=1)
+    depreciation_method: Optional[str] = Field("straight_line", pattern="^(straight_line|macrs_5|macrs_7|macrs_15|macrs_20)$")
+    depreciation_years: Optional[int] = Field(20, gt=0, le=50)
+    itc_rate: Optional[float] = Field(None, ge=0, le=1)
+    ptc_rate: Optional[float] = Field(None, ge=0)  # USD/kWh
+    ptc_years: Optional[int] = Field(10, gt=0, le=50)
     is_active: bool = True
     is_default: bool = False
 
@@ -146,6 +166,31 @@ class SimulationScenarioCreate(SimulationScenarioBase):
     pass
 
 
+class SimulationScenarioUpdate(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+    system_losses: Optional[float] = None
+    annual_degradation: Optional[float] = None
+    soiling_losses: Optional[float] = None
+    discount_rate: Optional[float] = None
+    inflation_rate: Optional[float] = None
+    electricity_price_escalation: Optional[float] = None
+    module_cost: Optional[float] = None
+    inverter_cost: Optional[float] = None
+    bos_cost: Optional[float] = None
+    installation_cost: Optional[float] = None
+    om_cost_per_mw_year: Optional[float] = None
+    cost_scaling: Optional[CostScaling] = None
+    tax_rate: Optional[float] = Field(None, ge=0, le=1)
+    depreciation_method: Optional[str] = Field(None, pattern="^(straight_line|macrs_5|macrs_7|macrs_15|macrs_20)$")
+    depreciation_years: Optional[int] = Field(None, gt=0, le=50)
+    itc_rate: Optional[float] = Field(None, ge=0, le=1)
+    ptc_rate: Optional[float] = Field(None, ge=0)
+    ptc_years: Optional[int] = Field(None, gt=0, le=50)
+    is_active: Optional[bool] = None
+    is_default: Optional[bool] = None
+
+
 class SimulationScenario(SimulationScenarioBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
@@ -160,6 +205,12 @@ class FinancialAnalysisBase(BaseModel):
     debt_percentage: float = Field(0.7, ge=0, le=1)
     interest_rate: Optional[float] = Field(None, ge=0)
     loan_term_years: Optional[int] = Field(None, gt=0)
+    target_dscr: Optional[float] = Field(
+        None, gt=0, description="DSCR mínimo objetivo; limita la deuda si se indica"
+    )
+    electricity_price: Optional[float] = Field(
+        None, gt=0, description="Precio de venta de energía en USD/kWh (año 1)"
+    )
 
 
 class FinancialAnalysisCreate(FinancialAnalysisBase):
@@ -178,7 +229,79 @@ class FinancialAnalysis(FinancialAnalysisBase):
     irr: Optional[float] = None
     payback_period: Optional[float] = None
     roi: Optional[float] = None
-    cash_flows: Optional[List[Dict[str, Any]]] = None
+    debt_amount: Optional[float] = None
+    min_dscr: Optional[float] = None
+    equity_irr: Optional[float] = None
+    cash_flows: Optional[Dict[str, List[Any]]] = None  # Una lista por campo, años 0..N
+    input_fingerprint: Optional[str] = None
+    created_at: datetime
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+# ========== Financial Risk Schemas ==========
+class DistributionSpec(BaseModel):
+    """Distribución de un parámetro como multiplicador de su valor en el escenario"""
+    distribution: str = Field('normal', pattern='^(normal|lognormal|triangular|uniform)$')
+    std: Optional[float] = Field(None, ge=0, description="Desviación relativa (normal/lognormal)")
+    low: Optional[float] = Field(None, ge=0, description="Multiplicador mínimo (triangular/uniform)")
+    mode: float = Field(1.0, ge=0, description="Multiplicador más probable (triangular)")
+    high: Optional[float] = Field(None, ge=0, description="Multiplicador máximo (triangular/uniform)")
+
+
+class MonteCarloRequest(BaseModel):
+    scenario_id: Optional[str] = None
+    electricity_price: Optional[float] = Field(None, gt=0, description="USD/kWh (año 1)")
+    debt_percentage: float = Field(0.7, ge=0, le=1)
+    interest_rate: Optional[float] = Field(None, ge=0)
+    loan_term_years: Optional[int] = Field(None, gt=0)
+    target_dscr: Optional[float] = Field(None, gt=0)
+    draws: int = Field(100_000, ge=100, le=1_000_000)
+    seed: Optional[int] = None
+    workers: int = Field(1, ge=1, le=32, description="Procesos para repartir los bloques (tope: MONTE_CARLO_MAX_WORKERS)")
+    histogram_bins: int = Field(50, ge=5, le=500)
+    distributions: Optional[Dict[str, DistributionSpec]] = None  # None = distribuciones por defecto
+    yield_uncertainty: float = Field(0.05, ge=0, le=1, description="Incertidumbre del P50 de producción")
+    yield_variability: float = Field(0.04, ge=0, le=1, description="Variabilidad interanual de producción")
+
+
+class GoalSeekRequest(BaseModel):
+    design_ids: List[int] = Field(..., min_length=1, max_length=1000)
+    scenario_id: Optional[str] = None
+    variable: str = Field('electricity_price', pattern='^(electricity_price|capex_per_w|capacity_mw)$')
+    target: str = Field('irr', pattern='^(irr|equity_irr|npv|lcoe|min_dscr)$')
+    target_value: float = Field(..., description="IRR como fracción (0.1 = 10%), NPV en USD, LCOE en USD/kWh")
+    electricity_price: Optional[float] = Field(None, gt=0, description="USD/kWh; requerido salvo que se resuelva el precio")
+    debt_percentage: float = Field(0.7, ge=0, le=1)
+    interest_rate: Optional[float] = Field(None, ge=0)
+    loan_term_years: Optional[int] = Field(None, gt=0)
+    target_dscr: Optional[float] = Field(None, gt=0)
+    bracket_low: Optional[float] = None
+    bracket_high: Optional[float] = None
+
+
+# ========== Price Curve Schemas ==========
+class PriceCurveBase(BaseModel):
+    name: str
+    description: Optional[str] = None
+    kind: str = Field('hourly', pattern='^(hourly|tou)$')
+    utc_offset_hours: Optional[float] = Field(
+        None, ge=-12, le=14, description="Huso horario de la curva; None = según longitud del proyecto"
+    )
+
+
+class PriceCurveCreate(PriceCurveBase):
+    values: Optional[List[float]] = Field(None, description="8760 (u 8784) precios horarios en USD/kWh, hora local")
+    tou_weekday: Optional[List[List[float]]] = Field(None, description="Matriz 12 meses x 24 horas (USD/kWh)")
+    tou_weekend: Optional[List[List[float]]] = Field(None, description="Igual que tou_weekday; por defecto la misma")
+
+
+class PriceCurve(PriceCurveBase):
+    id: int
+    owner_id: int
+    average_price: Optional[float] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
     created_at: datetime
     
     model_config = ConfigDict(from_attributes=True)
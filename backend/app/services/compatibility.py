@@ -0,0 +1,358 @@
+# backend/app/services/compatibility.py
+"""
+Panel x inverter compatibility: string voltage windows and the catalog-wide
+compatibility index.
+
+String limits are computed for whole arrays of panels and inverters at once
+(outer product, panels on the first axis). The index keeps them for the
+full ``PanelType`` x ``InverterType`` catalog in memory; catalog writes bump
+the shared ``catalog`` version stamp and each worker then recomputes only
+the rows and columns of the panels and inverters that changed.
+
+Design temperatures default to -10 °C / 70 °C; ``site_temperatures`` gives
+the extremes of a project site from its cached weather instead.
+"""
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.cache_version import get_version
+from app.core.config import settings
+from app.crud.solar import CATALOG_VERSION_NAME
+from app.models import InverterType, PanelType, WeatherData
+from app.services.production_profile import WEATHER_SOURCES
+from app.services.weather_encoding import decode_weather_arrays
+from app.services.weather_quality import design_temperatures
+
+# Temperaturas de diseño por defecto (°C): mínima ambiente para Voc, máxima de célula para Vmp
+DESIGN_TEMP_MIN = -10
+DESIGN_TEMP_MAX = 70
+
+# Coeficientes típicos si el panel no los define (1/°C)
+DEFAULT_TEMP_COEFF_VOC = -0.0029
+DEFAULT_TEMP_COEFF_VMP = -0.0034
+
+VOLTAGE_MARGIN = 0.02  # 2% de margen en ambos extremos de la ventana MPPT
+MAX_STRINGS_PER_MPPT = 4  # Si el inversor o el panel no definen corrientes
+
+# Solapamiento al buscar cambios: cubre la resolución de los timestamps y
+# transacciones confirmadas después de iniciadas (recalcular de más es barato)
+SYNC_OVERLAP = timedelta(seconds=5)
+
+PANEL_FIELDS = (
+    "power_watts", "voc", "vmp", "isc", "temp_coeff_voc", "temp_coeff_pmax", "efficiency", "noct",
+)
+INVERTER_FIELDS = (
+    "power_ac_w", "power_dc_max_w", "vdc_min", "vdc_max", "mppt_channels", "efficiency_euro", "efficiency_max",
+    "max_current_per_mppt",
+)
+
+
+def panel_features(panels: List) -> np.ndarray:
+    """``(n, len(PANEL_FIELDS))`` array; missing temperature coefficients get typical values."""
+    features = np.array(
+        [[getattr(p, name) for name in PANEL_FIELDS] for p in panels], dtype=float
+    ).reshape(len(panels), len(PANEL_FIELDS))
+    return fill_panel_defaults(features)
+
+
+def fill_panel_defaults(features: np.ndarray) -> np.ndarray:
+    """Typical temperature coefficients where a ``PANEL_FIELDS`` array has NaN."""
+    features[:, 4] = np.where(np.isnan(features[:, 4]), DEFAULT_TEMP_COEFF_VOC, features[:, 4])
+    features[:, 5] = np.where(np.isnan(features[:, 5]), DEFAULT_TEMP_COEFF_VMP, features[:, 5])
+    return features
+
+
+def inverter_features(inverters: List) -> np.ndarray:
+    """``(m, len(INVERTER_FIELDS))`` array; a missing MPPT count means one channel."""
+    features = np.array(
+        [[getattr(i, name) for name in INVERTER_FIELDS] for i in inverters], dtype=float
+    ).reshape(len(inverters), len(INVERTER_FIELDS))
+    features[:, 4] = np.where(np.isnan(features[:, 4]) | (features[:, 4] < 1), 1, features[:, 4])
+    return features
+
+
+def string_voltages(panels: np.ndarray, temp_min=DESIGN_TEMP_MIN, temp_max=DESIGN_TEMP_MAX) -> Dict[str, np.ndarray]:
+    """Module Voc at the minimum temperature and Vmp at the maximum, per panel row."""
+    voc, vmp, coeff_voc, coeff_vmp = panels[:, 1], panels[:, 2], panels[:, 4], panels[:, 5]
+    return {
+        "voc_at_min_temp": voc * (1 + coeff_voc * (np.asarray(temp_min) - 25)),
+        "vmp_at_max_temp": vmp * (1 + coeff_vmp * (np.asarray(temp_max) - 25)),
+    }
+
+
+def pair_limits(
+    panels: np.ndarray,
+    inverters: np.ndarray,
+    temp_min=DESIGN_TEMP_MIN,
+    temp_max=DESIGN_TEMP_MAX,
+) -> Dict[str, np.ndarray]:
+    """
+    String limits of every panel x inverter pair, arrays of shape ``(n, m)``:
+    modules-per-string range, strings per MPPT and inverter, DC/AC ratio range
+    and whether the pair is compatible at all (non-empty voltage window and
+    at least one string per MPPT). Strings per MPPT are limited by the
+    input's current rating over the panel Isc when both are known.
+    """
+    voltages = string_voltages(panels, temp_min, temp_max)
+    voc_cold = voltages["voc_at_min_temp"][:, None]
+    vmp_hot = voltages["vmp_at_max_temp"][:, None]
+    power = panels[:, 0][:, None]
+    isc = panels[:, 3][:, None]
+    power_ac, power_dc_max, vdc_min, vdc_max, mppt = (inverters[:, k][None, :] for k in range(5))
+    mppt_current = inverters[:, 7][None, :]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        max_modules = np.floor(vdc_max / voc_cold * (1 - VOLTAGE_MARGIN))
+        min_modules = np.floor(vdc_min / vmp_hot * (1 + VOLTAGE_MARGIN)) + 1
+        valid = np.isfinite(max_modules) & np.isfinite(min_modules)
+
+        by_current = np.floor(mppt_current / isc)
+        strings_per_mppt = np.where(np.isfinite(by_current), by_current, MAX_STRINGS_PER_MPPT).astype(int)
+        compatible = valid & (min_modules <= max_modules) & (max_modules >= 1) & (strings_per_mppt >= 1)
+
+        max_strings = mppt * strings_per_mppt
+        dc_min = min_modules * power  # Un string de longitud mínima
+        dc_max = np.minimum(power_dc_max, max_strings * max_modules * power)
+
+        return {
+            "compatible": compatible,
+            "min_modules_per_string": np.where(valid, min_modules, 0).astype(int),
+            "max_modules_per_string": np.where(valid, max_modules, 0).astype(int),
+            "max_strings_per_mppt": strings_per_mppt,
+            "max_strings_per_inverter": max_strings.astype(int),
+            "min_dc_ac_ratio": np.where(compatible, dc_min / power_ac, np.nan),
+            "max_dc_ac_ratio": np.where(compatible, dc_max / power_ac, np.nan),
+        }
+
+
+def design_limits(panel, inverter, temp_min=DESIGN_TEMP_MIN, temp_max=DESIGN_TEMP_MAX) -> Dict:
+    """``pair_limits`` of one panel and inverter as plain values, plus the module voltages."""
+    panels = panel_features([panel])
+    limits = pair_limits(panels, inverter_features([inverter]), temp_min, temp_max)
+    voltages = string_voltages(panels, temp_min, temp_max)
+    return {
+        **{name: values[0, 0].item() for name, values in limits.items()},
+        **{name: float(values[0]) for name, values in voltages.items()},
+    }
+
+
+def site_temperatures(db: Session, latitude: Optional[float], longitude: Optional[float]) -> Tuple[float, float]:
+    """
+    Design temperatures ``(temp_min, temp_max)`` of a site: record-low
+    ambient and high cell-temperature percentile from the cached weather
+    (``metadata["design_temperatures"]``), or the defaults without weather.
+
+    Records cached before the statistic existed get it computed from their
+    arrays and stored once.
+    """
+    if latitude is None or longitude is None:
+        return DESIGN_TEMP_MIN, DESIGN_TEMP_MAX
+    for source in WEATHER_SOURCES:
+        record = db.query(WeatherData).filter(
+            WeatherData.latitude == round(latitude, 3),
+            WeatherData.longitude == round(longitude, 3),
+            WeatherData.source == source
+        ).first()
+        if record is None:
+            continue
+        metadata = (record.weather_data or {}).get("metadata") or {}
+        if "design_temperatures" not in metadata:
+            if record.weather_arrays is not None:
+                arrays = decode_weather_arrays(record.weather_arrays, ("ghi", "temp_air"))
+            else:
+                arrays = {name: record.weather_data.get(name) or [] for name in ("ghi", "temp_air")}
+            temperatures = design_temperatures(
+                np.asarray(arrays.get("ghi", []), dtype=float),
+                np.asarray(arrays.get("temp_air", []), dtype=float),
+            )
+            if temperatures is None:
+                continue
+            metadata = {**metadata, "design_temperatures": temperatures}
+            record.weather_data = {**record.weather_data, "metadata": metadata}
+            db.commit()
+        temperatures = metadata["design_temperatures"]
+        return temperatures["temp_min"], temperatures["temp_max"]
+    return DESIGN_TEMP_MIN, DESIGN_TEMP_MAX
+
+
+class CompatibilityIndex:
+    """
+    In-process panel x inverter limits for the whole catalog.
+
+    Checked against the ``catalog`` version stamp at most every
+    COMPATIBILITY_CHECK_SECONDS; when it moved, only panels and inverters
+    created or updated since the last sync are recomputed. Rebuilt from
+    scratch after COMPATIBILITY_MAX_AGE_SECONDS.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._loaded_at = 0.0
+        self._synced_until = None  # Último created_at/updated_at visto (reloj de la base)
+        self._reset()
+
+    def _reset(self):
+        self.panel_ids = np.empty(0, dtype=int)
+        self.inverter_ids = np.empty(0, dtype=int)
+        self._panel_pos: Dict[int, int] = {}
+        self._inverter_pos: Dict[int, int] = {}
+        self._panels = np.empty((0, len(PANEL_FIELDS)))
+        self._inverters = np.empty((0, len(INVERTER_FIELDS)))
+        # Matrices 0x0: un catálogo vacío responde sin casos especiales
+        self.limits: Dict[str, np.ndarray] = pair_limits(self._panels, self._inverters)
+
+    def _changed(self, db: Session, model, since):
+        changed_at = func.coalesce(model.updated_at, model.created_at)
+        query = db.query(model, changed_at)
+        if since is not None:
+            query = query.filter(changed_at >= since - SYNC_OVERLAP)
+        return query.order_by(model.id).all()
+
+    @staticmethod
+    def _upsert(ids, positions, features, rows, new_features):
+        """Replace or append rows; returns the arrays and the touched positions."""
+        existing = [k for k, row in enumerate(rows) if row.id in positions]
+        added = [k for k, row in enumerate(rows) if row.id not in positions]
+        touched = [positions[rows[k].id] for k in existing]
+        features[touched] = new_features[existing]
+
+        start = len(ids)
+        for offset, k in enumerate(added):
+            positions[rows[k].id] = start + offset
+        touched.extend(range(start, start + len(added)))
+        ids = np.concatenate([ids, np.array([rows[k].id for k in added], dtype=int)])
+        features = np.vstack([features, new_features[added]])
+        return ids, features, np.array(touched, dtype=int)
+
+    def _sync(self, db: Session, since) -> None:
+        panels = self._changed(db, PanelType, since)
+        inverters = self._changed(db, InverterType, since)
+        if not panels and not inverters:
+            return
+
+        old_shape = (len(self.panel_ids), len(self.inverter_ids))
+        self.panel_ids, self._panels, touched_panels = self._upsert(
+            self.panel_ids, self._panel_pos, self._panels,
+            [p for p, _ in panels], panel_features([p for p, _ in panels]),
+        )
+        self.inverter_ids, self._inverters, touched_inverters = self._upsert(
+            self.inverter_ids, self._inverter_pos, self._inverters,
+            [i for i, _ in inverters], inverter_features([i for i, _ in inverters]),
+        )
+
+        # Conservar lo calculado y recalcular solo filas/columnas tocadas
+        shape = (len(self.panel_ids), len(self.inverter_ids))
+        previous, self.limits = self.limits, {}
+        for name, matrix in previous.items():
+            self.limits[name] = np.zeros(shape, dtype=matrix.dtype)
+            self.limits[name][:old_shape[0], :old_shape[1]] = matrix
+        if len(touched_panels):
+            for name, block in pair_limits(self._panels[touched_panels], self._inverters).items():
+                self.limits[name][touched_panels, :] = block
+        if len(touched_inverters):
+            for name, block in pair_limits(self._panels, self._inverters[touched_inverters]).items():
+                self.limits[name][:, touched_inverters] = block
+
+        stamps = [changed for _, changed in panels + inverters if changed is not None]
+        if stamps:
+            self._synced_until = max(stamps + ([self._synced_until] if self._synced_until else []))
+
+    def ensure(self, db: Session) -> "CompatibilityIndex":
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < settings.COMPATIBILITY_CHECK_SECONDS:
+            return self
+
+        with self._lock:
+            version = get_version(db, CATALOG_VERSION_NAME)
+            self._checked_at = now
+            if self._version is None or now - self._loaded_at >= settings.COMPATIBILITY_MAX_AGE_SECONDS:
+                self._reset()
+                self._synced_until = None
+                self._sync(db, None)
+                self._loaded_at = now
+            elif version != self._version:
+                self._sync(db, self._synced_until)
+            self._version = version
+        return self
+
+    def snapshot(self, db: Session, temp_min=DESIGN_TEMP_MIN, temp_max=DESIGN_TEMP_MAX) -> Dict[str, np.ndarray]:
+        """
+        Current catalog arrays (ids, ``*_FIELDS`` features) and pair limits;
+        with site temperatures the limits are recomputed for them.
+        """
+        self.ensure(db)
+        with self._lock:
+            snapshot = {
+                "panel_ids": self.panel_ids,
+                "inverter_ids": self.inverter_ids,
+                "panels": self._panels.copy(),
+                "inverters": self._inverters.copy(),
+                "limits": dict(self.limits),
+            }
+        if (temp_min, temp_max) != (DESIGN_TEMP_MIN, DESIGN_TEMP_MAX) and len(snapshot["panel_ids"]):
+            snapshot["limits"] = pair_limits(snapshot["panels"], snapshot["inverters"], temp_min, temp_max)
+        return snapshot
+
+    def mark_stale(self) -> None:
+        """Check the version stamp (and sync the changes) on the next query."""
+        self._checked_at = 0.0
+
+    def invalidate(self) -> None:
+        """Force a full rebuild on the next query."""
+        with self._lock:
+            self._version = None
+
+    def query(
+        self,
+        db: Session,
+        panel_id: Optional[int] = None,
+        inverter_id: Optional[int] = None,
+        include_incompatible: bool = False,
+    ) -> Optional[List[Dict]]:
+        """
+        Limits of the pairs involving ``panel_id`` and/or ``inverter_id``
+        (all pairs if neither is given). None if an id is not in the catalog.
+        """
+        self.ensure(db)
+        with self._lock:
+            return self._query(panel_id, inverter_id, include_incompatible)
+
+    def _query(self, panel_id, inverter_id, include_incompatible) -> Optional[List[Dict]]:
+        rows = slice(None)
+        columns = slice(None)
+        if panel_id is not None:
+            if panel_id not in self._panel_pos:
+                return None
+            rows = [self._panel_pos[panel_id]]
+        if inverter_id is not None:
+            if inverter_id not in self._inverter_pos:
+                return None
+            columns = [self._inverter_pos[inverter_id]]
+
+        block = {name: matrix[rows][:, columns] for name, matrix in self.limits.items()}
+        p, i = np.nonzero(block["compatible"] | include_incompatible)
+        panel_ids = self.panel_ids[rows][p]
+        inverter_ids = self.inverter_ids[columns][i]
+        columns_out = {
+            name: [None if v != v else v for v in block[name][p, i].tolist()]  # NaN -> None
+            for name in block
+        }
+        return [
+            {
+                "panel_id": int(panel_ids[k]),
+                "inverter_id": int(inverter_ids[k]),
+                **{name: values[k] for name, values in columns_out.items()},
+            }
+            for k in range(len(p))
+        ]
+
+
+index = CompatibilityIndex()
@@ -0,0 +1,198 @@
+# backend/app/services/component_selection.py
+"""
+Automatic panel/inverter/string selection for a design.
+
+Every compatible pair of the catalog (see ``compatibility.index``) is
+expanded over all its feasible string lengths. Each candidate is laid out
+for the design's DC capacity with ``string_allocation.layout`` (the same
+strings/inverters rule as calculate-electrical) and scored with a yield
+proxy and a LCOE, all as array operations:
+
+- Yield: plane-of-array irradiation at the site for the design's
+  orientation x scenario losses x panel temperature loss (NOCT cell model,
+  irradiance-weighted) x inverter efficiency x clipping.
+- CAPEX: the scenario's USD/W costs, with the inverter cost on the AC
+  capacity (at the target DC/AC ratio) and BOS/installation scaled by
+  module area (inverse of panel efficiency, relative to the catalog median).
+
+LCOE uses the financial engine's discount factors; the engine is linear in
+capacity and production, so one unit evaluation serves every candidate.
+"""
+from typing import Dict, List
+
+import numpy as np
+
+from app.services import financial_engine, production_profile, string_allocation
+
+RANK_BY = ("lcoe", "yield")
+
+DEFAULT_NOCT = 45
+DEFAULT_INVERTER_EFFICIENCY = 0.97
+
+_CHUNK = 2_000_000  # Candidatos (par, longitud de string) por bloque
+
+
+def site_factors(
+    weather: Dict[str, np.ndarray], latitude: float, longitude: float, tilt: float, azimuth: float
+) -> Dict[str, float]:
+    """
+    Annual plane-of-array irradiation (kWh/m²) for an orientation, and the
+    irradiance-weighted ambient temperature and irradiance used by the
+    NOCT cell model.
+    """
+    poa = production_profile.plane_of_array(
+        weather, latitude, longitude, np.array(tilt), np.array(azimuth)
+    )
+    weight = poa.sum()
+    # Sin temperatura en el clima: 25 °C constantes
+    temp_air = (
+        production_profile.to_year(weather["temp_air"])
+        if len(weather.get("temp_air", ())) else np.full(len(poa), 25.0)
+    )
+    return {
+        "irradiation_kwh_m2": float(weight / 1000),
+        "weighted_temp_air": float((poa * temp_air).sum() / weight) if weight else 25.0,
+        "weighted_poa": float((poa * poa).sum() / weight) if weight else 0.0,
+    }
+
+
+def _candidates(c: Dict, p, i, modules, max_strings, costs: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Layout, production and (with ``costs``) CAPEX and LCOE of candidates
+    given as panel/inverter positions, string lengths and string limits.
+    """
+    plan = string_allocation.layout(
+        c["total_panels"][p], modules, c["power"][p], c["ac"][i], c["dc_max"][i],
+        max_strings, c["target_ratio"],
+    )
+    dc_w, ac_w = plan["dc_w"], plan["ac_w"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = dc_w / ac_w
+    energy_mwh = dc_w * c["energy_per_w"][p] * c["inverter_eff"][i] * (1 - plan["clipping"])
+    result = {
+        "strings": plan["strings"], "feasible": plan["feasible"], "dc_w": dc_w,
+        "inverters": plan["inverters"], "ac_w": ac_w, "ratio": ratio, "energy_mwh": energy_mwh,
+    }
+    if costs:
+        capex = dc_w * (c["cost_per_w"][p] + c["om_npv_per_w"]) + ac_w * c["inverter_cost_per_w_ac"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result["lcoe"] = capex / (energy_mwh * c["energy_npv_per_mwh"] * 1000)
+        result["capex"] = capex - dc_w * c["om_npv_per_w"]
+    return result
+
+
+def select_components(
+    catalog: Dict[str, np.ndarray],
+    capacity_mw: float,
+    site: Dict[str, float],
+    params: Dict,
+    performance: float,
+    target_dc_ac_ratio: float = 1.25,
+    rank_by: str = "lcoe",
+    limit: int = 10,
+) -> List[Dict]:
+    """
+    Best configuration of every compatible pair, ranked by LCOE (ascending)
+    or annual production (descending); the top ``limit`` are returned.
+
+    ``catalog`` is ``compatibility.index.snapshot()``, ``site`` comes from
+    ``site_factors``, ``params`` are the scenario's engine parameters and
+    ``performance`` the fraction left after system and soiling losses.
+    """
+    if rank_by not in RANK_BY:
+        raise ValueError(f"Unknown ranking: {rank_by}")
+
+    limits = catalog["limits"]
+    if not limits:
+        return []
+    p_idx, i_idx = np.nonzero(limits["compatible"])
+    if not len(p_idx):
+        return []
+
+    panels, inverters = catalog["panels"], catalog["inverters"]
+    noct = np.where(np.isnan(panels[:, 7]), DEFAULT_NOCT, panels[:, 7])
+    cell_temp = site["weighted_temp_air"] + site["weighted_poa"] * (noct - 20) / 800
+    # Factores financieros por MW y por MWh (el motor es lineal)
+    unit = financial_engine.evaluate(1.0, 1.0, params)
+
+    # Factores por panel e inversor (USD/W y MWh/W) para operar sobre candidatos
+    capacity_w = capacity_mw * 1_000_000
+    temp_factor = 1 + panels[:, 5] * (cell_temp - 25)
+    area_factor = np.nanmedian(panels[:, 6]) / panels[:, 6]
+    context = {
+        "target_ratio": target_dc_ac_ratio,
+        "total_panels": np.floor(capacity_w / panels[:, 0]),
+        "power": panels[:, 0],
+        "energy_per_w": site["irradiation_kwh_m2"] * performance * temp_factor / 1_000_000,
+        "cost_per_w": params["module_cost"] + (params["bos_cost"] + params["installation_cost"]) * area_factor,
+        "ac": inverters[:, 0],
+        "dc_max": inverters[:, 1],
+        "inverter_eff": np.where(
+            np.isnan(inverters[:, 5]),
+            np.where(np.isnan(inverters[:, 6]), DEFAULT_INVERTER_EFFICIENCY, inverters[:, 6]),
+            inverters[:, 5],
+        ),
+        # Costo del inversor sobre la potencia AC (al ratio DC/AC objetivo)
+        "inverter_cost_per_w_ac": params["inverter_cost"] * target_dc_ac_ratio,
+        "om_npv_per_w": float(unit["om_npv"]) / 1_000_000,
+        "energy_npv_per_mwh": float(unit["energy_npv"]),
+    }
+
+    min_modules = limits["min_modules_per_string"][p_idx, i_idx]
+    counts = limits["max_modules_per_string"][p_idx, i_idx] - min_modules + 1
+    max_strings = limits["max_strings_per_inverter"][p_idx, i_idx]
+
+    # Expansión irregular: cada par con sus longitudes de string, en bloques de ~_CHUNK
+    ends = np.cumsum(counts)
+    bounds = np.unique(np.concatenate([[0], np.searchsorted(ends, np.arange(_CHUNK, ends[-1], _CHUNK)), [len(counts)]]))
+    best_modules = np.empty(len(p_idx))
+    best_score = np.empty(len(p_idx))
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        n = counts[start:stop]
+        segment = np.repeat(np.arange(stop - start), n)
+        first = np.cumsum(n) - n
+        modules = min_modules[start:stop][segment] + np.arange(n.sum()) - first[segment]
+        pairs = start + segment
+        result = _candidates(
+            context, p_idx[pairs], i_idx[pairs], modules, max_strings[pairs], costs=rank_by == "lcoe"
+        )
+        feasible = result["feasible"]
+        if rank_by == "yield":
+            score = np.where(feasible, -result["energy_mwh"], np.inf)
+        else:
+            score = np.where(feasible & np.isfinite(result["lcoe"]), result["lcoe"], np.inf)
+
+        # Mejor longitud de cada par: mínimo por segmento y su primera posición
+        minimum = np.minimum.reduceat(score, first)
+        hits = np.flatnonzero(score == minimum[segment])
+        _, position = np.unique(segment[hits], return_index=True)
+        chosen = np.full(stop - start, -1)
+        chosen[segment[hits[position]]] = hits[position]
+        best_score[start:stop] = minimum
+        best_modules[start:stop] = np.where(chosen >= 0, modules[chosen], min_modules[start:stop])
+
+    top = np.argpartition(best_score, limit)[:limit] if len(best_score) > limit else np.arange(len(best_score))
+    top = top[np.argsort(best_score[top])]
+    top = top[np.isfinite(best_score[top])]
+
+    p, i, m = p_idx[top], i_idx[top], best_modules[top]
+    result = _candidates(context, p, i, m, max_strings[top])
+    return [
+        {
+            "rank": k + 1,
+            "panel_id": int(catalog["panel_ids"][p[k]]),
+            "inverter_id": int(catalog["inverter_ids"][i[k]]),
+            "modules_per_string": int(m[k]),
+            "total_strings": int(result["strings"][k]),
+            "total_inverters": int(result["inverters"][k]),
+            "strings_per_inverter": int(np.ceil(result["strings"][k] / result["inverters"][k])),
+            "dc_capacity_mw": float(result["dc_w"][k] / 1_000_000),
+            "ac_capacity_mw": float(result["ac_w"][k] / 1_000_000),
+            "dc_ac_ratio": round(float(result["ratio"][k]), 3),
+            "annual_production_mwh": float(result["energy_mwh"][k]),
+            "specific_yield_kwh_kwp": float(result["energy_mwh"][k] * 1_000_000 / result["dc_w"][k]),
+            "capex": float(result["capex"][k]),
+            "lcoe": float(result["lcoe"][k]),
+        }
+        for k in range(len(top))
+    ]
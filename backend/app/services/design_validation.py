@@ -0,0 +1,469 @@
+# backend/app/services/design_validation.py
+"""
+Declarative design validation rules evaluated for many designs at once.
+
+A rule is a boolean check over input columns (one row per design), with a
+severity and a message template; it declares the inputs it reads, either
+raw ``FIELDS`` (design, panel, inverter, site and ``THRESHOLDS`` values) or
+``derived`` quantities built from them. Rules are compiled once into the
+list of raw fields and a rule x field dependency matrix.
+
+Each validation builds the input matrix, compares it with the inputs of
+the last validation of every design and evaluates only the rules with a
+changed input, on the designs where something changed; the other outcomes
+are reused. Messages are only formatted for the designs a rule flags.
+"""
+import string
+import threading
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.services import compatibility
+
+SEVERITIES = ("error", "warning", "info")
+
+# Umbrales de las reglas (entradas como cualquier otro campo)
+THRESHOLDS = {
+    "high_dc_ac_ratio": 1.6,
+    "low_dc_ac_ratio": 1.1,
+    "max_tilt": 90,
+    "tropic_latitude": 23.5,  # Fuera de los trópicos una inclinación nula no es óptima
+    "azimuth_tolerance": 45,
+}
+
+# Campos de entrada: nombre -> (origen, atributo)
+FIELDS = {
+    "panel_type_id": ("design", "panel_type_id"),
+    "inverter_type_id": ("design", "inverter_type_id"),
+    "installation_area": ("design", "installation_area"),
+    "capacity_mw": ("design", "capacity_mw"),
+    "modules_per_string": ("design", "modules_per_string"),
+    "total_inverters": ("design", "total_inverters"),
+    "strings_per_inverter": ("design", "strings_per_inverter"),
+    "tilt_angle": ("design", "tilt_angle"),
+    "azimuth_angle": ("design", "azimuth_angle"),
+    "panel_id": ("panel", "id"),
+    **{f"panel_{name}": ("panel", name) for name in compatibility.PANEL_FIELDS + ("area_m2",)},
+    "inverter_id": ("inverter", "id"),
+    **{f"inverter_{name}": ("inverter", name) for name in compatibility.INVERTER_FIELDS},
+    "latitude": ("site", "latitude"),
+    "temp_min": ("site", "temp_min"),
+    "temp_max": ("site", "temp_max"),
+    **{name: ("threshold", name) for name in THRESHOLDS},
+}
+
+DERIVED: Dict[str, Dict] = {}
+RULES: List[Dict] = []
+
+_MAX_CACHED_DESIGNS = 10_000
+
+
+def derived(*inputs: str) -> Callable:
+    """Register a derived quantity (named after the function) computed from ``inputs``."""
+    def register(function):
+        DERIVED[function.__name__] = {"inputs": inputs, "function": function}
+        return function
+    return register
+
+
+def rule(severity: str, message: str, *inputs: str) -> Callable:
+    """
+    Register a rule (named after the function) returning the mask of
+    flagged designs. ``message`` may reference inputs as ``{name}``.
+    """
+    if severity not in SEVERITIES:
+        raise ValueError(f"Unknown severity: {severity}")
+
+    def register(check):
+        RULES.append({"name": check.__name__, "severity": severity, "message": message,
+                      "inputs": inputs, "check": check})
+        return check
+    return register
+
+
+class _Inputs:
+    """Input columns of a set of designs; derived quantities computed on first use."""
+
+    def __init__(self, columns: Dict[str, np.ndarray], rows: int):
+        self._values = dict(columns)
+        self.rows = rows
+
+    def __getitem__(self, name: str):
+        if name not in self._values:
+            self._values[name] = DERIVED[name]["function"](self)
+        return self._values[name]
+
+
+# ---------- Cantidades derivadas ----------
+@derived("panel_id")
+def has_panel(v):
+    return ~np.isnan(v["panel_id"])
+
+
+@derived("inverter_id")
+def has_inverter(v):
+    return ~np.isnan(v["inverter_id"])
+
+
+@derived("has_panel", "has_inverter", "modules_per_string")
+def configured(v):
+    # modules_per_string = 0 equivale a sin configurar
+    return v["has_panel"] & v["has_inverter"] & (v["modules_per_string"] > 0)
+
+
+_VOLTAGE_INPUTS = ("voc", "vmp", "temp_coeff_voc", "temp_coeff_pmax")
+
+
+@derived(*(f"panel_{name}" for name in _VOLTAGE_INPUTS), "temp_min", "temp_max")
+def module_voltages(v):
+    features = np.full((v.rows, len(compatibility.PANEL_FIELDS)), np.nan)
+    for name in _VOLTAGE_INPUTS:
+        features[:, compatibility.PANEL_FIELDS.index(name)] = v[f"panel_{name}"]
+    return compatibility.string_voltages(
+        compatibility.fill_panel_defaults(features), v["temp_min"], v["temp_max"]
+    )
+
+
+@derived("modules_per_string", "module_voltages")
+def string_voc(v):
+    return v["modules_per_string"] * v["module_voltages"]["voc_at_min_temp"]
+
+
+@derived("modules_per_string", "module_voltages")
+def string_vmp(v):
+    return v["modules_per_string"] * v["module_voltages"]["vmp_at_max_temp"]
+
+
+@derived("strings_per_inverter", "inverter_mppt_channels", "panel_isc")
+def mppt_current(v):
+    # Entrada MPPT más cargada con los strings repartidos en partes iguales
+    channels = np.where(v["inverter_mppt_channels"] >= 1, v["inverter_mppt_channels"], 1)
+    return np.ceil(v["strings_per_inverter"] / channels) * v["panel_isc"]
+
+
+@derived("configured", "capacity_mw", "total_inverters", "inverter_power_ac_w")
+def dc_ac_ratio(v):
+    ac_power = v["total_inverters"] * v["inverter_power_ac_w"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = v["capacity_mw"] * 1_000_000 / ac_power
+    return np.where(v["configured"] & (v["total_inverters"] > 0) & (ac_power > 0), ratio, np.nan)
+
+
+@derived("latitude")
+def optimal_azimuth(v):
+    # Hemisferio sur: óptimo es norte (0°); hemisferio norte: sur (180°)
+    return np.where(v["latitude"] < 0, 0, 180)
+
+
+@derived("capacity_mw", "panel_power_watts", "panel_area_m2")
+def area_needed(v):
+    return np.floor(v["capacity_mw"] * 1_000_000 / v["panel_power_watts"]) * v["panel_area_m2"]
+
+
+@derived("area_needed")
+def area_needed_ha(v):
+    return v["area_needed"] / 10000
+
+
+# ---------- Reglas (el orden es el de los mensajes) ----------
+@rule("error", "No panel type selected", "has_panel")
+def panel_missing(v):
+    return ~v["has_panel"]
+
+
+@rule("error", "No inverter type selected", "has_inverter")
+def inverter_missing(v):
+    return ~v["has_inverter"]
+
+
+@rule("warning", "No installation area defined - required for shading analysis", "installation_area")
+def area_missing(v):
+    return ~(v["installation_area"] > 0)
+
+
+@rule(
+    "error",
+    "String voltage at minimum temperature ({string_voc:.1f}V) exceeds inverter maximum ({inverter_vdc_max}V)",
+    "configured", "string_voc", "inverter_vdc_max",
+)
+def string_voc_above_max(v):
+    return v["configured"] & (v["string_voc"] > v["inverter_vdc_max"])
+
+
+@rule(
+    "error",
+    "String voltage at maximum temperature ({string_vmp:.1f}V) is below inverter minimum ({inverter_vdc_min}V)",
+    "configured", "string_vmp", "inverter_vdc_min",
+)
+def string_vmp_below_min(v):
+    return v["configured"] & (v["string_vmp"] < v["inverter_vdc_min"])
+
+
+@rule(
+    "error",
+    "String current per MPPT input ({mppt_current:.1f}A) exceeds inverter maximum ({inverter_max_current_per_mppt}A)",
+    "configured", "mppt_current", "inverter_max_current_per_mppt",
+)
+def mppt_current_above_max(v):
+    return v["configured"] & (v["mppt_current"] > v["inverter_max_current_per_mppt"])
+
+
+@rule(
+    "warning",
+    "High DC/AC ratio ({dc_ac_ratio:.2f}) may result in significant clipping losses",
+    "dc_ac_ratio", "high_dc_ac_ratio",
+)
+def dc_ac_ratio_high(v):
+    return v["dc_ac_ratio"] > v["high_dc_ac_ratio"]
+
+
+@rule(
+    "warning",
+    "Low DC/AC ratio ({dc_ac_ratio:.2f}) may result in underutilized inverter capacity",
+    "dc_ac_ratio", "low_dc_ac_ratio",
+)
+def dc_ac_ratio_low(v):
+    return v["dc_ac_ratio"] < v["low_dc_ac_ratio"]
+
+
+@rule("warning", "Electrical configuration not calculated", "has_panel", "has_inverter", "configured")
+def electrical_missing(v):
+    return v["has_panel"] & v["has_inverter"] & ~v["configured"]
+
+
+@rule("error", "Tilt angle must be between 0 and {max_tilt:g} degrees", "tilt_angle", "max_tilt")
+def tilt_out_of_range(v):
+    return (v["tilt_angle"] < 0) | (v["tilt_angle"] > v["max_tilt"])
+
+
+@rule(
+    "warning", "Zero tilt angle may not be optimal for this latitude",
+    "tilt_angle", "latitude", "tropic_latitude",
+)
+def tilt_flat(v):
+    latitude = np.nan_to_num(v["latitude"])
+    return (v["tilt_angle"] == 0) & (np.abs(latitude) > v["tropic_latitude"])
+
+
+@rule("warning", "No tilt angle specified", "tilt_angle")
+def tilt_missing(v):
+    return np.isnan(v["tilt_angle"])
+
+
+@rule("error", "Azimuth angle must be between 0 and 359 degrees", "azimuth_angle")
+def azimuth_out_of_range(v):
+    return (v["azimuth_angle"] < 0) | (v["azimuth_angle"] >= 360)
+
+
+@rule(
+    "info",
+    "Azimuth angle deviates significantly from optimal ({optimal_azimuth}° for this hemisphere)",
+    "azimuth_angle", "latitude", "optimal_azimuth", "azimuth_tolerance",
+)
+def azimuth_off_optimal(v):
+    deviation = np.abs(v["azimuth_angle"] - v["optimal_azimuth"])
+    located = ~np.isnan(v["latitude"]) & (v["latitude"] != 0)
+    return located & (deviation > v["azimuth_tolerance"]) & (deviation < 360 - v["azimuth_tolerance"])
+
+
+@rule("warning", "No azimuth angle specified", "azimuth_angle")
+def azimuth_missing(v):
+    return np.isnan(v["azimuth_angle"])
+
+
+@rule(
+    "info", "Estimated area needed: {area_needed:,.0f} m² ({area_needed_ha:.2f} hectares)",
+    "has_panel", "capacity_mw", "area_needed", "area_needed_ha",
+)
+def area_estimate(v):
+    return v["has_panel"] & (v["capacity_mw"] > 0)
+
+
+# ---------- Compilación y evaluación ----------
+def _resolve(name: str) -> set:
+    if name in FIELDS:
+        return {name}
+    if name in DERIVED:
+        return set().union(*(_resolve(n) for n in DERIVED[name]["inputs"]))
+    raise ValueError(f"Unknown validation input: {name}")
+
+
+def compile_rules(rules: List[Dict]) -> Dict:
+    """
+    Raw fields read by ``rules`` and their rule x field dependency matrix.
+    Message placeholders count as inputs.
+    """
+    placeholders = [
+        [name for _, name, _, _ in string.Formatter().parse(r["message"]) if name]
+        for r in rules
+    ]
+    dependencies = [
+        set().union(*(_resolve(n) for n in (*r["inputs"], *names)))
+        for r, names in zip(rules, placeholders)
+    ]
+    fields = [name for name in FIELDS if any(name in d for d in dependencies)]
+    matrix = np.array([[name in d for name in fields] for d in dependencies], dtype=bool)
+    return {
+        "rules": rules,
+        "fields": fields,
+        "dependencies": matrix.reshape(len(rules), len(fields)),
+        "placeholders": placeholders,
+    }
+
+
+def _value(obj, attribute: str) -> float:
+    value = obj.get(attribute) if isinstance(obj, dict) else getattr(obj, attribute, None)
+    if value is None:
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    return float(bool(value))  # JSON (p. ej. el polígono del área): definido o no
+
+
+def _input_matrix(fields: List[str], sources: Dict[str, List]) -> np.ndarray:
+    n = len(sources["design"])
+    matrix = np.empty((n, len(fields)))
+    for j, name in enumerate(fields):
+        source, attribute = FIELDS[name]
+        objects = sources[source]
+        if isinstance(objects, dict):
+            matrix[:, j] = _value(objects, attribute)
+        else:
+            matrix[:, j] = [np.nan if o is None else _value(o, attribute) for o in objects]
+    return matrix
+
+
+class _OutcomeCache:
+    """Inputs and rule outcomes of the last validation of each design (in process)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fields: Optional[List[str]] = None
+        self._entries: Dict[int, tuple] = {}
+
+    def lookup(self, fields: List[str], design_ids: List[int], n_rules: int):
+        inputs = np.full((len(design_ids), len(fields)), np.nan)
+        outcomes = np.full((len(design_ids), n_rules), None, dtype=object)
+        cached = np.zeros(len(design_ids), dtype=bool)
+        with self._lock:
+            if self._fields != fields:
+                return inputs, outcomes, cached
+            for k, design_id in enumerate(design_ids):
+                entry = self._entries.get(design_id)
+                if entry is not None:
+                    inputs[k], outcomes[k] = entry
+                    cached[k] = True
+        return inputs, outcomes, cached
+
+    def store(self, fields: List[str], design_ids: List[int], inputs: np.ndarray, outcomes: np.ndarray):
+        with self._lock:
+            if self._fields != fields or len(self._entries) > _MAX_CACHED_DESIGNS:
+                self._fields = fields
+                self._entries = {}
+            for k, design_id in enumerate(design_ids):
+                self._entries[design_id] = (inputs[k].copy(), outcomes[k].copy())
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+
+
+compiled = compile_rules(RULES)
+outcome_cache = _OutcomeCache()
+
+
+def evaluate(compiled: Dict, inputs: np.ndarray, stale: np.ndarray, outcomes: np.ndarray) -> np.ndarray:
+    """
+    Fill ``outcomes`` (designs x rules: message or None) for the rules
+    and designs marked in ``stale``; rules without stale designs are skipped.
+    """
+    rows = np.flatnonzero(stale.any(axis=1))
+    if not len(rows):
+        return outcomes
+    values = _Inputs(
+        {name: inputs[rows, j] for j, name in enumerate(compiled["fields"])}, len(rows)
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for r, spec in enumerate(compiled["rules"]):
+            targets = stale[rows, r]
+            if not targets.any():
+                continue
+            flagged = np.asarray(spec["check"](values), dtype=bool) & targets
+            outcomes[rows[targets], r] = None
+            names = compiled["placeholders"][r]
+            for k in np.flatnonzero(flagged):
+                outcomes[rows[k], r] = spec["message"].format(
+                    **{name: values[name][k] for name in names}
+                )
+    return outcomes
+
+
+def validate_designs(
+    designs: List,
+    latitude: Optional[float],
+    panels: Dict[int, object],
+    inverters: Dict[int, object],
+    temp_min=compatibility.DESIGN_TEMP_MIN,
+    temp_max=compatibility.DESIGN_TEMP_MAX,
+    use_cache: bool = True,
+) -> List[Dict]:
+    """
+    Validation result of each design of one project (site ``latitude`` and
+    design temperatures), in the order given. ``panels`` and ``inverters``
+    map ids to the components the designs reference.
+
+    With ``use_cache`` only rules whose inputs changed since a design's
+    last validation are evaluated for it.
+    """
+    sources = {
+        "design": designs,
+        "panel": [panels.get(d.panel_type_id) for d in designs],
+        "inverter": [inverters.get(d.inverter_type_id) for d in designs],
+        "site": {"latitude": latitude, "temp_min": temp_min, "temp_max": temp_max},
+        "threshold": THRESHOLDS,
+    }
+    fields = compiled["fields"]
+    inputs = _input_matrix(fields, sources)
+    design_ids = [d.id for d in designs]
+    n_rules = len(compiled["rules"])
+
+    if use_cache:
+        previous, outcomes, cached = outcome_cache.lookup(fields, design_ids, n_rules)
+        same = (inputs == previous) | (np.isnan(inputs) & np.isnan(previous))
+        changed = ~same | ~cached[:, None]
+        stale = (changed.astype(np.int32) @ compiled["dependencies"].T.astype(np.int32)) > 0
+    else:
+        outcomes = np.full((len(designs), n_rules), None, dtype=object)
+        stale = np.ones((len(designs), n_rules), dtype=bool)
+
+    outcomes = evaluate(compiled, inputs, stale, outcomes)
+    if use_cache:
+        outcome_cache.store(fields, design_ids, inputs, outcomes)
+
+    severities = [spec["severity"] for spec in compiled["rules"]]
+    results = []
+    for k, design in enumerate(designs):
+        messages = {severity: [] for severity in SEVERITIES}
+        for r, message in enumerate(outcomes[k]):
+            if message is not None:
+                messages[severities[r]].append(message)
+        results.append({
+            "valid": not messages["error"],
+            "ready_to_simulate": not messages["error"] and bool(
+                sources["panel"][k] is not None and sources["inverter"][k] is not None
+            ),
+            "errors": messages["error"],
+            "warnings": messages["warning"],
+            "info": messages["info"],
+            "status": design.status,
+            "design_summary": {
+                "name": design.name,
+                "capacity_mw": design.capacity_mw,
+                "panel_selected": bool(design.panel_type_id),
+                "inverter_selected": bool(design.inverter_type_id),
+                "area_defined": bool(design.installation_area),
+                "electrical_configured": bool(design.modules_per_string)
+            }
+        })
+    return results
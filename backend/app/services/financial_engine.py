@@ -0,0 +1,446 @@
+# backend/app/services/financial_engine.py
+"""
+Vectorized financial engine shared by the financial endpoints.
+
+Year vectors (degradation, inflation, discount factors) are built once
+with NumPy and every metric is derived from them. All parameters may be
+scalars or arrays of the same (broadcastable) batch shape, so one call
+evaluates a single analysis or thousands of variants at once; the year
+axis is always the last one.
+"""
+import hashlib
+import json
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.services import project_finance, tax
+
+PROJECT_LIFETIME = 25
+
+# Valores por defecto cuando el escenario no los define (USD/W y USD/MW/año)
+DEFAULT_PARAMETERS = {
+    "module_cost": 0.25,
+    "inverter_cost": 0.05,
+    "bos_cost": 0.15,
+    "installation_cost": 0.10,
+    "om_cost_per_mw_year": 15000,
+    "discount_rate": 0.08,
+    "inflation_rate": 0.03,
+    "annual_degradation": 0.005,
+    "electricity_price_escalation": 0.02,
+}
+
+CAPEX_COMPONENTS = ("module_cost", "inverter_cost", "bos_cost", "installation_cost")
+
+# Costos que admiten curvas de escala (SimulationScenario.cost_scaling)
+SCALABLE_COSTS = CAPEX_COMPONENTS + ("om_cost_per_mw_year",)
+
+DEFAULT_DEBT_PERCENTAGE = 0.7
+
+# Subir al cambiar el cálculo: invalida los análisis memorizados
+ENGINE_VERSION = 4
+
+# Impuestos e incentivos del escenario (0 = sin impuesto/crédito)
+TAX_PARAMETERS = {
+    "tax_rate": 0.0,
+    "depreciation_years": 20,
+    "depreciation_macrs": 0,  # 1 si depreciation_years es una clase MACRS
+    "itc_rate": 0.0,
+    "ptc_rate": 0.0,
+    "ptc_years": 10,
+}
+
+
+def scenario_parameters(scenario, capacity_mw=None) -> Dict[str, float]:
+    """
+    Engine parameters of a ``SimulationScenario`` with defaults applied.
+    With ``capacity_mw`` (scalar or batch) the scenario's ``cost_scaling``
+    curves are applied at that capacity (see ``scale_costs``).
+    """
+    # Sólo los valores ausentes toman el default: 0 es un valor válido
+    # (precio plano, tasa de descuento nula, sin degradación)
+    params = {
+        name: default if getattr(scenario, name, None) is None else getattr(scenario, name)
+        for name, default in {**DEFAULT_PARAMETERS, **TAX_PARAMETERS}.items()
+    }
+    # "macrs_7" -> clase de 7 años; el método queda como parámetro numérico
+    method = getattr(scenario, "depreciation_method", None)
+    if method and method.startswith("macrs_"):
+        params["depreciation_macrs"] = 1
+        params["depreciation_years"] = int(method.split("_")[1])
+    if capacity_mw is not None:
+        params = scale_costs(capacity_mw, params, getattr(scenario, "cost_scaling", None))
+    return params
+
+
+def analysis_fingerprint(design, scenario, inputs: Dict) -> str:
+    """
+    Hash of everything a stored analysis depends on: the design's capacity
+    and production, the scenario's engine parameters, the request inputs
+    (price, financing) and ``ENGINE_VERSION``.
+    """
+    payload = {
+        "engine": ENGINE_VERSION,
+        "capacity_mw": design.capacity_mw,
+        "annual_production_mwh": design.annual_production_mwh,
+        "scenario_id": scenario.id,
+        "scenario": scenario_parameters(scenario),
+        "cost_scaling": getattr(scenario, "cost_scaling", None),
+        "inputs": inputs,
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def scale_costs(capacity_mw, params: Dict, scaling: Optional[Dict]) -> Dict:
+    """
+    Apply scale-dependent cost curves: each listed cost becomes
+    ``cost * (capacity / reference_capacity_mw) ** -exponent``, with the
+    batch shape of ``capacity_mw``. ``scaling=None`` returns ``params`` unchanged.
+    """
+    if not scaling:
+        return params
+    ratio = np.asarray(capacity_mw, dtype=float) / scaling["reference_capacity_mw"]
+    scaled = dict(params)
+    for name, exponent in (scaling.get("exponents") or {}).items():
+        if name not in SCALABLE_COSTS:
+            raise ValueError(f"Cost {name} cannot be scaled")
+        scaled[name] = np.asarray(params[name], dtype=float) * ratio ** -exponent
+    return scaled
+
+
+def financing_parameters(source) -> Dict[str, Optional[float]]:
+    """
+    Financing inputs (debt %, interest rate, loan term, target DSCR) of a
+    request or ``FinancialAnalysis``; missing ones are None.
+    """
+    return {name: getattr(source, name, None) for name in project_finance.FINANCING_PARAMETERS}
+
+
+def stack_parameters(param_sets: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Stack several parameter dicts into one batch (arrays along a new last
+    axis; values that are already batches, e.g. scaled costs, are broadcast
+    first). Keys that are None in every set (e.g. no electricity price) stay None.
+    """
+    stacked = {}
+    for name in param_sets[0]:
+        values = [p.get(name) for p in param_sets]
+        stacked[name] = (
+            None if all(v is None for v in values)
+            else np.stack(np.broadcast_arrays(*[
+                np.asarray(np.nan if v is None else v, dtype=float) for v in values
+            ]), axis=-1)
+        )
+    return stacked
+
+
+def _batch(value) -> np.ndarray:
+    """Float array with a trailing axis so it broadcasts against years."""
+    return np.asarray(value, dtype=float)[..., None]
+
+
+def capex_breakdown(capacity_mw, params: Dict) -> Dict[str, np.ndarray]:
+    """CAPEX per component and total (USD) for one or many capacities."""
+    watts = np.asarray(capacity_mw, dtype=float) * 1_000_000
+    breakdown = {
+        name: watts * np.asarray(params[name], dtype=float)
+        for name in CAPEX_COMPONENTS
+    }
+    breakdown["total_investment"] = sum(breakdown[name] for name in CAPEX_COMPONENTS)
+    return breakdown
+
+
+def year_factors(params: Dict, lifetime: int = PROJECT_LIFETIME) -> Dict[str, np.ndarray]:
+    """
+    Per-year factor vectors, shape ``batch + (lifetime,)``:
+    degradation ``(1-d)^(y-1)``, inflation ``(1+i)^(y-1)``, discount ``(1+r)^-y``.
+    """
+    years = np.arange(1, lifetime + 1, dtype=float)
+    return {
+        "years": years,
+        "degradation": (1 - _batch(params["annual_degradation"])) ** (years - 1),
+        "inflation": (1 + _batch(params["inflation_rate"])) ** (years - 1),
+        "discount": (1 + _batch(params["discount_rate"])) ** -years,
+    }
+
+
+def npv(cash_flows: np.ndarray, rate) -> np.ndarray:
+    """NPV of cash flows ``(..., n)`` (year 0 first) at one or many rates."""
+    t = np.arange(cash_flows.shape[-1])
+    return (cash_flows * (1 + _batch(rate)) ** -t).sum(axis=-1)
+
+
+def irr(
+    cash_flows: np.ndarray,
+    guess: float = 0.1,
+    tol: float = 1e-10,
+    max_newton: int = 50,
+    max_bisect: int = 200,
+) -> np.ndarray:
+    """
+    IRR of every cash-flow vector in a batch ``(..., n)`` at once.
+
+    Vectorized Newton iterations from ``guess``; vectors that do not
+    converge (or leave the valid domain) are solved by bisection on
+    ``(-0.99, 10)``. NaN where no sign change exists in that bracket.
+    """
+    cf = np.asarray(cash_flows, dtype=float)
+    batch_shape = cf.shape[:-1]
+    cf = cf.reshape(-1, cf.shape[-1])
+    t = np.arange(cf.shape[-1], dtype=float)
+
+    rate = np.full(cf.shape[0], guess)
+    converged = np.zeros(cf.shape[0], dtype=bool)
+    with np.errstate(all="ignore"):
+        for _ in range(max_newton):
+            active = ~converged
+            if not active.any():
+                break
+            r = rate[active]
+            v = (1 + r)[:, None] ** -t
+            f = (cf[active] * v).sum(axis=-1)
+            df = (-t * cf[active] * v / (1 + r)[:, None]).sum(axis=-1)
+            step = f / df
+            new_rate = r - step
+            rate[active] = new_rate
+            converged[active] = np.abs(step) < tol
+
+        valid = converged & np.isfinite(rate) & (rate > -1)
+        valid[valid] = np.abs(npv(cf[valid], rate[valid])) < 1e-6 * np.abs(cf[valid]).max(axis=-1)
+
+        # Bisección para los casos donde Newton no convergió
+        pending = ~valid
+        if pending.any():
+            sub = cf[pending]
+            lo = np.full(len(sub), -0.99)
+            hi = np.full(len(sub), 10.0)
+            f_lo = npv(sub, lo)
+            bracketed = np.sign(f_lo) != np.sign(npv(sub, hi))
+            for _ in range(max_bisect):
+                mid = (lo + hi) / 2
+                f_mid = npv(sub, mid)
+                left = np.sign(f_mid) == np.sign(f_lo)
+                lo = np.where(left, mid, lo)
+                f_lo = np.where(left, f_mid, f_lo)
+                hi = np.where(left, hi, mid)
+                if np.all(hi - lo < tol):
+                    break
+            rate[pending] = np.where(bracketed, (lo + hi) / 2, np.nan)
+
+    return rate.reshape(batch_shape)
+
+
+def payback_period(net_cash_flow: np.ndarray) -> np.ndarray:
+    """
+    Years until cumulative cash flow turns positive, interpolated within
+    the crossing year. NaN if it never does.
+    """
+    cumulative = np.cumsum(net_cash_flow, axis=-1)
+    positive = cumulative[..., 1:] >= 0
+    k = np.argmax(positive, axis=-1)[..., None]
+    before = np.take_along_axis(cumulative, k, axis=-1)[..., 0]
+    flow = np.take_along_axis(net_cash_flow[..., 1:], k, axis=-1)[..., 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        years = k[..., 0] + np.where(flow != 0, -before / flow, 0)
+    return np.where(positive.any(axis=-1), years, np.nan)
+
+
+def evaluate(
+    capacity_mw,
+    annual_production_mwh,
+    params: Dict,
+    lifetime: int = PROJECT_LIFETIME,
+    yield_factors: Optional[np.ndarray] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Evaluate CAPEX, discounted energy/O&M, LCOE and cash flows.
+
+    ``yield_factors`` (shape ``batch + (lifetime,)``) scales each year's
+    production, e.g. for interannual resource variability.
+
+    If ``params["electricity_price"]`` (USD/kWh) is given, revenue escalates
+    with ``electricity_price_escalation`` and NPV, IRR, payback and ROI are
+    computed as well. If ``interest_rate`` and ``loan_term_years`` are also
+    given, the debt schedule, DSCR and equity IRR are added (see
+    ``project_finance.evaluate_financing``).
+
+    Cash flows are after income tax (``tax_rate`` on revenue - O&M -
+    depreciation, losses carried forward) plus the investment (``itc_rate``,
+    year 1) and production (``ptc_rate`` USD/kWh for ``ptc_years``) tax
+    credits; see ``TAX_PARAMETERS``. LCOE stays pre-tax.
+
+    Returns arrays; per-year series have shape ``batch + (lifetime,)`` and
+    cash-flow series ``batch + (lifetime + 1,)`` with year 0 first.
+    """
+    capex = capex_breakdown(capacity_mw, params)
+    factors = year_factors(params, lifetime)
+
+    energy_mwh = _batch(annual_production_mwh) * factors["degradation"]
+    if yield_factors is not None:
+        energy_mwh = energy_mwh * yield_factors
+    annual_om_cost = _batch(capacity_mw) * _batch(params["om_cost_per_mw_year"])
+    opex = annual_om_cost * factors["inflation"]
+
+    energy_npv = (energy_mwh * factors["discount"]).sum(axis=-1)
+    om_npv = (opex * factors["discount"]).sum(axis=-1)
+
+    # LCOE = (CAPEX + NPV(OPEX)) / NPV(Energía), en USD/kWh
+    lcoe = (capex["total_investment"] + om_npv) / (energy_npv * 1000)
+
+    # Flujos de caja (sin ingresos si no hay precio de electricidad)
+    investment = capex["total_investment"]
+    price = params.get("electricity_price")
+    if price is not None:
+        escalation = (1 + _batch(params["electricity_price_escalation"])) ** (factors["years"] - 1)
+        revenue = energy_mwh * 1000 * _batch(price) * escalation
+    else:
+        revenue = np.zeros_like(opex)
+
+    # Impuestos: depreciación, ganancias con quebrantos trasladables y créditos
+    def tax_param(name):
+        value = params.get(name)
+        return _batch(TAX_PARAMETERS[name] if value is None else value)
+
+    years = factors["years"]
+    ebitda = revenue - opex
+    depreciation = _batch(investment) * tax.depreciation_fractions(
+        params.get("depreciation_years", TAX_PARAMETERS["depreciation_years"]),
+        params.get("depreciation_macrs", TAX_PARAMETERS["depreciation_macrs"]),
+        lifetime,
+    )
+    taxable_income = ebitda - depreciation
+    tax_rate = tax_param("tax_rate")
+    income_tax = tax.income_tax(taxable_income, tax_rate)
+    tax_credits = (
+        np.where(years == 1, _batch(investment) * tax_param("itc_rate"), 0)
+        + energy_mwh * 1000 * tax_param("ptc_rate") * (years <= tax_param("ptc_years"))
+    )
+    flows = ebitda - income_tax + tax_credits
+    batch_shape = np.broadcast_shapes(np.shape(investment), flows.shape[:-1])
+    net = np.concatenate([
+        np.broadcast_to(-_batch(investment), batch_shape + (1,)),
+        np.broadcast_to(flows, batch_shape + flows.shape[-1:]),
+    ], axis=-1)
+
+    result = {
+        **capex,
+        "years": factors["years"],
+        "energy_mwh": energy_mwh,
+        "opex": opex,
+        "revenue": revenue,
+        "depreciation": depreciation,
+        "income_tax": income_tax,
+        "tax_credits": tax_credits,
+        "energy_npv": energy_npv,
+        "om_npv": om_npv,
+        "lcoe": lcoe,
+        "net_cash_flow": net,
+        "cumulative_cash_flow": np.cumsum(net, axis=-1),
+    }
+
+    if price is not None:
+        discount = np.concatenate([np.ones_like(factors["discount"][..., :1]), factors["discount"]], axis=-1)
+        result["npv"] = (net * discount).sum(axis=-1)
+        result["irr"] = irr(net)
+        result["payback_period"] = payback_period(net)
+        # ROI % = (ganancia neta acumulada) / inversión
+        result["roi"] = net[..., 1:].sum(axis=-1) / investment * 100 - 100
+
+        # Financiamiento con deuda (requiere tasa y plazo del préstamo)
+        if params.get("interest_rate") is not None and params.get("loan_term_years") is not None:
+            debt_percentage = params.get("debt_percentage")
+            target_dscr = params.get("target_dscr")
+            financing = project_finance.evaluate_financing(
+                investment,
+                ebitda + tax_credits,
+                years,
+                _batch(DEFAULT_DEBT_PERCENTAGE if debt_percentage is None else debt_percentage),
+                _batch(params["interest_rate"]),
+                _batch(params["loan_term_years"]),
+                None if target_dscr is None else _batch(target_dscr),
+                taxable_income=taxable_income,
+                tax_rate=tax_rate,
+            )
+            result.update(financing)
+            result["equity_irr"] = irr(financing["equity_cash_flow"])
+
+    return result
+
+
+def metric(result: Dict[str, np.ndarray], name: str, index: Optional[tuple] = None) -> Optional[float]:
+    """Scalar metric of one evaluated case as a float, or None if unavailable/NaN."""
+    if name not in result:
+        return None
+    value = result[name] if index is None else result[name][index]
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def cash_flow_columns(result: Dict[str, np.ndarray], index: Optional[tuple] = None) -> Dict[str, List]:
+    """
+    Cash flows of one evaluated case as one list per field, years 0..lifetime
+    (the format stored in ``FinancialAnalysis.cash_flows``). Costs, taxes and
+    debt service are negative; DSCR is None outside the loan term.
+    """
+    def pick(name):
+        value = result[name]
+        return value[index] if index is not None else value
+
+    def with_year_zero(series, first=0.0):
+        return np.concatenate([[first], series])
+
+    investment = float(pick("total_investment"))
+    columns = {
+        "year": list(range(len(result["years"]) + 1)),
+        "investment": with_year_zero(np.zeros(len(result["years"])), -investment),
+        "revenue": with_year_zero(pick("revenue")),
+        "opex": with_year_zero(-pick("opex")),
+        "depreciation": with_year_zero(pick("depreciation")),
+        "income_tax": with_year_zero(-pick("income_tax")),
+        "tax_credits": with_year_zero(pick("tax_credits")),
+        "energy_mwh": with_year_zero(pick("energy_mwh")),
+        "net_cash_flow": pick("net_cash_flow"),
+        "cumulative_cash_flow": pick("cumulative_cash_flow"),
+    }
+    if "equity_cash_flow" in result:
+        columns["debt_service"] = with_year_zero(-pick("debt_service"))
+        columns["dscr"] = with_year_zero(pick("dscr"), np.nan)
+        columns["equity_cash_flow"] = pick("equity_cash_flow")
+
+    return {
+        name: values if name == "year" else [None if np.isnan(v) else v for v in values.tolist()]
+        for name, values in columns.items()
+    }
+
+
+def select_cash_flows(
+    stored,
+    fields: Optional[List[str]] = None,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+) -> Optional[Dict[str, List]]:
+    """
+    Subset of stored cash flows: the requested fields (plus ``year``) for
+    years in ``[year_from, year_to]``. Analyses stored before the columnar
+    format (a list of per-year dicts) are converted on the fly.
+
+    Raises ``ValueError`` for fields the analysis does not have.
+    """
+    if stored is None:
+        return None
+    if isinstance(stored, list):
+        names = list(dict.fromkeys(name for record in stored for name in record))
+        stored = {name: [record.get(name) for record in stored] for name in names}
+
+    if fields:
+        unknown = [name for name in fields if name not in stored]
+        if unknown:
+            raise ValueError(f"Unknown cash flow fields: {', '.join(unknown)}")
+    names = ["year"] + [name for name in (fields or stored) if name != "year"]
+
+    years = stored["year"]
+    start = 0 if year_from is None else next((i for i, y in enumerate(years) if y >= year_from), len(years))
+    stop = len(years) if year_to is None else next((i for i, y in enumerate(years) if y > year_to), len(years))
+    return {name: stored[name][start:stop] for name in names}
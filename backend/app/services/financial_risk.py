@@ -0,0 +1,221 @@
+# backend/app/services/financial_risk.py
+"""
+Monte Carlo financial risk analysis on top of the vectorized engine.
+
+Every uncertain input is sampled as a multiplier of its scenario value
+(1.0 = base case) and all draws are evaluated as one matrix computation
+per chunk. Chunks can be spread across the processes of one pool shared
+by all requests (at most MONTE_CARLO_MAX_WORKERS, default: CPU count).
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services import financial_engine
+
+# Tamaño de bloque: acota la memoria (~10 arrays de chunk x años en float64)
+CHUNK_SIZE = 25_000
+
+# Distribuciones por defecto (multiplicadores del valor del escenario)
+DEFAULT_DISTRIBUTIONS = {
+    "module_cost": {"distribution": "triangular", "low": 0.9, "mode": 1.0, "high": 1.15},
+    "inverter_cost": {"distribution": "triangular", "low": 0.9, "mode": 1.0, "high": 1.15},
+    "bos_cost": {"distribution": "triangular", "low": 0.9, "mode": 1.0, "high": 1.2},
+    "installation_cost": {"distribution": "triangular", "low": 0.9, "mode": 1.0, "high": 1.25},
+    "om_cost_per_mw_year": {"distribution": "normal", "std": 0.1},
+    "annual_degradation": {"distribution": "normal", "std": 0.2},
+    "discount_rate": {"distribution": "normal", "std": 0.1},
+}
+
+# Incertidumbre del recurso: nivel de largo plazo (P50) y variabilidad interanual
+DEFAULT_YIELD_UNCERTAINTY = 0.05
+DEFAULT_YIELD_VARIABILITY = 0.04
+
+OUTPUT_METRICS = (
+    "lcoe", "total_investment", "npv", "irr", "payback_period",
+    "debt_amount", "min_dscr", "equity_irr",
+)
+
+# Métricas donde "más alto es peor": su P90 es el percentil 90;
+# para el resto (NPV, IRR) el P90 es el valor superado con 90% de probabilidad
+HIGHER_IS_WORSE = {"lcoe", "total_investment", "payback_period"}
+
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+
+
+def sample_multipliers(rng: np.random.Generator, spec: Dict, size: int) -> np.ndarray:
+    """Draw non-negative multipliers from a distribution spec."""
+    distribution = spec.get("distribution", "normal")
+    if distribution in ("triangular", "uniform") and (
+        spec.get("low") is None or spec.get("high") is None
+    ):
+        raise ValueError(f"{distribution} distribution requires low and high")
+    if distribution == "normal":
+        values = 1 + spec.get("std", 0.0) * rng.standard_normal(size)
+    elif distribution == "lognormal":
+        sigma = spec.get("std", 0.0)
+        values = rng.lognormal(-sigma**2 / 2, sigma, size)  # media 1
+    elif distribution == "triangular":
+        values = rng.triangular(spec["low"], spec.get("mode", 1.0), spec["high"], size)
+    elif distribution == "uniform":
+        values = rng.uniform(spec["low"], spec["high"], size)
+    else:
+        raise ValueError(f"Unknown distribution: {distribution}")
+    return np.clip(values, 0, None)
+
+
+def _simulate_chunk(
+    seed: np.random.SeedSequence,
+    size: int,
+    capacity_mw: float,
+    annual_production_mwh: float,
+    params: Dict,
+    distributions: Dict[str, Dict],
+    yield_uncertainty: float,
+    yield_variability: float,
+    lifetime: int,
+) -> Dict[str, np.ndarray]:
+    """Evaluate one block of draws; top-level so it can run in a worker process."""
+    rng = np.random.default_rng(seed)
+
+    sampled = dict(params)
+    for name, spec in distributions.items():
+        sampled[name] = params[name] * sample_multipliers(rng, spec, size)
+
+    level = np.clip(1 + yield_uncertainty * rng.standard_normal(size), 0, None)
+    interannual = np.clip(
+        1 + yield_variability * rng.standard_normal((size, lifetime)), 0, None
+    )
+
+    result = financial_engine.evaluate(
+        capacity_mw,
+        annual_production_mwh * level,
+        sampled,
+        lifetime=lifetime,
+        yield_factors=interannual,
+    )
+    return {
+        name: np.broadcast_to(result[name], (size,))
+        for name in OUTPUT_METRICS if name in result
+    }
+
+
+def _summarize(values: np.ndarray, name: str, bins: int) -> Optional[Dict]:
+    finite = values[np.isfinite(values)]
+    if finite.size == 0:
+        return None
+    percentiles = np.percentile(finite, PERCENTILES)
+    by_p = dict(zip(PERCENTILES, percentiles.tolist()))
+    p90 = by_p[90] if name in HIGHER_IS_WORSE else by_p[10]
+    counts, edges = np.histogram(finite, bins=bins)
+    return {
+        "mean": float(finite.mean()),
+        "std": float(finite.std()),
+        "p50": by_p[50],
+        "p90": p90,
+        "percentiles": {f"p{p}": v for p, v in by_p.items()},
+        "valid_draws": int(finite.size),
+        "histogram": {"edges": edges.tolist(), "counts": counts.tolist()},
+    }
+
+
+MAX_WORKERS = max(settings.MONTE_CARLO_MAX_WORKERS or os.cpu_count() or 1, 1)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _shared_pool() -> ProcessPoolExecutor:
+    """Process pool created on first use and reused by every request."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+        return _pool
+
+
+def shutdown_pool() -> None:
+    """Stop the shared pool's processes (a later run starts a new one)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+
+
+def run_monte_carlo(
+    capacity_mw: float,
+    annual_production_mwh: float,
+    params: Dict,
+    draws: int = 100_000,
+    distributions: Optional[Dict[str, Dict]] = None,
+    yield_uncertainty: float = DEFAULT_YIELD_UNCERTAINTY,
+    yield_variability: float = DEFAULT_YIELD_VARIABILITY,
+    seed: Optional[int] = None,
+    workers: int = 1,
+    bins: int = 50,
+    lifetime: int = financial_engine.PROJECT_LIFETIME,
+) -> Dict:
+    """
+    Run ``draws`` Monte Carlo evaluations and summarize each metric with
+    mean, P50/P90, percentiles and a histogram.
+
+    NPV, IRR and payback are only produced when ``params`` has an
+    ``electricity_price``. ``workers`` (capped at ``MAX_WORKERS``) is how
+    many chunks of this run are evaluated at once in the shared pool.
+    """
+    distributions = DEFAULT_DISTRIBUTIONS if distributions is None else distributions
+    for name in distributions:
+        if params.get(name) is None:
+            raise ValueError(f"Unknown or unset parameter: {name}")
+
+    sizes = [CHUNK_SIZE] * (draws // CHUNK_SIZE)
+    if draws % CHUNK_SIZE:
+        sizes.append(draws % CHUNK_SIZE)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = (
+        capacity_mw, annual_production_mwh, params, distributions,
+        yield_uncertainty, yield_variability, lifetime,
+    )
+
+    workers = min(workers, MAX_WORKERS, len(sizes))
+    if workers > 1:
+        pool = _shared_pool()
+        chunks = []
+        try:
+            # Como mucho ``workers`` bloques de esta corrida en vuelo a la vez
+            for start in range(0, len(sizes), workers):
+                batch = sizes[start:start + workers]
+                chunks.extend(pool.map(
+                    _simulate_chunk, seeds[start:start + workers], batch,
+                    *[[a] * len(batch) for a in args]
+                ))
+        except BrokenProcessPool:
+            # Un proceso murió: descartar el pool para que la próxima corrida cree otro
+            shutdown_pool()
+            raise
+    else:
+        chunks = [_simulate_chunk(s, n, *args) for s, n in zip(seeds, sizes)]
+
+    metrics = {}
+    for name in chunks[0]:
+        values = np.concatenate([chunk[name] for chunk in chunks])
+        metrics[name] = _summarize(values, name, bins)
+
+    if "npv" in chunks[0]:
+        npv = np.concatenate([chunk["npv"] for chunk in chunks])
+        metrics["probability_npv_positive"] = float((npv > 0).mean())
+
+    return {
+        "draws": draws,
+        "seed": seed,
+        "distributions": distributions,
+        "yield_uncertainty": yield_uncertainty,
+        "yield_variability": yield_variability,
+        "metrics": metrics,
+    }
@@ -0,0 +1,182 @@
+# backend/app/services/financial_sensitivity.py
+"""
+Sensitivity (tornado / spider) analysis over scenario parameters.
+
+Every perturbation of every parameter is laid out on a
+``(parameters, steps)`` grid and evaluated in a single batched call to
+the financial engine; nothing touches the database.
+"""
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services import financial_engine
+
+# Parámetros que se pueden perturbar ("annual_production" = rendimiento del diseño)
+SENSITIVITY_PARAMETERS = (
+    "module_cost",
+    "inverter_cost",
+    "bos_cost",
+    "installation_cost",
+    "om_cost_per_mw_year",
+    "discount_rate",
+    "inflation_rate",
+    "annual_degradation",
+    "annual_production",
+    "electricity_price",
+    "electricity_price_escalation",
+    "debt_percentage",
+    "interest_rate",
+    "target_dscr",
+    "tax_rate",
+    "itc_rate",
+    "ptc_rate",
+)
+
+# Sólo mueven métricas de flujo de caja: sin precio el LCOE (antes de
+# impuestos y financiamiento) no cambia
+REVENUE_PARAMETERS = (
+    "electricity_price_escalation",
+    "tax_rate",
+    "itc_rate",
+    "ptc_rate",
+    "debt_percentage",
+    "interest_rate",
+    "target_dscr",
+)
+
+# Sólo actúan con un préstamo (tasa y plazo)
+LOAN_PARAMETERS = ("debt_percentage", "interest_rate", "target_dscr")
+
+DEFAULT_PARAMETERS = (
+    "module_cost",
+    "bos_cost",
+    "discount_rate",
+    "annual_degradation",
+    "annual_production",
+)
+
+
+def run_sensitivity(
+    capacity_mw: float,
+    annual_production_mwh: float,
+    params: Dict,
+    parameters: Sequence[str] = DEFAULT_PARAMETERS,
+    variation: float = 0.2,
+    steps: int = 5,
+) -> Dict:
+    """
+    Perturb each parameter by ``±variation`` (relative) over ``steps`` points
+    and return tornado (extremes sorted by swing) and spider (full curves) data
+    for LCOE and, if an electricity price is set, NPV and IRR (plus equity
+    IRR and minimum DSCR when a loan is specified).
+
+    Parameters whose perturbation cannot move any metric (a zero base
+    value, revenue-side parameters without a price, financing parameters
+    without a loan) raise ``ValueError`` instead of giving a zero swing.
+    """
+    for name in parameters:
+        if name not in SENSITIVITY_PARAMETERS:
+            raise ValueError(f"Unknown parameter: {name}")
+        if name == "annual_production":
+            continue
+        if params.get(name) is None:
+            raise ValueError(f"{name} sensitivity requires a value for {name}")
+        # Una variación relativa de 0 es siempre 0
+        if params[name] == 0:
+            raise ValueError(f"{name} sensitivity requires a non-zero {name}")
+        if name in REVENUE_PARAMETERS and params.get("electricity_price") is None:
+            raise ValueError(f"{name} sensitivity requires an electricity price")
+        if name in LOAN_PARAMETERS and (
+            params.get("interest_rate") is None or params.get("loan_term_years") is None
+        ):
+            raise ValueError(f"{name} sensitivity requires interest_rate and loan_term_years")
+
+    changes = np.linspace(-variation, variation, steps)
+    shape = (len(parameters), steps)
+
+    batch = {
+        name: np.full(shape, value, dtype=float)
+        for name, value in params.items() if value is not None
+    }
+    production = np.full(shape, annual_production_mwh, dtype=float)
+    for i, name in enumerate(parameters):
+        target = production if name == "annual_production" else batch[name]
+        target[i] *= 1 + changes
+
+    result = financial_engine.evaluate(capacity_mw, production, batch)
+    base = financial_engine.evaluate(capacity_mw, annual_production_mwh, params)
+
+    metrics = ["lcoe"] + [
+        m for m in ("npv", "irr", "equity_irr", "min_dscr") if m in base
+    ]
+    base_values = {m: financial_engine.metric(base, m) for m in metrics}
+
+    tornado = {}
+    for m in metrics:
+        low = result[m][:, 0]
+        high = result[m][:, -1]
+        swing = np.abs(high - low)
+        order = np.argsort(-np.nan_to_num(swing, nan=-1))
+        tornado[m] = [
+            {
+                "parameter": parameters[i],
+                "low": financial_engine.metric(result, m, (i, 0)),
+                "high": financial_engine.metric(result, m, (i, -1)),
+                "swing": None if np.isnan(swing[i]) else float(swing[i]),
+            }
+            for i in order
+        ]
+
+    spider = {
+        name: {
+            m: [financial_engine.metric(result, m, (i, j)) for j in range(steps)]
+            for m in metrics
+        }
+        for i, name in enumerate(parameters)
+    }
+
+    return {
+        "variation": variation,
+        "changes_pct": np.round(changes * 100, 6).tolist(),
+        "base": base_values,
+        "tornado": tornado,
+        "spider": spider,
+    }
+
+
+@lru_cache(maxsize=256)
+def _cached_sensitivity(
+    capacity_mw: float,
+    annual_production_mwh: float,
+    params: Tuple[Tuple[str, Optional[float]], ...],
+    parameters: Tuple[str, ...],
+    variation: float,
+    steps: int,
+) -> Dict:
+    return run_sensitivity(
+        capacity_mw, annual_production_mwh, dict(params), parameters, variation, steps
+    )
+
+
+def cached_sensitivity(
+    capacity_mw: float,
+    annual_production_mwh: float,
+    params: Dict,
+    parameters: Sequence[str] = DEFAULT_PARAMETERS,
+    variation: float = 0.2,
+    steps: int = 5,
+) -> Dict:
+    """
+    ``run_sensitivity`` memoized on its input values, so a changed design or
+    scenario simply misses the cache. The returned dict is shared; do not mutate.
+    """
+    return _cached_sensitivity(
+        capacity_mw,
+        annual_production_mwh,
+        tuple(sorted(params.items())),
+        tuple(parameters),
+        variation,
+        steps,
+    )
@@ -0,0 +1,137 @@
+# backend/app/services/goal_seek.py
+"""
+Goal seek on top of the financial engine: find the electricity price,
+CAPEX/W or capacity that makes a metric hit a target.
+
+Each case has its own bracket and all cases advance together (Illinois
+variant of regula falsi): every iteration is one batched engine call.
+IRR targets are solved as "NPV at the target rate = 0", which is
+equivalent for conventional cash flows, monotone in price and CAPEX and
+defined everywhere in the bracket (unlike the IRR itself).
+"""
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app.services import financial_engine
+
+# Variable -> intervalo de búsqueda por defecto
+VARIABLES = {
+    "electricity_price": (0.0, 2.0),  # USD/kWh
+    "capex_per_w": (0.01, 10.0),      # USD/W
+    "capacity_mw": (0.01, 10_000.0),  # MW (producción proporcional)
+}
+
+TARGETS = ("irr", "equity_irr", "npv", "lcoe", "min_dscr")
+
+# Métricas que no dependen de la variable
+_UNSOLVABLE = {("electricity_price", "lcoe")}
+
+
+def _evaluate(variable: str, x: np.ndarray, capacity_mw, annual_production_mwh, params, scaling):
+    if variable == "capacity_mw":
+        annual_production_mwh = np.asarray(annual_production_mwh, dtype=float) * x / capacity_mw
+        capacity_mw = x
+    # Curvas de escala a la capacidad evaluada, como en el resto de los análisis
+    params = dict(financial_engine.scale_costs(capacity_mw, params, scaling))
+    if variable == "electricity_price":
+        params["electricity_price"] = x
+    elif variable == "capex_per_w":
+        # Escalar todos los componentes para que sumen x USD/W
+        total = sum(np.asarray(params[name], dtype=float) for name in financial_engine.CAPEX_COMPONENTS)
+        for name in financial_engine.CAPEX_COMPONENTS:
+            params[name] = np.asarray(params[name], dtype=float) * x / total
+    return financial_engine.evaluate(capacity_mw, annual_production_mwh, params)
+
+
+def _residual(result: Dict, target: str, value: float) -> np.ndarray:
+    if target == "irr":
+        return financial_engine.npv(result["net_cash_flow"], value)
+    if target == "equity_irr":
+        return financial_engine.npv(result["equity_cash_flow"], value)
+    return result[target] - value
+
+
+def goal_seek(
+    capacity_mw: np.ndarray,
+    annual_production_mwh: np.ndarray,
+    params: Dict,
+    variable: str,
+    target: str,
+    value: float,
+    bracket: Optional[Tuple[float, float]] = None,
+    scaling: Optional[Dict] = None,
+    xtol: float = 1e-9,
+    max_iter: int = 100,
+) -> Dict[str, np.ndarray]:
+    """
+    Solve ``target(variable) = value`` for a batch of cases (shape of
+    ``capacity_mw``). Returns the solution, the metric achieved there and
+    whether each case converged; NaN where the bracket holds no root.
+    ``params`` are unscaled; ``scaling`` (the scenario's cost_scaling) is
+    applied at each evaluated capacity.
+    """
+    if variable not in VARIABLES:
+        raise ValueError(f"Unknown variable: {variable}")
+    if target not in TARGETS:
+        raise ValueError(f"Unknown target: {target}")
+    if (variable, target) in _UNSOLVABLE:
+        raise ValueError(f"{target} does not depend on {variable}")
+    if target != "lcoe" and variable != "electricity_price" and params.get("electricity_price") is None:
+        raise ValueError(f"{target} requires an electricity price")
+    if target in ("equity_irr", "min_dscr") and (
+        params.get("interest_rate") is None or params.get("loan_term_years") is None
+    ):
+        raise ValueError(f"{target} requires interest_rate and loan_term_years")
+
+    capacity_mw = np.asarray(capacity_mw, dtype=float)
+    low, high = bracket or VARIABLES[variable]
+    args = (capacity_mw, annual_production_mwh, params, scaling)
+
+    def f(x):
+        with np.errstate(all="ignore"):
+            return _residual(_evaluate(variable, x, *args), target, value)
+
+    a = np.full(capacity_mw.shape, float(low))
+    b = np.full(capacity_mw.shape, float(high))
+    fa, fb = f(a), f(b)
+    bracketed = np.isfinite(fa) & np.isfinite(fb) & (np.sign(fa) != np.sign(fb))
+
+    side = np.zeros(capacity_mw.shape, dtype=int)  # Último extremo retenido (Illinois)
+    converged = ~bracketed | (fa == 0) | (fb == 0)
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        active = ~converged
+        if not active.any():
+            break
+        with np.errstate(all="ignore"):
+            c = np.where(active, b - fb * (b - a) / (fb - fa), b)
+        # Si la secante sale del intervalo, bisección (caer en un extremo = paso nulo)
+        bad = ~np.isfinite(c) | (c < np.minimum(a, b)) | (c > np.maximum(a, b))
+        c = np.where(active & bad, (a + b) / 2, c)
+        fc = f(c)
+
+        same = np.sign(fc) == np.sign(fb)
+        # Raíz entre b y c: a <- b; si no, a se retiene y se reduce su peso
+        a_new = np.where(same, a, b)
+        fa_new = np.where(same, np.where(side == -1, fa / 2, fa), fb)
+        side = np.where(same, -1, 1)
+        step = np.abs(c - b)
+        a = np.where(active, a_new, a)
+        fa = np.where(active, fa_new, fa)
+        b = np.where(active, c, b)
+        fb = np.where(active, fc, fb)
+        # Convergido si el intervalo o el último paso son menores que la tolerancia
+        tol = xtol * (1 + np.abs(b))
+        converged |= active & ((np.abs(b - a) <= tol) | (step <= tol) | (fc == 0))
+
+    solution = np.where(bracketed, b, np.nan)
+    achieved = _evaluate(variable, np.where(bracketed, solution, low), *args)
+    metric = achieved.get(target)
+    return {
+        "solution": solution,
+        "achieved": np.where(bracketed, np.broadcast_to(metric, solution.shape), np.nan)
+        if metric is not None else np.full(solution.shape, np.nan),
+        "converged": bracketed & converged,
+        "iterations": iterations,
+    }
@@ -0,0 +1,107 @@
+# backend/app/services/portfolio.py
+"""
+Portfolio-level financial rollup across all projects of a user.
+
+The rollup aggregates the latest ``FinancialAnalysis`` of every design
+(one windowed query, see ``crud.financial_analysis.get_latest_by_owner``).
+It can be materialized in ``portfolio_summaries``; the summary is
+(re)materialized whenever one of the owner's analyses is created.
+"""
+from typing import Dict, List
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.models import PortfolioSummary
+
+
+def _aggregate(rows: List) -> Dict:
+    capacity = sum(r.capacity_mw or 0 for r in rows)
+    production = sum(r.annual_production_mwh or 0 for r in rows)
+    investment = sum(r.total_investment or 0 for r in rows)
+
+    # LCOE combinado ponderado por la producción anual
+    weighted = [(r.lcoe, r.annual_production_mwh) for r in rows if r.lcoe and r.annual_production_mwh]
+    weight = sum(mwh for _, mwh in weighted)
+    npvs = [r.npv for r in rows if r.npv is not None]
+
+    return {
+        "designs": len(rows),
+        "capacity_mw": capacity,
+        "annual_production_mwh": production,
+        "total_investment": investment,
+        "capex_per_w": investment / (capacity * 1_000_000) if capacity else None,
+        "blended_lcoe": sum(l * mwh for l, mwh in weighted) / weight if weight else None,
+        "total_npv": sum(npvs) if npvs else None,
+        "designs_with_npv": len(npvs),  # El NPV requiere precio de electricidad
+    }
+
+
+def compute_portfolio(db: Session, owner_id: int) -> Dict:
+    """Portfolio totals plus a per-project breakdown."""
+    rows = crud.financial_analysis.get_latest_by_owner(db=db, owner_id=owner_id)
+
+    by_project: Dict[int, List] = {}
+    for row in rows:
+        by_project.setdefault(row.project_id, []).append(row)
+
+    return {
+        "owner_id": owner_id,
+        "projects": len(by_project),
+        **_aggregate(rows),
+        "by_project": [
+            {
+                "project_id": project_id,
+                "project_name": project_rows[0].project_name,
+                **_aggregate(project_rows),
+                "last_analysis_at": max(r.created_at for r in project_rows).isoformat()
+                if all(r.created_at for r in project_rows) else None,
+            }
+            for project_id, project_rows in by_project.items()
+        ],
+    }
+
+
+def _materialize(db: Session, owner_id: int) -> PortfolioSummary:
+    """
+    Compute and store the owner's summary (insert or update). Safe when
+    concurrent requests create the first row: the loser updates it instead.
+    """
+    summary = compute_portfolio(db, owner_id)
+    cached = db.get(PortfolioSummary, owner_id)
+    if cached is None:
+        try:
+            cached = PortfolioSummary(owner_id=owner_id, summary=summary)
+            db.add(cached)
+            db.commit()
+            db.refresh(cached)
+            return cached
+        except IntegrityError:
+            # Otra petición creó la fila primero: actualizar esa
+            db.rollback()
+            cached = db.get(PortfolioSummary, owner_id)
+    cached.summary = summary
+    db.add(cached)
+    db.commit()
+    db.refresh(cached)
+    return cached
+
+
+def get_portfolio(db: Session, owner_id: int, use_cache: bool = True) -> Dict:
+    """
+    Portfolio rollup. With ``use_cache`` the materialized summary is served
+    if present, or computed and materialized on first use.
+    """
+    if not use_cache:
+        return compute_portfolio(db, owner_id)
+
+    cached = db.get(PortfolioSummary, owner_id)
+    if cached is None:
+        cached = _materialize(db, owner_id)
+    return {**cached.summary, "cached": True, "refreshed_at": cached.refreshed_at}
+
+
+def refresh_portfolio(db: Session, owner_id: int) -> None:
+    """Recompute the owner's materialized summary, creating it if missing."""
+    _materialize(db, owner_id)
@@ -0,0 +1,120 @@
+# backend/app/services/price_curves.py
+"""
+Hourly and time-of-use (TOU) electricity price curves.
+
+Curves are stored as zlib-compressed float32 arrays (``PriceCurve.prices``):
+8760 local-time hourly prices, or a ``(2, 12, 24)`` TOU matrix
+(weekday/weekend x month x hour). Expanded, UTC-aligned hourly arrays are
+kept in a per-process cache, so revenue for any number of designs is a
+single matrix-vector product against the hourly production matrix.
+"""
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+HOURS_PER_YEAR = 8760
+TOU_SHAPE = (2, 12, 24)
+
+_DAYS_PER_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# Año de referencia (no bisiesto, empieza en lunes) para expandir TOU
+_HOUR_MONTH = np.repeat(np.arange(12), np.array(_DAYS_PER_MONTH) * 24)
+_HOUR_OF_DAY = np.tile(np.arange(24), 365)
+_HOUR_WEEKEND = ((np.arange(HOURS_PER_YEAR) // 24) % 7 >= 5).astype(int)
+
+# id -> (created_at, precios horarios en UTC)
+_cache: Dict[int, Tuple[str, np.ndarray]] = {}
+
+
+def encode_prices(values: np.ndarray) -> bytes:
+    return zlib.compress(np.asarray(values, dtype="<f4").tobytes(), 6)
+
+
+def decode_prices(blob: bytes, kind: str) -> np.ndarray:
+    values = np.frombuffer(zlib.decompress(blob), dtype="<f4").astype(np.float64)
+    return values.reshape(TOU_SHAPE) if kind == "tou" else values
+
+
+def expand_tou(matrix: np.ndarray) -> np.ndarray:
+    """Hourly (local time) prices of a ``(2, 12, 24)`` TOU matrix."""
+    return matrix[_HOUR_WEEKEND, _HOUR_MONTH, _HOUR_OF_DAY]
+
+
+def build_price_curve(
+    kind: str,
+    values: Optional[List[float]] = None,
+    tou_weekday: Optional[List[List[float]]] = None,
+    tou_weekend: Optional[List[List[float]]] = None,
+) -> Dict:
+    """
+    Validate an uploaded curve and return the ``PriceCurve`` columns
+    (compressed prices and summary statistics).
+    """
+    if kind == "hourly":
+        if values is None or len(values) not in (HOURS_PER_YEAR, HOURS_PER_YEAR + 24):
+            raise ValueError("Hourly curves need 8760 (or 8784) values")
+        stored = np.asarray(values, dtype=float)[:HOURS_PER_YEAR]
+        hourly = stored
+    elif kind == "tou":
+        if tou_weekday is None:
+            raise ValueError("TOU curves need a 12x24 weekday matrix")
+        weekday = np.asarray(tou_weekday, dtype=float)
+        weekend = weekday if tou_weekend is None else np.asarray(tou_weekend, dtype=float)
+        if weekday.shape != TOU_SHAPE[1:] or weekend.shape != TOU_SHAPE[1:]:
+            raise ValueError("TOU matrices must be 12 months x 24 hours")
+        stored = np.stack([weekday, weekend])
+        hourly = expand_tou(stored)
+    else:
+        raise ValueError(f"Unknown price curve kind: {kind}")
+
+    if not np.isfinite(stored).all():
+        raise ValueError("Prices must be finite numbers")
+
+    return {
+        "kind": kind,
+        "prices": encode_prices(stored),
+        "average_price": float(hourly.mean()),
+        "min_price": float(hourly.min()),
+        "max_price": float(hourly.max()),
+    }
+
+
+def hourly_prices(curve, longitude: Optional[float] = None) -> np.ndarray:
+    """
+    8760 hourly prices of a ``PriceCurve`` aligned to UTC hours (like the
+    weather and production series). The curve's ``utc_offset_hours`` is
+    used, or the solar offset of ``longitude`` if the curve has none.
+    """
+    offset = curve.utc_offset_hours
+    if offset is None:
+        offset = round((longitude or 0) / 15)
+    offset = int(round(offset))
+
+    key = str(curve.created_at)
+    cached = _cache.get(curve.id)
+    if cached is None or cached[0] != key:
+        prices = decode_prices(curve.prices, curve.kind)
+        local = expand_tou(prices) if curve.kind == "tou" else prices
+        local.setflags(write=False)
+        _cache[curve.id] = cached = (key, local)
+
+    # Hora UTC h corresponde a la hora local h + offset
+    return np.roll(cached[1], -offset)
+
+
+def revenue(production_mwh: np.ndarray, prices: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Year-1 revenue (USD) of hourly production rows ``(n, 8760)`` in MWh
+    against hourly prices in USD/kWh, plus the capture price (USD/kWh)
+    and value factor (capture price / time-average price).
+    """
+    annual_revenue = production_mwh @ prices * 1000
+    energy_kwh = production_mwh.sum(axis=-1) * 1000
+    with np.errstate(divide="ignore", invalid="ignore"):
+        capture_price = annual_revenue / energy_kwh
+    return {
+        "annual_revenue": annual_revenue,
+        "capture_price": capture_price,
+        "value_factor": capture_price / prices.mean(),
+    }
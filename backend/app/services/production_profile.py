@@ -0,0 +1,127 @@
+# backend/app/services/production_profile.py
+"""
+Hourly production series of designs, for revenue models that need the
+shape of production over the year and not only its annual total.
+
+A stored simulation series (``simulation_results["hourly_production_mwh"]``)
+is used when available. Otherwise the series is shaped by the
+plane-of-array irradiance of the design's orientation at the project site
+(isotropic sky, from the cached weather) and scaled to the design's
+``annual_production_mwh``. Designs at the same site share the weather
+arrays, so the profiles of many designs are built as one matrix.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.services.weather_archive import load_weather_arrays
+from app.services.weather_quality import solar_position
+
+HOURS_PER_YEAR = 8760
+WEATHER_SOURCES = ("pvgis", "openmeteo")
+DEFAULT_ALBEDO = 0.2
+
+
+def to_year(values, dtype=np.float64) -> np.ndarray:
+    """Truncate (leap year) or zero-pad a series to 8760 hours."""
+    out = np.zeros(HOURS_PER_YEAR, dtype=dtype)
+    values = np.asarray(values, dtype=dtype)[:HOURS_PER_YEAR]
+    out[:len(values)] = np.nan_to_num(values)
+    return out
+
+
+def plane_of_array(
+    weather: Dict[str, np.ndarray],
+    latitude: float,
+    longitude: float,
+    tilt: np.ndarray,
+    azimuth: np.ndarray,
+    albedo: float = DEFAULT_ALBEDO,
+) -> np.ndarray:
+    """
+    Hourly plane-of-array irradiance (W/m²) for one or many orientations,
+    shape ``tilt.shape + (8760,)``. Azimuth is a compass bearing
+    (0 = north, 180 = south), as in ``SolarDesign.azimuth_angle``.
+    """
+    ghi = to_year(weather["ghi"])
+    dni = to_year(weather["dni"])
+    dhi = to_year(weather["dhi"])
+
+    declination, hour_angle, _ = solar_position(HOURS_PER_YEAR, longitude)
+    lat = np.radians(latitude)
+    # Vector solar en coordenadas este-norte-arriba
+    sun_east = -np.cos(declination) * np.sin(hour_angle)
+    sun_north = (
+        np.sin(declination) * np.cos(lat)
+        - np.cos(declination) * np.sin(lat) * np.cos(hour_angle)
+    )
+    sun_up = (
+        np.sin(declination) * np.sin(lat)
+        + np.cos(declination) * np.cos(lat) * np.cos(hour_angle)
+    )
+
+    beta = np.radians(np.asarray(tilt, dtype=float))[..., None]
+    gamma = np.radians(np.asarray(azimuth, dtype=float))[..., None]
+    cos_aoi = (
+        sun_east * np.sin(beta) * np.sin(gamma)
+        + sun_north * np.sin(beta) * np.cos(gamma)
+        + sun_up * np.cos(beta)
+    )
+    beam = dni * np.where(sun_up > 0, np.clip(cos_aoi, 0, None), 0)
+    sky = dhi * (1 + np.cos(beta)) / 2
+    ground = ghi * albedo * (1 - np.cos(beta)) / 2
+    return beam + sky + ground
+
+
+def site_weather(db: Session, latitude: float, longitude: float) -> Optional[Dict[str, np.ndarray]]:
+    """Cached weather arrays of a site from the first source that has them, or None."""
+    for source in WEATHER_SOURCES:
+        weather = load_weather_arrays(db, latitude, longitude, source)
+        if weather is not None and len(weather.get("ghi", ())):
+            return weather
+    return None
+
+
+def hourly_production(
+    db: Session, designs: List, latitude: float, longitude: float
+) -> Tuple[np.ndarray, List[str]]:
+    """
+    Hourly production (MWh) of designs at one site, shape ``(len(designs), 8760)``,
+    and the source of each row (``"simulation"`` or ``"weather"``).
+
+    Raises ``ValueError`` if a design needs the weather shape and the site
+    has no cached weather.
+    """
+    production = np.zeros((len(designs), HOURS_PER_YEAR))
+    sources = []
+    shaped = []
+    for i, design in enumerate(designs):
+        series = (design.simulation_results or {}).get("hourly_production_mwh")
+        if series:
+            production[i] = to_year(series)
+            sources.append("simulation")
+        else:
+            shaped.append(i)
+            sources.append("weather")
+
+    if shaped:
+        weather = site_weather(db, latitude, longitude)
+        if weather is None:
+            raise ValueError("No weather data cached for the project location")
+        tilt = np.array([
+            designs[i].tilt_angle if designs[i].tilt_angle is not None else abs(latitude)
+            for i in shaped
+        ])
+        azimuth = np.array([
+            designs[i].azimuth_angle if designs[i].azimuth_angle is not None
+            else (0 if latitude < 0 else 180)
+            for i in shaped
+        ])
+        poa = plane_of_array(weather, latitude, longitude, tilt, azimuth)
+        annual = np.array([designs[i].annual_production_mwh for i in shaped], dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            shape = poa / poa.sum(axis=-1, keepdims=True)
+        production[shaped] = np.nan_to_num(shape) * annual[:, None]
+
+    return production, sources
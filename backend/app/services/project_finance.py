@@ -0,0 +1,125 @@
+# backend/app/services/project_finance.py
+"""
+Project-finance layer of the financial engine: level-annuity debt,
+amortization schedules, DSCR and debt sizing.
+
+Functions work on whole batches. Per-case inputs (rate, term, ...) come
+with a trailing axis (shape ``batch + (1,)``) so they broadcast against
+the year axis, exactly like the engine's other parameters.
+"""
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.services.tax import income_tax
+
+FINANCING_PARAMETERS = ("debt_percentage", "interest_rate", "loan_term_years", "target_dscr")
+
+
+def annuity_factor(rate: np.ndarray, term: np.ndarray) -> np.ndarray:
+    """Level payment per unit of principal: ``r / (1 - (1+r)^-n)`` (``1/n`` if r = 0)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(rate == 0, 1 / term, rate / (1 - (1 + rate) ** -term))
+
+
+def amortization(
+    principal: np.ndarray, rate: np.ndarray, term: np.ndarray, years: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """
+    Level-annuity schedule, shape ``batch + (len(years),)``: opening balance,
+    interest, principal repayment and debt service per year (zero after the term).
+    """
+    principal = np.asarray(principal, dtype=float)[..., None]
+    active = years <= term
+    growth = (1 + rate) ** (years - 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        accumulated = np.where(rate == 0, years - 1, (growth - 1) / rate)
+    payment = principal * annuity_factor(rate, term)
+
+    # Saldo al inicio de cada año: P(1+r)^(t-1) - A * s(t-1)
+    balance = np.where(active, np.clip(principal * growth - payment * accumulated, 0, None), 0)
+    interest = balance * rate
+    debt_service = np.where(active, payment, 0)
+    return {
+        "debt_balance": balance,
+        "interest": interest,
+        "principal_repayment": debt_service - interest,
+        "debt_service": debt_service,
+    }
+
+
+def size_debt(
+    cfads: np.ndarray,
+    rate: np.ndarray,
+    term: np.ndarray,
+    years: np.ndarray,
+    target_dscr: np.ndarray,
+) -> np.ndarray:
+    """
+    Largest principal whose minimum DSCR over the loan term meets ``target_dscr``.
+
+    With a level annuity the debt service is proportional to the principal,
+    so the root of ``min DSCR(P) = target`` is exact:
+    ``P = min(CFADS over term) / (target * annuity factor)``.
+    """
+    worst = np.where(years <= term, cfads, np.inf).min(axis=-1)
+    capacity = np.clip(worst, 0, None) / (target_dscr[..., 0] * annuity_factor(rate, term)[..., 0])
+    return np.where(np.isfinite(capacity), capacity, 0)
+
+
+def evaluate_financing(
+    investment: np.ndarray,
+    cfads: np.ndarray,
+    years: np.ndarray,
+    debt_percentage: np.ndarray,
+    interest_rate: np.ndarray,
+    loan_term_years: np.ndarray,
+    target_dscr: Optional[np.ndarray] = None,
+    taxable_income: Optional[np.ndarray] = None,
+    tax_rate: Optional[np.ndarray] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Debt, schedule, DSCR and equity cash flows for a batch of projects.
+
+    ``cfads`` is the cash flow available for debt service per year
+    (revenue - O&M + tax credits), before income tax. Debt is
+    ``debt_percentage`` of the investment, capped by the DSCR-sized amount
+    when ``target_dscr`` is given.
+
+    With ``taxable_income`` and ``tax_rate`` the tax is deducted from CFADS.
+    Debt is sized on the unlevered tax (conservative, avoids the circularity
+    with interest); DSCR and equity flows use the tax after deducting interest.
+    """
+    taxed = taxable_income is not None and tax_rate is not None
+    term = np.minimum(loan_term_years, len(years))
+    principal = np.asarray(investment, dtype=float) * debt_percentage[..., 0]
+    if target_dscr is not None:
+        sizing_cfads = cfads - income_tax(taxable_income, tax_rate) if taxed else cfads
+        principal = np.minimum(principal, size_debt(sizing_cfads, interest_rate, term, years, target_dscr))
+
+    schedule = amortization(principal, interest_rate, term, years)
+    debt_service = schedule["debt_service"]
+    if taxed:
+        cfads = cfads - income_tax(taxable_income - schedule["interest"], tax_rate)
+    active = debt_service > 0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dscr = np.where(active, cfads / debt_service, np.nan)
+        min_dscr = np.where(active.any(axis=-1), np.where(active, dscr, np.inf).min(axis=-1), np.nan)
+        average_dscr = np.where(active, dscr, 0).sum(axis=-1) / active.sum(axis=-1)
+
+    flows = cfads - debt_service
+    batch_shape = np.broadcast_shapes(np.shape(principal), np.shape(investment), flows.shape[:-1])
+    equity = np.concatenate([
+        np.broadcast_to(-(np.asarray(investment) - principal)[..., None], batch_shape + (1,)),
+        np.broadcast_to(flows, batch_shape + flows.shape[-1:]),
+    ], axis=-1)
+
+    return {
+        "debt_amount": principal,
+        **schedule,
+        "dscr": dscr,
+        "min_dscr": min_dscr,
+        "average_dscr": average_dscr,
+        "equity_cash_flow": equity,
+    }
@@ -0,0 +1,161 @@
+# backend/app/services/string_allocation.py
+"""
+Allocation of strings to inverters and MPPT inputs.
+
+Integer heuristic, evaluated for every feasible string length at once:
+
+1. Strings per inverter are capped by the MPPT inputs (channels x strings
+   allowed by each input's current rating and the panel Isc), by
+   ``power_dc_max_w`` and by the target DC/AC ratio, so no inverter is
+   loaded beyond the target.
+2. The string length leaves the fewest unused modules, then needs the
+   fewest inverters, then has the least clipping (longest strings on ties).
+3. Strings are spread evenly: every inverter gets q or q+1 strings and
+   every MPPT input of an inverter a or a+1, so at most two inverter groups
+   result whatever the plant size.
+
+``layout`` is the vectorized core (steps 1 and 3) and is shared with
+``component_selection``, so a ranked candidate and its allocation agree.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Clipping: 2% por unidad de DC/AC sobre 1.5
+CLIPPING_FREE_RATIO = 1.5
+CLIPPING_LOSS_PER_RATIO = 0.02
+
+
+def clipping_loss(ratio):
+    """Estimated clipping loss (fraction of energy) at a DC/AC ratio."""
+    return np.clip((ratio - CLIPPING_FREE_RATIO) * CLIPPING_LOSS_PER_RATIO, 0, 1)
+
+
+def layout(
+    total_panels,
+    modules,
+    panel_power_w,
+    inverter_ac_w,
+    inverter_dc_max_w,
+    max_strings,
+    target_dc_ac_ratio,
+) -> Dict[str, np.ndarray]:
+    """
+    Strings, strings-per-inverter cap, inverters and clipping for candidate
+    string lengths (all arguments broadcast). ``max_strings`` is the MPPT
+    limit per inverter (channels x strings per input). Candidates where not
+    even one string fits have ``feasible`` False and 0 inverters.
+    """
+    strings = np.floor(total_panels / modules)
+    string_w = modules * panel_power_w
+    cap = np.minimum(
+        np.minimum(max_strings, np.floor(inverter_dc_max_w / string_w)),
+        # Al menos un string aunque supere el ratio objetivo
+        np.maximum(np.floor(target_dc_ac_ratio * inverter_ac_w / string_w), 1),
+    )
+    feasible = (cap >= 1) & (strings >= 1)
+    inverters = np.where(feasible, np.ceil(strings / np.maximum(cap, 1)), 0)
+
+    dc_w = strings * string_w
+
+    # Reparto parejo: r inversores con q+1 strings y el resto con q. Sólo se
+    # calcula donde el inversor más cargado supera el ratio libre de clipping
+    n = np.maximum(inverters, 1)
+    peak_w = np.ceil(strings / n) * string_w
+    clipping = np.zeros(np.shape(peak_w))
+    over = feasible & (peak_w > CLIPPING_FREE_RATIO * inverter_ac_w)
+    if over.any():
+        s, n, w, ac = (
+            np.broadcast_to(x, over.shape)[over] for x in (strings, n, string_w, inverter_ac_w)
+        )
+        q = np.floor(s / n)
+        r = s - q * n
+        # Clipping ponderado por la potencia DC de cada grupo
+        clipping[over] = (
+            r * (q + 1) * clipping_loss((q + 1) * w / ac) + (n - r) * q * clipping_loss(q * w / ac)
+        ) / s
+    return {
+        "strings": strings,
+        "max_strings_per_inverter": cap,
+        "feasible": feasible,
+        "inverters": inverters,
+        "dc_w": dc_w,
+        "ac_w": inverters * inverter_ac_w,
+        "clipping": clipping,
+    }
+
+
+def _mppt_strings(strings: int, channels: int) -> List[int]:
+    """Strings per MPPT input of one inverter, as even as possible."""
+    base, extra = divmod(strings, channels)
+    return [base + 1] * extra + [base] * (channels - extra)
+
+
+def allocate_strings(
+    total_panels: int,
+    panel_power_w: float,
+    panel_isc: Optional[float],
+    inverter_ac_w: float,
+    inverter_dc_max_w: float,
+    mppt_channels: int,
+    max_strings_per_mppt: int,
+    min_modules: int,
+    max_modules: int,
+    target_dc_ac_ratio: float = 1.25,
+    modules_per_string: Optional[int] = None,
+) -> Dict:
+    """
+    String length, inverter count and per-MPPT allocation for a plant of
+    ``total_panels`` modules. ``modules_per_string`` fixes the string
+    length; otherwise every length in ``[min_modules, max_modules]`` is
+    considered.
+
+    Raises ``ValueError`` when not even one string fits.
+    """
+    if modules_per_string:
+        modules = np.array([modules_per_string])
+    else:
+        modules = np.arange(min_modules, max_modules + 1)
+    channels = max(int(mppt_channels or 1), 1)
+
+    plan = layout(
+        total_panels, modules, panel_power_w, inverter_ac_w, inverter_dc_max_w,
+        channels * max_strings_per_mppt, target_dc_ac_ratio,
+    )
+    feasible = plan["feasible"]
+    if not feasible.any():
+        raise ValueError("No string of this panel fits the inverter for the design capacity")
+    unused = total_panels - plan["strings"] * modules
+
+    order = np.lexsort((-modules, plan["clipping"], plan["inverters"], unused, ~feasible))
+    best = order[0]
+    m, s, n_inverters = int(modules[best]), int(plan["strings"][best]), int(plan["inverters"][best])
+
+    q, r = divmod(s, n_inverters)
+    groups = []
+    for count, per_inverter in ((r, q + 1), (n_inverters - r, q)):
+        if count:
+            mppt = _mppt_strings(per_inverter, channels)
+            ratio = per_inverter * m * panel_power_w / inverter_ac_w
+            groups.append({
+                "inverters": count,
+                "strings_per_inverter": per_inverter,
+                "strings_per_mppt": mppt,
+                "dc_ac_ratio": round(ratio, 3),
+                "max_mppt_current_a": round(max(mppt) * panel_isc, 2) if panel_isc else None,
+                "clipping_loss": float(clipping_loss(ratio)),
+            })
+
+    dc_w = s * m * panel_power_w
+    return {
+        "modules_per_string": m,
+        "total_strings": s,
+        "total_inverters": n_inverters,
+        "panels_used": s * m,
+        "panels_unused": int(unused[best]),
+        "max_strings_per_inverter": int(plan["max_strings_per_inverter"][best]),
+        "dc_w": dc_w,
+        "ac_w": n_inverters * inverter_ac_w,
+        "clipping_loss": float(plan["clipping"][best]),
+        "groups": groups,
+    }
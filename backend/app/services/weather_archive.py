@@ -0,0 +1,293 @@
+# backend/app/services/weather_archive.py
+"""
+Memory-mapped on-disk archive of weather arrays for simulation workers.
+
+The database stays the source of truth; the archive is a read-optimized
+copy that every process on the host maps read-only, so the arrays live
+once in the page cache and are handed out as zero-copy NumPy views.
+
+Files in ``settings.WEATHER_ARCHIVE_DIR``:
+
+- ``weather_archive.<generation>.bin`` (``weather_archive.bin`` for
+  generation 0): 64-byte header followed by fixed-size slots, one per
+  record, each ``float32[len(ARCHIVE_FIELDS), HOURS_PER_SLOT]``. Slots are
+  only ever appended: a refreshed record gets a new slot and the index is
+  repointed, so readers never see a half-written slot. A compaction writes
+  the next generation's file instead of replacing the current one.
+- ``weather_archive.idx.json``: the data file it belongs to, plus record
+  id -> slot, location and the ``arrays_digest`` stamp used to detect
+  in-place rewrites (refreshes and QC re-packs). Replaced atomically on
+  every sync; readers always map the data file the index names, so slot
+  offsets and data can never come from different generations.
+"""
+import fcntl
+import json
+import mmap
+import os
+import struct
+from typing import Dict, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import WeatherData
+from app.services.weather_encoding import decode_weather_arrays
+
+MAGIC = b"SDWA"
+VERSION = 1
+HEADER_SIZE = 64
+HOURS_PER_SLOT = 8784  # Año bisiesto
+ARCHIVE_FIELDS = ("ghi", "dni", "dhi", "temp_air", "wind_speed")
+
+_HEADER = struct.Struct("<4sHHI")
+SLOT_SIZE = len(ARCHIVE_FIELDS) * HOURS_PER_SLOT * 4
+
+DATA_FILE = "weather_archive.bin"
+DATA_FILE_PATTERN = "weather_archive.{generation}.bin"
+INDEX_FILE = "weather_archive.idx.json"
+LOCK_FILE = "weather_archive.lock"
+
+
+def _location_key(latitude: float, longitude: float, source: str) -> str:
+    return f"{round(float(latitude), 3)}:{round(float(longitude), 3)}:{source}"
+
+
+def _data_file(generation: int) -> str:
+    return DATA_FILE if generation == 0 else DATA_FILE_PATTERN.format(generation=generation)
+
+
+def _record_arrays(record: WeatherData) -> Dict[str, np.ndarray]:
+    """Float32 arrays of a ``WeatherData`` row (encoded or legacy JSON)."""
+    if record.weather_arrays is not None:
+        return decode_weather_arrays(record.weather_arrays)
+    return {
+        name: np.asarray(record.weather_data.get(name) or [], dtype=np.float32)
+        for name in ARCHIVE_FIELDS
+    }
+
+
+class WeatherArchive:
+    """Read-only, process-local view over the shared archive files."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self._mmap: Optional[mmap.mmap] = None
+        self._mapped_file = None
+        self._index_stat = None
+        self._records: Dict[str, dict] = {}
+        self._by_location: Dict[str, str] = {}
+
+    def refresh(self) -> None:
+        """Reload the index and remap the data file if another process synced."""
+        # Reintentar si una compactación borra el archivo entre leer el índice y abrirlo
+        for _ in range(3):
+            try:
+                stat = os.stat(self.index_path)
+            except FileNotFoundError:
+                return
+            index_stat = (stat.st_ino, stat.st_mtime_ns)
+            if index_stat == self._index_stat:
+                return
+
+            with open(self.index_path) as f:
+                index = json.load(f)
+            data_path = os.path.join(self.directory, index.get("data_file", DATA_FILE))
+            try:
+                data = open(data_path, "rb")
+            except FileNotFoundError:
+                continue
+
+            # Remapear si el archivo creció o es de otra generación. El mapeo
+            # anterior no se cierra: las vistas entregadas lo mantienen vivo
+            # y el GC lo libera cuando dejan de usarse.
+            with data:
+                data_stat = os.fstat(data.fileno())
+                mapped_file = (data_path, data_stat.st_ino, data_stat.st_size)
+                if mapped_file != self._mapped_file:
+                    self._mmap = mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ)
+                    self._mapped_file = mapped_file
+
+            self._records = index["records"]
+            self._by_location = {
+                _location_key(r["latitude"], r["longitude"], r["source"]): record_id
+                for record_id, r in self._records.items()
+            }
+            self._index_stat = index_stat
+            return
+
+    def _slot_view(self, entry: dict) -> Dict[str, np.ndarray]:
+        block = np.frombuffer(
+            self._mmap,
+            dtype="<f4",
+            count=len(ARCHIVE_FIELDS) * HOURS_PER_SLOT,
+            offset=HEADER_SIZE + entry["slot"] * SLOT_SIZE,
+        ).reshape(len(ARCHIVE_FIELDS), HOURS_PER_SLOT)
+        n_hours = entry["n_hours"]
+        return {name: block[i, :n_hours] for i, name in enumerate(ARCHIVE_FIELDS)}
+
+    def get_by_id(self, record_id: int) -> Optional[Dict[str, np.ndarray]]:
+        """Zero-copy read-only float32 views for a ``WeatherData`` id."""
+        self.refresh()
+        entry = self._records.get(str(record_id))
+        if entry is None or self._mmap is None:
+            return None
+        return self._slot_view(entry)
+
+    def get(
+        self, latitude: float, longitude: float, source: str
+    ) -> Optional[Dict[str, np.ndarray]]:
+        """Zero-copy read-only float32 views for a location and source."""
+        self.refresh()
+        record_id = self._by_location.get(_location_key(latitude, longitude, source))
+        if record_id is None:
+            return None
+        return self.get_by_id(int(record_id))
+
+
+def sync_weather_archive(db: Session, directory: str, rebuild: bool = False) -> dict:
+    """
+    Bring the archive up to date with the ``weather_data`` table.
+
+    Only rows that are new or whose arrays were rewritten since the last
+    sync (different ``arrays_digest``) are decoded and appended; a lock file keeps concurrent
+    syncs from several workers serialized. ``rebuild=True`` writes a fresh,
+    compacted file (dropping slots superseded by refreshes) as the next
+    generation; the index switches to it atomically and the previous
+    generation's file is then deleted.
+    """
+    os.makedirs(directory, exist_ok=True)
+    index_path = os.path.join(directory, INDEX_FILE)
+
+    with open(os.path.join(directory, LOCK_FILE), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        previous = None
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                previous = json.load(f)
+        if previous and not rebuild:
+            index = previous
+            index.setdefault("generation", 0)
+            index.setdefault("data_file", DATA_FILE)
+        else:
+            # Generación nueva: ningún índice publicado nombra todavía su archivo
+            generation = previous.get("generation", 0) + 1 if previous else 0
+            index = {
+                "version": VERSION,
+                "fields": list(ARCHIVE_FIELDS),
+                "generation": generation,
+                "data_file": _data_file(generation),
+                "records": {},
+            }
+        records = index["records"]
+        data_path = os.path.join(directory, index["data_file"])
+
+        # Restos de una compactación interrumpida
+        if index is not previous and os.path.exists(data_path):
+            os.remove(data_path)
+        if not os.path.exists(data_path):
+            with open(data_path, "wb") as f:
+                header = _HEADER.pack(MAGIC, VERSION, len(ARCHIVE_FIELDS), HOURS_PER_SLOT)
+                f.write(header.ljust(HEADER_SIZE, b"\0"))
+
+        # Solo columnas livianas para detectar filas nuevas o refrescadas
+        stamps = db.query(WeatherData.id, WeatherData.arrays_digest).all()
+        pending = [
+            record_id for record_id, digest in stamps
+            if records.get(str(record_id), {}).get("stamp") != str(digest)
+        ]
+
+        added = 0
+        if pending:
+            with open(data_path, "r+b") as f:
+                f.seek(0, os.SEEK_END)
+                next_slot = (f.tell() - HEADER_SIZE) // SLOT_SIZE
+                for record in db.query(WeatherData).filter(WeatherData.id.in_(pending)):
+                    arrays = _record_arrays(record)
+                    block = np.zeros((len(ARCHIVE_FIELDS), HOURS_PER_SLOT), dtype="<f4")
+                    n_hours = 0
+                    for i, name in enumerate(ARCHIVE_FIELDS):
+                        values = arrays.get(name)
+                        if values is not None and len(values):
+                            n = min(len(values), HOURS_PER_SLOT)
+                            block[i, :n] = values[:n]
+                            n_hours = max(n_hours, n)
+                    f.write(block.tobytes())
+
+                    records[str(record.id)] = {
+                        "slot": next_slot,
+                        "latitude": record.latitude,
+                        "longitude": record.longitude,
+                        "source": record.source,
+                        "n_hours": n_hours,
+                        "stamp": str(record.arrays_digest),
+                    }
+                    next_slot += 1
+                    added += 1
+                f.flush()
+                os.fsync(f.fileno())
+
+        # Filas borradas de la BD dejan de estar indexadas
+        live = {str(record_id) for record_id, _ in stamps}
+        removed = [record_id for record_id in records if record_id not in live]
+        for record_id in removed:
+            del records[record_id]
+
+        if added or removed or rebuild or previous is None:
+            tmp_path = index_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, index_path)
+
+        # Los lectores ya mapeados conservan el archivo anterior hasta soltarlo
+        old_file = previous.get("data_file", DATA_FILE) if previous else None
+        if old_file is not None and old_file != index["data_file"]:
+            try:
+                os.remove(os.path.join(directory, old_file))
+            except FileNotFoundError:
+                pass
+
+        total_slots = (os.path.getsize(data_path) - HEADER_SIZE) // SLOT_SIZE
+        return {
+            "records": len(records),
+            "added": added,
+            "removed": len(removed),
+            "dead_slots": total_slots - len(records),
+        }
+
+
+_archive: Optional[WeatherArchive] = None
+
+
+def get_archive() -> Optional[WeatherArchive]:
+    """Process-wide archive, or None when ``WEATHER_ARCHIVE_DIR`` is not set."""
+    global _archive
+    if not settings.WEATHER_ARCHIVE_DIR:
+        return None
+    if _archive is None:
+        _archive = WeatherArchive(settings.WEATHER_ARCHIVE_DIR)
+    return _archive
+
+
+def load_weather_arrays(
+    db: Session, latitude: float, longitude: float, source: str = "pvgis"
+) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Float32 weather arrays for a location: archive first, database fallback.
+    """
+    archive = get_archive()
+    if archive is not None:
+        arrays = archive.get(latitude, longitude, source)
+        if arrays is not None:
+            return arrays
+
+    record = db.query(WeatherData).filter(
+        WeatherData.latitude == round(latitude, 3),
+        WeatherData.longitude == round(longitude, 3),
+        WeatherData.source == source
+    ).first()
+    if record is None:
+        return None
+    return _record_arrays(record)
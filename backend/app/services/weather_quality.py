@@ -0,0 +1,301 @@
+# backend/app/services/weather_quality.py
+"""
+Quality control and gap filling for hourly weather arrays.
+
+Runs once when data is ingested from a provider, so every consumer gets
+complete, physically plausible arrays with the QC summary stored in
+``metadata["quality"]`` and the site's design temperatures for string
+sizing in ``metadata["design_temperatures"]``.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+QC_VERSION = 2
+
+IRRADIANCE_FIELDS = ("ghi", "dni", "dhi")
+
+# Límites físicos de temperatura y viento
+TEMP_RANGE = (-60.0, 60.0)
+WIND_RANGE = (0.0, 50.0)
+
+# Saltos horarios de temperatura que se consideran picos espurios (°C)
+TEMP_SPIKE_DELTA = 10.0
+
+# Tolerancia del cierre GHI ≈ DNI·cosZ + DHI (fracción de GHI)
+CLOSURE_TOLERANCE = 0.25
+CLOSURE_MIN_GHI = 50.0
+
+# Valores por defecto si un campo no tiene ningún dato válido
+DEFAULT_TEMP_AIR = 20.0
+DEFAULT_WIND_SPEED = 2.0
+
+# Temperaturas de diseño: mínima ambiente registrada (Voc) y percentil alto
+# de temperatura de célula (Vmp), modelo NOCT sobre GHI
+DESIGN_CELL_PERCENTILE = 99
+DESIGN_NOCT = 45
+
+
+def solar_position(
+    n_hours: int, longitude: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Declination and hour angle (radians) and extraterrestrial irradiance
+    (W/m²) at the middle of each UTC hour of the year.
+    """
+    idx = np.arange(n_hours)
+    day_of_year = idx // 24 + 1
+    hour_utc = idx % 24 + 0.5
+
+    # Spencer (1971)
+    gamma = 2 * np.pi * (day_of_year - 1) / 365
+    declination = (
+        0.006918 - 0.399912 * np.cos(gamma) + 0.070257 * np.sin(gamma)
+        - 0.006758 * np.cos(2 * gamma) + 0.000907 * np.sin(2 * gamma)
+        - 0.002697 * np.cos(3 * gamma) + 0.00148 * np.sin(3 * gamma)
+    )
+    equation_of_time = 229.18 * (
+        0.000075 + 0.001868 * np.cos(gamma) - 0.032077 * np.sin(gamma)
+        - 0.014615 * np.cos(2 * gamma) - 0.040849 * np.sin(2 * gamma)
+    )
+    extraterrestrial = 1367 * (
+        1.00011 + 0.034221 * np.cos(gamma) + 0.00128 * np.sin(gamma)
+        + 0.000719 * np.cos(2 * gamma) + 0.000077 * np.sin(2 * gamma)
+    )
+
+    solar_time = hour_utc + longitude / 15 + equation_of_time / 60
+    hour_angle = np.radians(15 * (solar_time - 12))
+    return declination, hour_angle, extraterrestrial
+
+
+def solar_geometry(
+    n_hours: int, latitude: float, longitude: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cosine of the solar zenith angle and extraterrestrial irradiance (W/m²)
+    at the middle of each UTC hour of the year.
+    """
+    declination, hour_angle, extraterrestrial = solar_position(n_hours, longitude)
+    lat = np.radians(latitude)
+    cos_zenith = (
+        np.sin(lat) * np.sin(declination)
+        + np.cos(lat) * np.cos(declination) * np.cos(hour_angle)
+    )
+    return cos_zenith, extraterrestrial
+
+
+def clear_sky_ghi(cos_zenith: np.ndarray) -> np.ndarray:
+    """Haurwitz clear-sky GHI model (W/m²)."""
+    cz = np.clip(cos_zenith, 1e-6, None)
+    return np.where(cos_zenith > 0, 1098 * cz * np.exp(-0.059 / cz), 0.0)
+
+
+def erbs_diffuse_fraction(kt: np.ndarray) -> np.ndarray:
+    """Erbs et al. (1982) diffuse fraction from the clearness index."""
+    kt = np.clip(kt, 0, 1)
+    return np.select(
+        [kt <= 0.22, kt <= 0.8],
+        [
+            1 - 0.09 * kt,
+            0.9511 - 0.1604 * kt + 4.388 * kt**2 - 16.638 * kt**3 + 12.336 * kt**4,
+        ],
+        default=0.165,
+    )
+
+
+def design_temperatures(
+    ghi: np.ndarray, temp_air: np.ndarray, valid: Optional[np.ndarray] = None
+) -> Optional[Dict[str, float]]:
+    """
+    Record-low ambient temperature and high cell-temperature percentile
+    (°C) of a site, over the hours with a valid temperature. None if there
+    are none.
+    """
+    ghi = np.asarray(ghi, dtype=float)
+    temp_air = np.asarray(temp_air, dtype=float)
+    n_hours = min(len(ghi), len(temp_air))
+    ghi, temp_air = np.nan_to_num(ghi[:n_hours]), temp_air[:n_hours]
+    valid = ~np.isnan(temp_air) if valid is None else valid[:n_hours] & ~np.isnan(temp_air)
+    if not valid.any():
+        return None
+    cell = temp_air + np.clip(ghi, 0, None) * (DESIGN_NOCT - 20) / 800
+    return {
+        "temp_min": round(float(temp_air[valid].min()), 1),
+        "temp_max": round(float(np.percentile(cell[valid], DESIGN_CELL_PERCENTILE)), 1),
+        "cell_percentile": DESIGN_CELL_PERCENTILE,
+        "noct": DESIGN_NOCT,
+    }
+
+
+def _to_array(values: Optional[List], n_hours: int) -> np.ndarray:
+    """Convert a JSON list (possibly with nulls or short) to a float array."""
+    arr = np.full(n_hours, np.nan)
+    if values:
+        data = np.array(values[:n_hours], dtype=float)  # None -> nan
+        arr[: len(data)] = data
+    return arr
+
+
+def _interpolate(values: np.ndarray, invalid: np.ndarray, default: float) -> np.ndarray:
+    """Linear interpolation over invalid samples (edges hold the nearest value)."""
+    valid = ~invalid
+    if not valid.any():
+        return np.full(values.shape, default)
+    idx = np.arange(len(values))
+    return np.interp(idx, idx[valid], values[valid])
+
+
+def _temperature_spikes(temp: np.ndarray) -> np.ndarray:
+    """Isolated one-hour jumps in both directions (sensor/processing spikes)."""
+    d_prev = np.diff(temp, prepend=np.nan)
+    d_next = -np.diff(temp, append=np.nan)
+    with np.errstate(invalid="ignore"):
+        return (
+            (np.abs(d_prev) > TEMP_SPIKE_DELTA)
+            & (np.abs(d_next) > TEMP_SPIKE_DELTA)
+            & (np.sign(d_prev) == np.sign(d_next))
+        )
+
+
+def _runs(mask: np.ndarray) -> List[List[int]]:
+    """Run-length encode a boolean mask as [[start, length], ...]."""
+    if not mask.any():
+        return []
+    padded = np.concatenate(([0], mask.astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(padded))
+    starts, ends = edges[::2], edges[1::2]
+    return [[int(s), int(e - s)] for s, e in zip(starts, ends)]
+
+
+def apply_quality_control(weather_data: Dict, latitude: float, longitude: float) -> Dict:
+    """
+    Check and gap-fill a provider payload ``{ghi, dni, dhi, temp_air, wind_speed}``.
+
+    - Range checks against physical limits (BSRN-style for irradiance)
+    - Spike detection: GHI well above clear-sky, isolated temperature jumps
+    - Closure check GHI ≈ DNI·cosZ + DHI (flagged only)
+    - Missing or rejected samples filled from a clear-sky-index
+      interpolation (irradiance) or linear interpolation (temperature, wind)
+
+    Returns the same dict with cleaned lists, ``metadata["quality"]`` and
+    ``metadata["design_temperatures"]`` (measured temperatures only).
+    """
+    n_hours = max(len(weather_data.get(f) or []) for f in (*IRRADIANCE_FIELDS, "temp_air", "wind_speed"))
+    if n_hours == 0:
+        return weather_data
+
+    cos_zenith, extraterrestrial = solar_geometry(n_hours, latitude, longitude)
+    daylight = cos_zenith > 0
+    cz_pos = np.clip(cos_zenith, 0, None)
+    ghi_cs = clear_sky_ghi(cos_zenith)
+
+    ghi = _to_array(weather_data.get("ghi"), n_hours)
+    dni = _to_array(weather_data.get("dni"), n_hours)
+    dhi = _to_array(weather_data.get("dhi"), n_hours)
+    temp = _to_array(weather_data.get("temp_air"), n_hours)
+    wind = _to_array(weather_data.get("wind_speed"), n_hours)
+
+    flags = {}
+    with np.errstate(invalid="ignore"):
+        # --- Irradiancia ---
+        limits = {
+            "ghi": 1.5 * extraterrestrial * cz_pos**1.2 + 100,
+            "dni": extraterrestrial,
+            "dhi": 0.95 * extraterrestrial * cz_pos**1.2 + 50,
+        }
+        arrays = {"ghi": ghi, "dni": dni, "dhi": dhi}
+        invalid = {}
+        for field, arr in arrays.items():
+            missing = np.isnan(arr)
+            out_of_range = ~missing & ((arr < -4) | (arr > limits[field]))
+            spikes = np.zeros(n_hours, dtype=bool)
+            if field == "ghi":
+                spikes = ~missing & ~out_of_range & (arr > 1.2 * ghi_cs + 50)
+            invalid[field] = missing | out_of_range | spikes
+            flags[field] = {
+                "missing": int(missing.sum()),
+                "out_of_range": int(out_of_range.sum()),
+                "spikes": int(spikes.sum()),
+            }
+
+        # Cierre de componentes (solo se marca)
+        closure = dni * cz_pos + dhi
+        closure_failures = (
+            daylight & ~invalid["ghi"] & ~invalid["dni"] & ~invalid["dhi"]
+            & (ghi > CLOSURE_MIN_GHI)
+            & (np.abs(ghi - closure) > CLOSURE_TOLERANCE * ghi)
+        )
+
+        # Relleno de GHI con índice de cielo claro interpolado
+        fill_ghi = invalid["ghi"] & daylight
+        reference = ~invalid["ghi"] & daylight & (ghi_cs > 20)
+        kcs = np.where(reference, ghi / np.where(ghi_cs > 0, ghi_cs, 1), np.nan)
+        kcs = np.clip(_interpolate(kcs, ~reference, 1.0), 0, 1.2)
+        ghi = np.where(fill_ghi, kcs * ghi_cs, ghi)
+        ghi = np.clip(np.where(invalid["ghi"] & ~daylight, 0.0, ghi), 0, None)
+
+        # DHI por Erbs y DNI por cierre donde falten
+        kt = np.where(daylight, ghi / np.clip(extraterrestrial * cz_pos, 1e-6, None), 0)
+        dhi_model = erbs_diffuse_fraction(kt) * ghi
+        fill_dhi = (invalid["dhi"] | fill_ghi) & daylight
+        dhi = np.where(fill_dhi, dhi_model, dhi)
+        dhi = np.clip(np.where(invalid["dhi"] & ~daylight, 0.0, dhi), 0, ghi)
+
+        fill_dni = (invalid["dni"] | fill_ghi | fill_dhi) & daylight
+        dni_model = np.where(cz_pos > 0.05, (ghi - dhi) / np.clip(cz_pos, 0.05, None), 0)
+        dni = np.where(fill_dni, dni_model, dni)
+        dni = np.clip(np.where(invalid["dni"] & ~daylight, 0.0, dni), 0, extraterrestrial)
+
+        flags["ghi"]["filled"] = int(fill_ghi.sum())
+        flags["dhi"]["filled"] = int(fill_dhi.sum())
+        flags["dni"]["filled"] = int(fill_dni.sum())
+
+        # --- Temperatura y viento ---
+        temp_missing = np.isnan(temp)
+        temp_range = ~temp_missing & ((temp < TEMP_RANGE[0]) | (temp > TEMP_RANGE[1]))
+        temp_spikes = ~temp_missing & ~temp_range & _temperature_spikes(temp)
+        temp_invalid = temp_missing | temp_range | temp_spikes
+        temp = _interpolate(temp, temp_invalid, DEFAULT_TEMP_AIR)
+        flags["temp_air"] = {
+            "missing": int(temp_missing.sum()),
+            "out_of_range": int(temp_range.sum()),
+            "spikes": int(temp_spikes.sum()),
+            "filled": int(temp_invalid.sum()),
+        }
+
+        wind_missing = np.isnan(wind)
+        wind_range = ~wind_missing & ((wind < WIND_RANGE[0]) | (wind > WIND_RANGE[1]))
+        wind_invalid = wind_missing | wind_range
+        wind = _interpolate(wind, wind_invalid, DEFAULT_WIND_SPEED)
+        flags["wind_speed"] = {
+            "missing": int(wind_missing.sum()),
+            "out_of_range": int(wind_range.sum()),
+            "spikes": 0,
+            "filled": int(wind_invalid.sum()),
+        }
+
+    filled_any = fill_ghi | fill_dhi | fill_dni | temp_invalid | wind_invalid
+
+    weather_data.update({
+        "ghi": np.round(ghi, 1).tolist(),
+        "dni": np.round(dni, 1).tolist(),
+        "dhi": np.round(dhi, 1).tolist(),
+        "temp_air": np.round(temp, 1).tolist(),
+        "wind_speed": np.round(wind, 1).tolist(),
+    })
+    metadata = weather_data.setdefault("metadata", {})
+    metadata["quality"] = {
+        "version": QC_VERSION,
+        "hours": n_hours,
+        "clear_sky_model": "haurwitz",
+        "fields": flags,
+        "closure_failures": int(closure_failures.sum()),
+        "filled_hours": int(filled_any.sum()),
+        "filled_runs": _runs(filled_any),
+    }
+    temperatures = design_temperatures(ghi, temp, ~temp_invalid)
+    if temperatures is not None:
+        metadata["design_temperatures"] = temperatures
+    else:
+        metadata.pop("design_temperatures", None)
+    return weather_data
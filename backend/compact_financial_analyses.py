@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+# backend/compact_financial_analyses.py
+"""
+Elimina análisis financieros duplicados: de cada diseño conserva solo el
+más reciente por huella de entradas (los demás quedaron reemplazados, p.ej.
+al recalcular con force=true). Los análisis sin huella no se tocan.
+
+Uso:
+    python compact_financial_analyses.py
+
+Pensado para ejecutarse por cron; la cartera no cambia porque siempre se
+conserva el último análisis de cada diseño.
+"""
+from app import crud
+from app.database import SessionLocal
+
+db = SessionLocal()
+try:
+    deleted = crud.financial_analysis.prune_duplicates(db)
+finally:
+    db.close()
+
+print(f"✅ Análisis duplicados eliminados: {deleted}")
@@ -6,6 +6,9 @@ import logging
 
 from app.core.config import settings
 from app.api.v1.api import api_router  # IMPORTANTE: Importar el router
+from app.database import SessionLocal
+from app.services.financial_risk import shutdown_pool
+from app.services.weather_archive import sync_weather_archive
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -17,10 +20,18 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting up SolarDesignPro API...")
     logger.info(f"Database URL: {settings.DATABASE_URL[:30]}...")
+    if settings.WEATHER_ARCHIVE_DIR:
+        db = SessionLocal()
+        try:
+            stats = sync_weather_archive(db, settings.WEATHER_ARCHIVE_DIR)
+            logger.info(f"Weather archive synced: {stats}")
+        finally:
+            db.close()
     logger.info("API ready!")
     yield
     # Shutdown
     logger.info("Shutting down...")
+    shutdown_pool()
 
 # Crear instancia de FastAPI
 app = FastAPI(
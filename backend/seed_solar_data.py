@@ -6,6 +6,8 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from app.database import SessionLocal
 from app.models import PanelType, InverterType, SimulationScenario
+from app.core.cache_version import bump_version
+from app.crud.solar import CATALOG_VERSION_NAME, CRUDSimulationScenario
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -86,6 +88,7 @@ def seed_inverter_types(db):
             "efficiency_max": 0.988,
             "efficiency_euro": 0.984,
             "mppt_channels": 10,
+            "max_current_per_mppt": 40,
             "phases": 3
         },
         {
@@ -100,6 +103,7 @@ def seed_inverter_types(db):
             "efficiency_max": 0.987,
             "efficiency_euro": 0.985,
             "mppt_channels": 1,
+            "max_current_per_mppt": 6400,
             "phases": 3
         },
         {
@@ -114,6 +118,7 @@ def seed_inverter_types(db):
             "efficiency_max": 0.990,
             "efficiency_euro": 0.987,
             "mppt_channels": 12,
+            "max_current_per_mppt": 50,
             "phases": 3
         }
     ]
@@ -201,6 +206,8 @@ def seed_simulation_scenarios(db):
         else:
             logger.info(f"Escenario ya existe: {scenario_data['name']}")
     
+    # Invalidar la caché de escenarios de los workers en ejecución
+    bump_version(db, CRUDSimulationScenario.VERSION_NAME)
     db.commit()
 
 
@@ -219,6 +226,10 @@ def main():
         logger.info("\n3. Agregando escenarios de simulación...")
         seed_simulation_scenarios(db)
         
+        # Refrescar el índice de compatibilidad de los workers en ejecución
+        bump_version(db, CATALOG_VERSION_NAME)
+        db.commit()
+        
         logger.info("\n✅ Seed completado exitosamente!")
         
     except Exception as e:
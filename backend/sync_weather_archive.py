@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# backend/sync_weather_archive.py
+"""
+Sincroniza el archivo mmap de datos meteorológicos con la tabla weather_data.
+
+Uso:
+    python sync_weather_archive.py            # incremental (filas nuevas o refrescadas)
+    python sync_weather_archive.py --rebuild  # reescribe y compacta el archivo
+
+Requiere WEATHER_ARCHIVE_DIR en .env. Pensado para ejecutarse por cron o
+después de cargas masivas; los workers detectan los cambios solos.
+"""
+import sys
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.services.weather_archive import sync_weather_archive
+
+if not settings.WEATHER_ARCHIVE_DIR:
+    print("❌ WEATHER_ARCHIVE_DIR no está configurado")
+    sys.exit(1)
+
+db = SessionLocal()
+try:
+    stats = sync_weather_archive(
+        db, settings.WEATHER_ARCHIVE_DIR, rebuild="--rebuild" in sys.argv
+    )
+finally:
+    db.close()
+
+print(f"✅ Archivo sincronizado en {settings.WEATHER_ARCHIVE_DIR}")
+print(f"   Registros: {stats['records']}  nuevos: {stats['added']}  "
+      f"eliminados: {stats['removed']}  slots muertos: {stats['dead_slots']}")
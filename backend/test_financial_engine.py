@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# backend/test_financial_engine.py
+"""
+Script para probar el motor financiero sin base de datos ni servidor:
+valores explícitos en 0 del escenario (precio plano, sin descuento, sin
+degradación) deben respetarse y no reemplazarse por los defaults.
+"""
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services import financial_engine
+
+
+def scenario(**values):
+    """Escenario mínimo: los campos no indicados quedan en None (sin definir)."""
+    fields = {**financial_engine.DEFAULT_PARAMETERS, **financial_engine.TAX_PARAMETERS}
+    return SimpleNamespace(**{**{name: None for name in fields}, **values})
+
+
+def test_flat_price():
+    print("=== Escalamiento 0: precio plano ===")
+    params = financial_engine.scenario_parameters(
+        scenario(electricity_price_escalation=0.0, annual_degradation=0.006)
+    )
+    assert params["electricity_price_escalation"] == 0.0, params["electricity_price_escalation"]
+
+    params["electricity_price"] = 0.05
+    result = financial_engine.evaluate(10.0, 18_000.0, params)
+    revenue = result["revenue"]
+    years = result["years"]
+    # Año N = año 1 x degradación, sin escalamiento del precio
+    expected = revenue[0] * (1 - 0.006) ** (years - 1)
+    assert np.allclose(revenue, expected), (revenue[:3], expected[:3])
+    print(f"Ingreso año 1: {revenue[0]:,.0f} USD, año {int(years[-1])}: {revenue[-1]:,.0f} USD\n")
+
+
+def test_explicit_zeros():
+    print("=== Descuento y degradación en 0 ===")
+    params = financial_engine.scenario_parameters(
+        scenario(discount_rate=0.0, annual_degradation=0.0)
+    )
+    assert params["discount_rate"] == 0.0
+    assert params["annual_degradation"] == 0.0
+    # Sin definir: default
+    assert params["electricity_price_escalation"] == financial_engine.DEFAULT_PARAMETERS["electricity_price_escalation"]
+
+    result = financial_engine.evaluate(10.0, 18_000.0, params)
+    # Sin descuento ni degradación la energía descontada es producción x vida útil
+    assert np.isclose(result["energy_npv"], 18_000.0 * financial_engine.PROJECT_LIFETIME)
+    print(f"Energía descontada: {float(result['energy_npv']):,.0f} MWh\n")
+
+
+if __name__ == "__main__":
+    test_flat_price()
+    test_explicit_zeros()
+    print("OK")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# backend/test_weather_breaker.py
+"""
+Script para probar circuit breakers y respaldo de proveedores meteorológicos
+contra el stub local (python weather_stub_server.py).
+"""
+import asyncio
+import time
+
+import httpx
+
+STUB_URL = "http://localhost:8090"
+
+from app.core.config import settings
+
+settings.PVGIS_URL = f"{STUB_URL}/pvgis/tmy"
+settings.OPENMETEO_URL = f"{STUB_URL}/openmeteo/archive"
+settings.WEATHER_READ_TIMEOUT = 2.0
+
+from app.routers.weather import fetch_weather_data, provider_breakers
+
+
+def set_fault(provider, mode, **kwargs):
+    httpx.post(f"{STUB_URL}/_faults", json={"provider": provider, "mode": mode, **kwargs})
+
+
+def print_breakers():
+    for breaker in provider_breakers.values():
+        m = breaker.metrics()
+        print(f"   {m['provider']:<10} {m['state']:<10} "
+              f"fails={m['total_failures']} rejected={m['total_rejected']} "
+              f"opened={m['times_opened']} retry_in={m['retry_in_seconds']}")
+
+
+async def fetch(label):
+    start = time.perf_counter()
+    data = await fetch_weather_data(40.0, -3.7, "pvgis")
+    elapsed = time.perf_counter() - start
+    served_by = data["metadata"]["source"] if data else None
+    fallback = data["metadata"].get("fallback_from") if data else None
+    print(f"{label}: {elapsed:.2f}s served_by={served_by} fallback_from={fallback}")
+    print_breakers()
+
+
+async def main():
+    print("=== 1. Ambos proveedores sanos ===")
+    set_fault("pvgis", "ok")
+    set_fault("openmeteo", "ok")
+    await fetch("ok")
+
+    print("\n=== 2. PVGIS colgado: debe abrir el breaker y pasar a Open-Meteo ===")
+    set_fault("pvgis", "hang")
+    for i in range(5):
+        await fetch(f"hang #{i + 1}")
+
+    print("\n=== 3. Ambos caídos: debe responder rápido con None ===")
+    set_fault("openmeteo", "error")
+    for i in range(5):
+        await fetch(f"down #{i + 1}")
+
+    print("\n=== 4. Recuperación: esperar al half-open de PVGIS ===")
+    set_fault("pvgis", "ok")
+    set_fault("openmeteo", "ok")
+    retry_at = provider_breakers["pvgis"].retry_at or time.monotonic()
+    await asyncio.sleep(max(0.0, retry_at - time.monotonic()) + 0.1)
+    await fetch("recovered")
+
+    print("\n=== 5. PVGIS rechaza la petición (4xx): no cuenta como fallo ===")
+    set_fault("pvgis", "reject")
+    for i in range(5):
+        try:
+            await fetch(f"reject #{i + 1}")
+        except httpx.HTTPStatusError as e:
+            print(f"reject #{i + 1}: {e.response.status_code}")
+    print_breakers()
+    set_fault("pvgis", "ok")
+
+    print("\n=== 6. Prueba half-open cancelada: el breaker no queda bloqueado ===")
+    breaker = provider_breakers["pvgis"]
+    breaker._open()
+    breaker.retry_at = time.monotonic()
+    set_fault("pvgis", "hang")
+    task = asyncio.create_task(fetch_weather_data(40.0, -3.7, "pvgis"))
+    await asyncio.sleep(0.2)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    set_fault("pvgis", "ok")
+    await fetch("after cancelled probe")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
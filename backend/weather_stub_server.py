@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# backend/weather_stub_server.py
+"""
+Servidor local que imita PVGIS y Open-Meteo con inyección de fallos.
+
+Uso:
+    python weather_stub_server.py            # escucha en http://localhost:8090
+
+    # Apuntar el backend al stub (.env o variables de entorno)
+    PVGIS_URL=http://localhost:8090/pvgis/tmy
+    OPENMETEO_URL=http://localhost:8090/openmeteo/archive
+
+Modos de fallo por proveedor (POST /_faults):
+    ok     -> responde normalmente
+    error  -> responde 503
+    reject -> responde 400 (petición inválida, no debe abrir el breaker)
+    slow   -> espera `delay` segundos antes de responder
+    hang   -> no responde nunca (fuerza el timeout del cliente)
+    flaky  -> falla con probabilidad `error_rate`
+
+Ejemplo:
+    curl -X POST localhost:8090/_faults \\
+         -H 'Content-Type: application/json' \\
+         -d '{"provider": "pvgis", "mode": "error"}'
+"""
+import asyncio
+import math
+import random
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel, Field
+
+app = FastAPI(title="Weather stub server")
+
+faults = {
+    "pvgis": {"mode": "ok", "delay": 0.0, "error_rate": 0.0},
+    "openmeteo": {"mode": "ok", "delay": 0.0, "error_rate": 0.0},
+}
+calls = {"pvgis": 0, "openmeteo": 0}
+
+
+class FaultConfig(BaseModel):
+    provider: str = Field(..., pattern="^(pvgis|openmeteo)$")
+    mode: str = Field("ok", pattern="^(ok|error|reject|slow|hang|flaky)$")
+    delay: float = Field(0.0, ge=0)
+    error_rate: float = Field(0.0, ge=0, le=1)
+
+
+def synthetic_year(latitude: float) -> list:
+    """Año horario sintético (8760 valores) con forma de campana diaria"""
+    hours = []
+    for h in range(8760):
+        day, hour = divmod(h, 24)
+        season = 1 + 0.3 * math.cos(2 * math.pi * (day - 172) / 365) * (1 if latitude >= 0 else -1)
+        sun = max(0.0, math.sin(math.pi * (hour - 6) / 12)) if 6 <= hour <= 18 else 0.0
+        ghi = 950 * sun * season
+        hours.append({
+            "G(h)": round(ghi, 1),
+            "Gb(n)": round(ghi * 0.75, 1),
+            "Gd(h)": round(ghi * 0.25, 1),
+            "T2m": round(15 + 10 * sun + 8 * (season - 1), 1),
+            "WS10m": 3.0,
+        })
+    return hours
+
+
+async def apply_fault(provider: str) -> None:
+    calls[provider] += 1
+    config = faults[provider]
+    mode = config["mode"]
+
+    if mode == "error":
+        raise HTTPException(status_code=503, detail=f"{provider} stub: injected error")
+    if mode == "reject":
+        raise HTTPException(status_code=400, detail=f"{provider} stub: location not covered")
+    if mode == "flaky" and random.random() < config["error_rate"]:
+        raise HTTPException(status_code=503, detail=f"{provider} stub: injected flaky error")
+    if mode == "slow":
+        await asyncio.sleep(config["delay"])
+    if mode == "hang":
+        await asyncio.sleep(3600)
+
+
+@app.get("/pvgis/tmy")
+async def pvgis_tmy(lat: float, lon: float, outputformat: str = "json", browser: int = 0):
+    await apply_fault("pvgis")
+    return {
+        "inputs": {"meteo_data": {"year_min": 2005}},
+        "outputs": {"tmy_hourly": synthetic_year(lat)},
+    }
+
+
+@app.get("/openmeteo/archive")
+async def openmeteo_archive(
+    latitude: float,
+    longitude: float,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    hourly: Optional[str] = None,
+    timezone: Optional[str] = None,
+):
+    await apply_fault("openmeteo")
+    hours = synthetic_year(latitude)
+    return {
+        "hourly": {
+            "time": list(range(len(hours))),
+            "temperature_2m": [h["T2m"] for h in hours],
+            "windspeed_10m": [h["WS10m"] for h in hours],
+            "direct_radiation": [round(h["G(h)"] * 0.75, 1) for h in hours],
+            "diffuse_radiation": [h["Gd(h)"] for h in hours],
+            "direct_normal_irradiance": [h["Gb(n)"] for h in hours],
+        }
+    }
+
+
+@app.post("/_faults")
+async def set_fault(config: FaultConfig):
+    faults[config.provider] = {
+        "mode": config.mode,
+        "delay": config.delay,
+        "error_rate": config.error_rate,
+    }
+    return {"faults": faults}
+
+
+@app.get("/_faults")
+async def get_faults():
+    return {"faults": faults, "calls": calls}
+
+
+if __name__ == "__main__":
+    import uvicorn
+    print("Weather stub server at http://localhost:8090")
+    uvicorn.run(app, host="0.0.0.0", port=8090)